@@ -1,10 +1,9 @@
-import json
-import pandas as pd
 from evidently.report import Report
 from evidently.metrics import DataDriftTable
 from evidently.metrics import DatasetDriftMetric
 from evidently.metrics import ColumnDriftMetric
 from evidently.ui.workspace import Workspace
+from monitoring.dataset import read_dataframe
 
 
 # -------------------------------
@@ -15,18 +14,10 @@ current_path = "evidently/current/current.jsonl"
 workspace_path = "evidently"
 
 # -------------------------------
-# Load JSONL into pandas
+# Load into pandas (typed columns via pyarrow)
 # -------------------------------
-def load_jsonl(path):
-    rows = []
-    with open(path, "r") as f:
-        for line in f:
-            rows.append(json.loads(line))
-    return pd.DataFrame(rows)
-
-
-reference_df = load_jsonl(reference_path)
-current_df = load_jsonl(current_path)
+reference_df = read_dataframe(reference_path)
+current_df = read_dataframe(current_path)
 
 # -------------------------------
 # Create Evidently Report
@@ -38,10 +29,7 @@ report = Report(
     ]
 )
 
-report.run(
-    reference_data=reference_df,
-    current_data=current_df
-)
+report.run(reference_data=reference_df, current_data=current_df)
 
 # Save results
 report.save_html("evidently/metrics/data_drift_report.html")
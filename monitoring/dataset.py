@@ -0,0 +1,225 @@
+# monitoring/dataset.py
+# Columnar storage for the monitoring datasets. reference/current rows are
+# kept as Parquet with typed columns, partitioned by day (date=YYYY-MM-DD),
+# and read through pyarrow.dataset so callers only pay for the columns and
+# time range they ask for: projection and the timestamp filter are pushed
+# down to partition pruning and row-group statistics.
+#
+# Usage: python -m monitoring.dataset convert reference
+#        python -m monitoring.dataset convert current   # moves the rows out of the JSONL
+
+import argparse
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.json as pa_json
+
+# name -> (JSONL file, Parquet dataset directory)
+DATASETS = {
+    "reference": ("data/reference.jsonl", "data/parquet/reference"),
+    "current": ("data/current.jsonl", "data/parquet/current"),
+}
+
+SCHEMA = pa.schema(
+    [
+        ("sample_id", pa.string()),
+        ("timestamp", pa.timestamp("s", tz="UTC")),
+        ("segmentation_success", pa.bool_()),
+        ("skin_L", pa.float64()),
+        ("skin_a", pa.float64()),
+        ("skin_b", pa.float64()),
+        ("mst_level", pa.int8()),
+        ("tone_group", pa.string()),
+        ("descriptor", pa.string()),
+        ("undertone", pa.string()),
+        ("eye_color_left", pa.string()),
+        ("eye_color_right", pa.string()),
+        ("hair_color", pa.string()),
+        ("processing_time_s", pa.float64()),
+    ]
+)
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+DATASET_SCHEMA = SCHEMA.append(pa.field("date", pa.string()))
+
+# the JSON files hold epoch seconds; parse as int64, then cast
+_JSON_SCHEMA = pa.schema(
+    [f if f.name != "timestamp" else pa.field("timestamp", pa.int64()) for f in SCHEMA]
+)
+
+
+def read_jsonl_table(path):
+    """Parse a JSONL feature log into a table with SCHEMA's types."""
+    if os.path.getsize(path) == 0:
+        return SCHEMA.empty_table()  # a freshly rotated feature log
+    table = pa_json.read_json(
+        path,
+        parse_options=pa_json.ParseOptions(
+            explicit_schema=_JSON_SCHEMA, unexpected_field_behavior="ignore"
+        ),
+    )
+    return _with_schema(table)
+
+
+def _with_schema(table):
+    columns = []
+    for field in SCHEMA:
+        if field.name in table.column_names:
+            column = table[field.name]
+            if field.name == "timestamp" and pa.types.is_integer(column.type):
+                column = column.cast(pa.int64()).cast(field.type)
+            columns.append(column.cast(field.type))
+        else:
+            columns.append(pa.nulls(table.num_rows, field.type))
+    return pa.Table.from_arrays(columns, schema=SCHEMA)
+
+
+def write_table(table, dataset_dir, overwrite=False):
+    """
+    Add rows to a dataset, one new file per touched day partition. With
+    overwrite=True the dataset is replaced as a whole: it is written to a
+    sibling directory and swapped in, so readers never see it half done.
+    """
+    table = _with_schema(table)
+    dates = pc.strftime(table["timestamp"], format="%Y-%m-%d")
+    table = table.append_column("date", dates)
+    target = f"{dataset_dir}.tmp-{uuid.uuid4().hex[:8]}" if overwrite else dataset_dir
+    ds.write_dataset(
+        table,
+        target,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"part-{int(time.time())}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    if overwrite:
+        old = f"{target}.old"
+        if os.path.exists(dataset_dir):
+            os.replace(dataset_dir, old)
+        os.replace(target, dataset_dir)
+        shutil.rmtree(old, ignore_errors=True)
+    return dataset_dir
+
+
+def append_jsonl(path, dataset_dir):
+    return write_table(read_jsonl_table(path), dataset_dir)
+
+
+def _to_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+def _time_filters(start, end):
+    """
+    (timestamp filter, date partition filter) for [start, end); either is
+    None when unbounded.
+    """
+    start, end = _to_datetime(start), _to_datetime(end)
+    ts_type = SCHEMA.field("timestamp").type
+    rows = dates = None
+    if start is not None:
+        rows = ds.field("timestamp") >= pa.scalar(start, ts_type)
+        dates = ds.field("date") >= start.strftime("%Y-%m-%d")
+    if end is not None:
+        end_rows = ds.field("timestamp") < pa.scalar(end, ts_type)
+        end_dates = ds.field("date") <= end.strftime("%Y-%m-%d")
+        rows = end_rows if rows is None else rows & end_rows
+        dates = end_dates if dates is None else dates & end_dates
+    return rows, dates
+
+
+def _locate(name):
+    # a DATASETS name, a .jsonl file or a Parquet dataset directory
+    if name in DATASETS:
+        return DATASETS[name]
+    if name.endswith(".jsonl"):
+        return name, None
+    return None, name
+
+
+def read_table(name, columns=None, start=None, end=None):
+    """
+    Rows of a monitoring dataset as a pyarrow Table, with only `columns`
+    (all of SCHEMA by default) and timestamps in [start, end) (epoch
+    seconds or datetimes; None for open-ended).
+
+    name is a DATASETS key, a .jsonl path or a dataset directory. For a
+    DATASETS key the Parquet dataset is read when it exists; for "current"
+    the active JSONL file (rows not rotated into Parquet yet) is read as
+    well, for "reference" the JSONL is only a fallback.
+    """
+    jsonl_path, dataset_dir = _locate(name)
+    columns = list(columns or SCHEMA.names)
+    rows, dates = _time_filters(start, end)
+    tables = []
+    if dataset_dir and os.path.isdir(dataset_dir):
+        dataset = ds.dataset(
+            dataset_dir,
+            format="parquet",
+            schema=DATASET_SCHEMA,
+            partitioning=PARTITIONING,
+        )
+        # the date filter prunes whole partitions, the timestamp filter
+        # row groups (by their statistics) and then rows
+        expr = rows if dates is None else rows & dates
+        tables.append(dataset.to_table(columns=columns, filter=expr))
+
+    use_jsonl = name == "current" or not tables
+    if jsonl_path and os.path.exists(jsonl_path) and use_jsonl:
+        table = read_jsonl_table(jsonl_path)
+        if rows is not None:
+            table = table.filter(rows)
+        tables.append(table.select(columns))
+    if not tables:
+        raise FileNotFoundError(f"No monitoring data for {name!r}")
+    return pa.concat_tables(tables)
+
+
+def read_dataframe(name, columns=None, start=None, end=None):
+    """read_table as a pandas DataFrame."""
+    return read_table(name, columns, start, end).to_pandas()
+
+
+def dataset_fingerprint(name):
+    """(files, total size, newest mtime) over the dataset and its JSONL."""
+    jsonl_path, dataset_dir = _locate(name)
+    paths = [jsonl_path] if jsonl_path and os.path.exists(jsonl_path) else []
+    for root, _, files in os.walk(dataset_dir or ""):
+        paths += [os.path.join(root, f) for f in files]
+    stats = [os.stat(p) for p in paths]
+    return (
+        len(stats),
+        sum(s.st_size for s in stats),
+        max((s.st_mtime_ns for s in stats), default=0),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="JSONL -> partitioned Parquet")
+    convert.add_argument("name", choices=sorted(DATASETS))
+    convert.add_argument("--src", help="JSONL file (default: the dataset's own)")
+    convert.add_argument(
+        "--keep-source",
+        action="store_true",
+        help="for current: leave the JSONL in place (rows will be read twice)",
+    )
+    args = parser.parse_args()
+
+    jsonl_path, dataset_dir = DATASETS[args.name]
+    src = args.src or jsonl_path
+    table = read_jsonl_table(src)
+    # the reference is rewritten as a whole; current rows are appended and
+    # moved out of the active file, like a feature log rotation
+    write_table(table, dataset_dir, overwrite=args.name == "reference")
+    if args.name == "current" and not args.src and not args.keep_source:
+        os.remove(src)
+    print(f"Wrote {table.num_rows} rows from {src} to {dataset_dir}")
@@ -1,24 +1,37 @@
-import pandas as pd
 from evidently.report import Report
 from evidently.metric_preset.data_drift import DataDriftPreset
 from evidently import ColumnMapping
+from monitoring.dataset import dataset_fingerprint, read_dataframe
 import os
 
-def generate_drift_report():
-    reference_path = "data/reference.jsonl"
-    current_path = "data/current.jsonl"
+# monitoring.dataset names: Parquet once converted, JSONL until then
+REFERENCE_DATASET = "reference"
+CURRENT_DATASET = "current"
+OUTPUT_PATH = "monitoring/data_drift_report.html"
 
-    reference = pd.read_json(reference_path, lines=True)
-    current = pd.read_json(current_path, lines=True)
+
+def drift_inputs_fingerprint():
+    # (files, size, newest mtime) of each input; changes whenever either does
+    return (
+        dataset_fingerprint(REFERENCE_DATASET),
+        dataset_fingerprint(CURRENT_DATASET),
+    )
+
+
+def generate_drift_report(current_since=None):
+    reference = read_dataframe(REFERENCE_DATASET)
+    # only the recent rows are read when current_since (epoch seconds) is set
+    current = read_dataframe(CURRENT_DATASET, start=current_since)
 
     column_mapping = ColumnMapping()
 
     report = Report(metrics=[DataDriftPreset()])
-    report.run(reference_data=reference, current_data=current, column_mapping=column_mapping)
+    report.run(
+        reference_data=reference, current_data=current, column_mapping=column_mapping
+    )
 
     os.makedirs("monitoring", exist_ok=True)
 
-    output_path = "monitoring/data_drift_report.html"
-    report.save_html(output_path)
+    report.save_html(OUTPUT_PATH)
 
-    return output_path
+    return OUTPUT_PATH
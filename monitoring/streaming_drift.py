@@ -0,0 +1,462 @@
+# monitoring/streaming_drift.py
+# Streaming drift statistics. Instead of loading both datasets into pandas
+# and rerunning Evidently, each column keeps a small mergeable sketch
+# (fixed-edge histogram or category counts) that is updated per record and
+# kept per time window. Drift scores (PSI, KS, chi-square) are computed
+# from the sketches in O(bins). Evidently stays available for on-demand
+# deep reports (--deep, or GET / on the API).
+#
+# Usage: python -m monitoring.streaming_drift --window-hours 24 [--deep]
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from scipy import stats
+
+from monitoring.dataset import DATASETS, dataset_fingerprint, read_table
+
+# a monitoring.dataset name (Parquet when converted) or a .jsonl path
+REFERENCE_DATASET = "reference"
+CURRENT_PATH = "data/current.jsonl"
+# where the feature log rotates current rows to
+CURRENT_DATASET = DATASETS["current"][1]
+STATE_PATH = "monitoring/drift_state.json"
+
+# fixed bin edges keep histograms mergeable; values outside them land in
+# the under/overflow bins
+NUMERIC_COLUMNS = {
+    "skin_L": np.linspace(0, 100, 51),
+    "skin_a": np.linspace(-20, 60, 41),
+    "skin_b": np.linspace(-20, 60, 41),
+    "processing_time_s": np.geomspace(0.01, 100, 41),
+}
+CATEGORICAL_COLUMNS = ["mst_level", "undertone", "hair_color"]
+
+WINDOW_S = 3600
+PSI_THRESHOLD = 0.2
+P_VALUE_THRESHOLD = 0.05
+# fewer current rows than this are scored but never flagged as drift
+MIN_CURRENT_RECORDS = 30
+
+
+class HistogramSketch:
+    def __init__(self, edges, counts=None, missing=0):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        # counts[0] is underflow, counts[-1] overflow
+        self.counts = (
+            np.zeros(len(self.edges) + 1, dtype=np.int64)
+            if counts is None
+            else np.asarray(counts, dtype=np.int64)
+        )
+        self.missing = missing
+
+    def update(self, value):
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            self.missing += 1
+        else:
+            self.counts[np.searchsorted(self.edges, value, side="right")] += 1
+
+    def update_many(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        present = values[~np.isnan(values)]
+        self.missing += len(values) - len(present)
+        bins = np.searchsorted(self.edges, present, side="right")
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.missing += other.missing
+        return self
+
+    def to_dict(self):
+        return {"counts": self.counts.tolist(), "missing": self.missing}
+
+
+class CategorySketch:
+    def __init__(self, counts=None, missing=0):
+        self.counts = dict(counts or {})
+        self.missing = missing
+
+    def update(self, value):
+        if value is None:
+            self.missing += 1
+        else:
+            key = str(value)
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def update_many(self, values):
+        for value in values:
+            self.update(value)
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.missing += other.missing
+        return self
+
+    def to_dict(self):
+        return {"counts": self.counts, "missing": self.missing}
+
+
+class DriftSketch:
+    """One sketch per monitored column, for a set of records."""
+
+    def __init__(self):
+        self.records = 0
+        self.columns = {name: HistogramSketch(e) for name, e in NUMERIC_COLUMNS.items()}
+        for name in CATEGORICAL_COLUMNS:
+            self.columns[name] = CategorySketch()
+
+    def update(self, record):
+        self.records += 1
+        for name, sketch in self.columns.items():
+            sketch.update(record.get(name))
+
+    def update_table(self, table):
+        """Bulk update from a pyarrow Table (e.g. monitoring.dataset.read_table)."""
+        self.records += table.num_rows
+        for name, sketch in self.columns.items():
+            if name in NUMERIC_COLUMNS:
+                sketch.update_many(
+                    table[name].to_numpy(zero_copy_only=False).astype(np.float64)
+                )
+            else:
+                sketch.update_many(table[name].to_pylist())
+
+    def merge(self, other):
+        self.records += other.records
+        for name, sketch in self.columns.items():
+            sketch.merge(other.columns[name])
+        return self
+
+    def to_dict(self):
+        return {
+            "records": self.records,
+            "columns": {name: s.to_dict() for name, s in self.columns.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls()
+        sketch.records = data["records"]
+        for name, state in data["columns"].items():
+            if name in NUMERIC_COLUMNS:
+                sketch.columns[name] = HistogramSketch(
+                    NUMERIC_COLUMNS[name], state["counts"], state["missing"]
+                )
+            elif name in CATEGORICAL_COLUMNS:
+                sketch.columns[name] = CategorySketch(state["counts"], state["missing"])
+        return sketch
+
+
+class WindowedSketches:
+    """DriftSketches bucketed by record timestamp into fixed windows."""
+
+    def __init__(self, window_s=WINDOW_S):
+        self.window_s = window_s
+        self.windows = {}
+
+    def update(self, record):
+        timestamp = record.get("timestamp")
+        if timestamp is None:
+            timestamp = time.time()
+        start = int(timestamp // self.window_s * self.window_s)
+        self.windows.setdefault(start, DriftSketch()).update(record)
+
+    def update_table(self, table):
+        """Bulk update from a pyarrow Table with a timestamp column."""
+        seconds = _epoch_seconds(table)
+        starts = seconds // self.window_s * self.window_s
+        for start in np.unique(starts):
+            window = self.windows.setdefault(int(start), DriftSketch())
+            window.update_table(table.filter(starts == start))
+
+    def merged(self, since=None, until=None):
+        """One sketch over all windows that start in [since, until)."""
+        total = DriftSketch()
+        for start, sketch in self.windows.items():
+            if (since is None or start >= since) and (until is None or start < until):
+                total.merge(sketch)
+        return total
+
+    def prune(self, before):
+        for start in [s for s in self.windows if s < before]:
+            del self.windows[start]
+
+    def to_dict(self):
+        return {
+            "window_s": self.window_s,
+            "windows": {str(s): w.to_dict() for s, w in self.windows.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        windowed = cls(data["window_s"])
+        windowed.windows = {
+            int(s): DriftSketch.from_dict(w) for s, w in data["windows"].items()
+        }
+        return windowed
+
+
+# ---------- drift scores ----------
+def psi(expected, actual, eps=1e-4):
+    p = np.asarray(expected, dtype=np.float64)
+    q = np.asarray(actual, dtype=np.float64)
+    if not p.sum() or not q.sum():
+        return 0.0
+    p = np.clip(p / p.sum(), eps, None)
+    q = np.clip(q / q.sum(), eps, None)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def ks_from_counts(expected, actual):
+    """Two-sample KS statistic and asymptotic p-value on shared bins."""
+    p = np.asarray(expected, dtype=np.float64)
+    q = np.asarray(actual, dtype=np.float64)
+    n, m = p.sum(), q.sum()
+    if not n or not m:
+        return 0.0, 1.0
+    d = float(np.max(np.abs(np.cumsum(p) / n - np.cumsum(q) / m)))
+    return d, float(stats.kstwobign.sf(d * np.sqrt(n * m / (n + m))))
+
+
+def chi_square_from_counts(expected, actual):
+    """Chi-square test of homogeneity on a 2 x k contingency table."""
+    table = np.array([expected, actual], dtype=np.float64)
+    table = table[:, table.sum(axis=0) > 0]
+    if table.shape[1] < 2 or not table[0].sum() or not table[1].sum():
+        return 0.0, 1.0
+    statistic, p_value, _, _ = stats.chi2_contingency(table, correction=False)
+    return float(statistic), float(p_value)
+
+
+def drift_scores(reference, current):
+    """Per-column scores between two DriftSketches."""
+    scores = {}
+    for name, ref in reference.columns.items():
+        cur = current.columns[name]
+        if isinstance(ref, HistogramSketch):
+            ks, p_value = ks_from_counts(ref.counts, cur.counts)
+            column = {
+                "psi": psi(ref.counts, cur.counts),
+                "ks": ks,
+                "p_value": p_value,
+            }
+        else:
+            keys = sorted(set(ref.counts) | set(cur.counts))
+            expected = [ref.counts.get(k, 0) for k in keys]
+            actual = [cur.counts.get(k, 0) for k in keys]
+            chi2, p_value = chi_square_from_counts(expected, actual)
+            column = {
+                "psi": psi(expected, actual),
+                "chi2": chi2,
+                "p_value": p_value,
+            }
+        column["drifted"] = bool(
+            current.records >= MIN_CURRENT_RECORDS
+            and (column["psi"] > PSI_THRESHOLD or column["p_value"] < P_VALUE_THRESHOLD)
+        )
+        scores[name] = column
+    return {
+        "reference_records": reference.records,
+        "current_records": current.records,
+        "columns": scores,
+        "drifted_columns": [n for n, c in scores.items() if c["drifted"]],
+    }
+
+
+# ---------- incremental file ingestion ----------
+def _epoch_seconds(table):
+    return (
+        table["timestamp"]
+        .to_numpy(zero_copy_only=False)
+        .astype("datetime64[s]")
+        .astype(np.int64)
+    )
+
+
+def _advance(position, timestamps):
+    # newest timestamp ingested so far, and how many rows had it
+    timestamps = [t for t in timestamps if t is not None]
+    if not timestamps:
+        return
+    newest = max(timestamps)
+    at_newest = sum(1 for t in timestamps if t == newest)
+    last = position.get("timestamp")
+    if last is None or newest > last:
+        position["timestamp"], position["at_timestamp"] = newest, at_newest
+    elif newest == last:
+        position["at_timestamp"] += at_newest
+
+
+def _rotated(position, path):
+    """True if path is no longer the file `position` was read from."""
+    if not position or "ino" not in position or not os.path.exists(path):
+        return False
+    st = os.stat(path)
+    return (st.st_ino, st.st_dev) != (position["ino"], position["dev"]) or (
+        st.st_size < position["offset"]
+    )
+
+
+def ingest_jsonl(path, sketch, position=None):
+    """
+    Feed the records after `position` (what the previous call returned)
+    into sketch (a DriftSketch or WindowedSketches) and return the new
+    position, so each run only reads what was appended since the last one.
+    The position holds the byte offset, the file's inode/device and the
+    newest timestamp ingested; a rotated or rewritten file is read from the
+    start.
+    """
+    if isinstance(position, int):
+        position = {"offset": position}  # state saved before file identity
+    position = dict(position or {"offset": 0})
+    if not os.path.exists(path):
+        return position  # mid-rotation; the new file is read next time
+    if _rotated(position, path):
+        position["offset"] = 0
+    offset = position["offset"]
+    timestamps = []
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if offset:
+            f.seek(offset - 1)
+            if f.read(1) != b"\n":
+                offset = 0  # rewritten in place; the offset is mid-line
+                f.seek(0)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # partial line still being written
+            offset += len(line)
+            if line.strip():
+                record = json.loads(line)
+                sketch.update(record)
+                timestamps.append(record.get("timestamp"))
+    position.update(offset=offset, ino=st.st_ino, dev=st.st_dev)
+    _advance(position, timestamps)
+    return position
+
+
+def ingest_dataset(dataset, sketch, position=None):
+    """
+    Feed rows of a Parquet dataset that are newer than `position` into
+    sketch: the rows rotated out of the active file before it was read to
+    the end. Rows at the position's own timestamp are skipped as far as
+    they were already counted. Returns the updated position.
+    """
+    position = dict(position or {"offset": 0})
+    if not os.path.isdir(dataset):
+        return position
+    last = position.get("timestamp")
+    columns = ["timestamp"] + list(NUMERIC_COLUMNS) + CATEGORICAL_COLUMNS
+    table = read_table(dataset, columns=columns, start=last)
+    if last is not None and table.num_rows:
+        seconds = _epoch_seconds(table)
+        skip = np.flatnonzero(seconds == last)[: position.get("at_timestamp", 0)]
+        keep = np.ones(table.num_rows, dtype=bool)
+        keep[skip] = False
+        table = table.filter(keep)
+    if table.num_rows:
+        sketch.update_table(table)
+        _advance(position, _epoch_seconds(table).tolist())
+    return position
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {"reference": None, "current": WindowedSketches(), "offsets": {}}
+    with open(path) as f:
+        data = json.load(f)
+    return {
+        "reference": data["reference"] and DriftSketch.from_dict(data["reference"]),
+        "reference_fingerprint": data.get("reference_fingerprint"),
+        "current": WindowedSketches.from_dict(data["current"]),
+        "offsets": data["offsets"],
+    }
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(
+            {
+                "reference": state["reference"] and state["reference"].to_dict(),
+                "reference_fingerprint": state.get("reference_fingerprint"),
+                "current": state["current"].to_dict(),
+                "offsets": state["offsets"],
+            },
+            f,
+        )
+    os.replace(tmp_path, path)
+
+
+def reference_sketch(reference=REFERENCE_DATASET):
+    """DriftSketch of a whole dataset, read column-wise."""
+    sketch = DriftSketch()
+    columns = list(NUMERIC_COLUMNS) + CATEGORICAL_COLUMNS
+    sketch.update_table(read_table(reference, columns=columns))
+    return sketch
+
+
+def update_state(
+    state,
+    reference=REFERENCE_DATASET,
+    current_path=CURRENT_PATH,
+    current_dataset=CURRENT_DATASET,
+):
+    """
+    Rebuild the reference sketch if its data changed; ingest new current
+    rows. Rows rotated into current_dataset since the last run (all of
+    them on the first run) are ingested from there.
+    """
+    fingerprint = list(dataset_fingerprint(reference))
+    if state["reference"] is None or state.get("reference_fingerprint") != fingerprint:
+        state["reference"] = reference_sketch(reference)
+        state["reference_fingerprint"] = fingerprint
+    position = state["offsets"].get(current_path)
+    if isinstance(position, int):
+        position = {"offset": position}
+    if current_dataset and (position is None or _rotated(position, current_path)):
+        position = ingest_dataset(current_dataset, state["current"], position)
+    state["offsets"][current_path] = ingest_jsonl(
+        current_path, state["current"], position
+    )
+    return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--window-hours", type=float, default=24)
+    parser.add_argument("--keep-days", type=float, default=30)
+    parser.add_argument(
+        "--deep", action="store_true", help="also write the full Evidently report"
+    )
+    args = parser.parse_args()
+
+    state = update_state(load_state())
+    now = time.time()
+    state["current"].prune(now - args.keep_days * 86400)
+    save_state(state)
+
+    current = state["current"].merged(since=now - args.window_hours * 3600)
+    result = drift_scores(state["reference"], current)
+    print(
+        f"reference {result['reference_records']} rows, "
+        f"current {result['current_records']} rows (last {args.window_hours:g}h)"
+    )
+    print(f"{'column':<20}{'psi':>8}{'ks/chi2':>10}{'p':>8}  drift")
+    for name, column in result["columns"].items():
+        stat = column.get("ks", column.get("chi2"))
+        print(
+            f"{name:<20}{column['psi']:>8.3f}{stat:>10.3f}"
+            f"{column['p_value']:>8.3f}  {'yes' if column['drifted'] else ''}"
+        )
+
+    if args.deep:
+        from monitoring.run_evidently import generate_drift_report
+
+        print("Deep report saved →", generate_drift_report())
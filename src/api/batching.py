@@ -0,0 +1,117 @@
+# src/api/batching.py
+# Dynamic micro-batching: concurrent requests arriving within a short window
+# are run as one batched call (one Segformer forward pass) on the inference
+# executor, and each caller gets its own result back through a future.
+
+import asyncio
+import os
+import time
+
+from src.api.inference import QueueFullError
+from src.api.metrics import BATCH_QUEUE_DELAY, BATCH_SIZE
+
+BATCH_MAX_SIZE = int(os.getenv("CHROMA_BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("CHROMA_BATCH_MAX_WAIT_MS", "10"))
+# requests allowed to wait for a batch before new ones get a 503
+BATCH_MAX_QUEUE = int(os.getenv("CHROMA_BATCH_MAX_QUEUE", "32"))
+
+
+class MicroBatcher:
+    """
+    batch_fn takes a list of items and returns a list of results in the
+    same order (e.g. chroma_model.analyze_images). At most `concurrency`
+    batches run at once; while they do, new items accumulate, so batches
+    grow with load.
+    """
+
+    def __init__(
+        self,
+        batch_fn,
+        executor,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        max_queue=BATCH_MAX_QUEUE,
+        concurrency=1,
+    ):
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.concurrency = concurrency
+        self._loop = None
+        self._queue = None
+        self._dispatcher = None
+        # running _run_batch tasks; the loop only keeps weak references
+        self._batches = set()
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # (re)bind to the current loop, e.g. a fresh test client loop
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._dispatcher = loop.create_task(self._dispatch_forever())
+
+    async def submit(self, item):
+        self._ensure_started()
+        if self._queue.qsize() >= self.max_queue:
+            raise QueueFullError("Batching queue is full")
+        future = self._loop.create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    async def _dispatch_forever(self):
+        while True:
+            # wait for a free batch slot first, so items queue up meanwhile
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_wait_s
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            task = self._loop.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch):
+        now = time.perf_counter()
+        BATCH_SIZE.observe(len(batch))
+        for _, _, enqueued in batch:
+            BATCH_QUEUE_DELAY.observe(now - enqueued)
+
+        try:
+            results = await self.executor.run(
+                self.batch_fn, [item for item, _, _ in batch]
+            )
+        except asyncio.CancelledError:
+            # close(): callers waiting on this batch are cancelled with it
+            for _, future, _ in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Stop dispatching and cancel the batches still running."""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+        for task in list(self._batches):
+            task.cancel()
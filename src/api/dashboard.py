@@ -0,0 +1,124 @@
+# src/api/dashboard.py
+# Keeps the Evidently drift report in memory so GET / never runs Evidently
+# inline (once a first report exists). A background thread fingerprints the
+# input files (mtime/size) every check interval and regenerates the report
+# when they change or when it gets older than the refresh interval;
+# requests only compare cached values and get the last good HTML with an
+# ETag/Last-Modified so browsers can revalidate with a 304.
+
+import hashlib
+import os
+import threading
+import time
+
+from src.api.metrics import DASHBOARD_GENERATION_SECONDS, DASHBOARD_REFRESH_FAILURES
+
+DASHBOARD_REFRESH_S = float(os.getenv("CHROMA_DASHBOARD_REFRESH_S", "3600"))
+DASHBOARD_CHECK_S = float(os.getenv("CHROMA_DASHBOARD_CHECK_S", "30"))
+# the feature log changes current.jsonl constantly; input changes trigger a
+# new Evidently run at most this often (use /drift for live scores)
+DASHBOARD_MIN_REFRESH_S = float(os.getenv("CHROMA_DASHBOARD_MIN_REFRESH_S", "600"))
+# serve the old report while a new one is generated, instead of waiting
+DASHBOARD_STALE_WHILE_REVALIDATE = (
+    os.getenv("CHROMA_DASHBOARD_STALE_WHILE_REVALIDATE", "1") == "1"
+)
+
+
+class DriftDashboard:
+    """
+    generate() writes the report and returns its path (run_evidently's
+    generate_drift_report); fingerprint() describes its inputs.
+    """
+
+    def __init__(
+        self,
+        generate,
+        fingerprint,
+        refresh_s=DASHBOARD_REFRESH_S,
+        check_s=DASHBOARD_CHECK_S,
+        min_refresh_s=DASHBOARD_MIN_REFRESH_S,
+        stale_while_revalidate=DASHBOARD_STALE_WHILE_REVALIDATE,
+    ):
+        self.generate = generate
+        self.fingerprint = fingerprint
+        self.refresh_s = refresh_s
+        self.check_s = check_s
+        self.min_refresh_s = min_refresh_s
+        self.stale_while_revalidate = stale_while_revalidate
+        self.html = None
+        self.etag = None
+        self.last_modified = None
+        # fingerprint the report was generated from / last seen by check()
+        self._fingerprint = None
+        self._seen_fingerprint = None
+        self._refresh_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="drift-dashboard", daemon=True
+            )
+            self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+
+    def check(self):
+        """Fingerprint the inputs; called from the background thread."""
+        self._seen_fingerprint = self.fingerprint()
+
+    def is_stale(self):
+        if self.html is None:
+            return True
+        age = time.time() - self.last_modified
+        if self._seen_fingerprint != self._fingerprint:
+            return age >= self.min_refresh_s
+        return age > self.refresh_s
+
+    def get(self):
+        """Current report as (html bytes, etag, last_modified)."""
+        if self.is_stale():
+            if self.html is not None and self.stale_while_revalidate:
+                self._wake.set()  # let the background thread regenerate
+            else:
+                self.refresh()
+        return self.html, self.etag, self.last_modified
+
+    def refresh(self):
+        with self._refresh_lock:
+            # another caller may have refreshed while we waited for the lock
+            if not self.is_stale():
+                return
+            fingerprint = self.fingerprint()
+            start = time.perf_counter()
+            try:
+                with open(self.generate(), "rb") as f:
+                    html = f.read()
+            except Exception as e:
+                DASHBOARD_REFRESH_FAILURES.inc()
+                print("Drift report generation failed:", e)
+                if self.html is None:
+                    raise
+                return
+            DASHBOARD_GENERATION_SECONDS.observe(time.perf_counter() - start)
+            self.html = html
+            self.etag = f'"{hashlib.sha1(html).hexdigest()}"'
+            self.last_modified = time.time()
+            self._fingerprint = self._seen_fingerprint = fingerprint
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                print("Drift input fingerprint failed:", e)
+            try:
+                self.refresh()
+            except Exception:
+                pass  # already counted; retried on the next check
+            self._wake.wait(self.check_s)
+            self._wake.clear()
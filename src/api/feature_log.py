@@ -0,0 +1,189 @@
+# src/api/feature_log.py
+# Append-only log of /analyze features in the data/current.jsonl schema, so
+# the drift monitor runs on real traffic. log() only enqueues; a writer
+# thread appends batches, fsyncs on an interval, and rotates the active
+# file by size or age into the partitioned Parquet "current" dataset, which
+# monitoring.dataset reads together with the active file. With
+# CHROMA_FEATURE_LOG_PARQUET=0 rotated files are archived as JSONL in
+# data/feature_log/ instead, and drop out of drift monitoring.
+
+import json
+import os
+import queue
+import threading
+import time
+
+from monitoring.dataset import DATASETS, append_jsonl
+from src.api.metrics import FEATURE_LOG_DROPPED, FEATURE_LOG_WRITTEN
+
+FEATURE_LOG_ENABLED = os.getenv("CHROMA_FEATURE_LOG", "1") == "1"
+FEATURE_LOG_PATH = os.getenv("CHROMA_FEATURE_LOG_PATH", "data/current.jsonl")
+FEATURE_LOG_SEGMENT_DIR = os.getenv("CHROMA_FEATURE_LOG_DIR", "data/feature_log")
+FEATURE_LOG_QUEUE_SIZE = int(os.getenv("CHROMA_FEATURE_LOG_QUEUE_SIZE", "10000"))
+FEATURE_LOG_FSYNC_S = float(os.getenv("CHROMA_FEATURE_LOG_FSYNC_S", "5"))
+# rotate the active file past this size or age (0 turns either off)
+FEATURE_LOG_ROTATE_BYTES = int(os.getenv("CHROMA_FEATURE_LOG_ROTATE_BYTES", "67108864"))
+FEATURE_LOG_ROTATE_S = float(os.getenv("CHROMA_FEATURE_LOG_ROTATE_S", "86400"))
+FEATURE_LOG_PARQUET = os.getenv("CHROMA_FEATURE_LOG_PARQUET", "1") == "1"
+FEATURE_LOG_DATASET_DIR = os.getenv(
+    "CHROMA_FEATURE_LOG_DATASET_DIR", DATASETS["current"][1]
+)
+
+
+def feature_record(sample_id, result, timestamp=None):
+    """One data/current.jsonl row from an analyze_image result."""
+    ok = "error" not in result
+    eye_color = result.get("eye_color")
+    if isinstance(eye_color, (list, tuple)):
+        eye_left, eye_right = eye_color
+    else:
+        eye_left = eye_right = eye_color
+    return {
+        "sample_id": sample_id,
+        "timestamp": int(timestamp if timestamp is not None else time.time()),
+        "segmentation_success": ok,
+        "skin_L": result.get("skin_L"),
+        "skin_a": result.get("skin_a"),
+        "skin_b": result.get("skin_b"),
+        "mst_level": result.get("mst_level"),
+        "tone_group": result.get("tone_group"),
+        "descriptor": result.get("descriptor"),
+        "undertone": result.get("undertone"),
+        "eye_color_left": eye_left,
+        "eye_color_right": eye_right,
+        "hair_color": result.get("hair_color"),
+        "processing_time_s": result.get("metadata", {}).get("processing_time_s"),
+    }
+
+
+class FeatureLogWriter:
+    def __init__(
+        self,
+        path=FEATURE_LOG_PATH,
+        segment_dir=FEATURE_LOG_SEGMENT_DIR,
+        max_queue=FEATURE_LOG_QUEUE_SIZE,
+        fsync_s=FEATURE_LOG_FSYNC_S,
+        rotate_bytes=FEATURE_LOG_ROTATE_BYTES,
+        rotate_s=FEATURE_LOG_ROTATE_S,
+        parquet=FEATURE_LOG_PARQUET,
+        dataset_dir=FEATURE_LOG_DATASET_DIR,
+    ):
+        self.path = path
+        self.segment_dir = segment_dir
+        self.fsync_s = fsync_s
+        self.rotate_bytes = rotate_bytes
+        self.rotate_s = rotate_s
+        self.parquet = parquet
+        self.dataset_dir = dataset_dir
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._file = None
+        self._opened_at = None
+        self._last_fsync = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="feature-log", daemon=True
+            )
+            self._thread.start()
+
+    def log(self, record):
+        """Queue one record; returns False (and counts it) if the queue is full."""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            FEATURE_LOG_DROPPED.inc()
+            return False
+        return True
+
+    def close(self, timeout=10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ---------- writer thread ----------
+    def _run(self):
+        try:
+            while not (self._stop.is_set() and self._queue.empty()):
+                try:
+                    batch = [self._queue.get(timeout=self.fsync_s)]
+                except queue.Empty:
+                    batch = []
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self.write(batch)
+        finally:
+            self._close_file()
+
+    def write(self, records):
+        """Append records, then fsync/rotate if due. Called from the writer thread."""
+        if records:
+            if self._file is None:
+                self._open()
+            self._file.write("".join(json.dumps(r) + "\n" for r in records))
+            self._file.flush()
+            FEATURE_LOG_WRITTEN.inc(len(records))
+        if self._file is None:
+            return
+        now = time.monotonic()
+        if now - self._last_fsync >= self.fsync_s:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+        if self._due_for_rotation(now):
+            self.rotate()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "a")
+        if self._file.tell() and not _ends_with_newline(self.path):
+            self._file.write("\n")  # don't glue onto an unterminated last row
+        # an existing file keeps its age from when this process first saw it
+        self._opened_at = self._last_fsync = time.monotonic()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def _due_for_rotation(self, now):
+        if self.rotate_bytes and self._file.tell() >= self.rotate_bytes:
+            return True
+        return bool(self.rotate_s) and now - self._opened_at >= self.rotate_s
+
+    def rotate(self):
+        """
+        Move the active file into the Parquet dataset (or segment_dir) and
+        start a fresh, empty one. Returns where the rows went.
+        """
+        self._close_file()
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return None
+        os.makedirs(self.segment_dir, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(self.path))[0]
+        name = f"{stem}-{time.strftime('%Y%m%dT%H%M%S')}"
+        segment = os.path.join(self.segment_dir, f"{name}.jsonl")
+        n = 1
+        while os.path.exists(segment):
+            segment = os.path.join(self.segment_dir, f"{name}-{n}.jsonl")
+            n += 1
+        os.replace(self.path, segment)
+        # readers always find an active file, even before the next write
+        open(self.path, "a").close()
+        if self.parquet:
+            append_jsonl(segment, self.dataset_dir)
+            os.remove(segment)
+            return self.dataset_dir
+        return segment
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
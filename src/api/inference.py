@@ -0,0 +1,56 @@
+# src/api/inference.py
+# Bounded executor that keeps CPU-bound inference off the asyncio event loop.
+# At most INFERENCE_WORKERS jobs run at once and INFERENCE_QUEUE_DEPTH more
+# may wait; anything beyond that is rejected so the API can answer 503
+# instead of queueing without limit.
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+from src.api.metrics import INFERENCE_IN_FLIGHT, INFERENCE_REJECTED
+
+INFERENCE_WORKERS = int(os.getenv("CHROMA_INFERENCE_WORKERS", "1"))
+INFERENCE_QUEUE_DEPTH = int(os.getenv("CHROMA_INFERENCE_QUEUE_DEPTH", "8"))
+# torch intra-op threads; 0 splits the CPUs evenly between the workers
+TORCH_THREADS = int(os.getenv("CHROMA_TORCH_THREADS", "0"))
+RETRY_AFTER_S = int(os.getenv("CHROMA_RETRY_AFTER_S", "5"))
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class InferenceExecutor:
+    def __init__(self, workers=INFERENCE_WORKERS, queue_depth=INFERENCE_QUEUE_DEPTH):
+        threads = TORCH_THREADS or max(1, (os.cpu_count() or 1) // workers)
+        torch.set_num_threads(threads)
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="inference"
+        )
+        # one slot per running or waiting job
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the pool; raises QueueFullError if full."""
+        if not self._slots.acquire(blocking=False):
+            INFERENCE_REJECTED.inc()
+            raise QueueFullError("Inference queue is full")
+
+        INFERENCE_IN_FLIGHT.inc()
+        future = self._pool.submit(fn, *args, **kwargs)
+        # free the slot when the job ends, not when the caller stops
+        # waiting, so cancelled requests can't over-admit work
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future):
+        INFERENCE_IN_FLIGHT.dec()
+        self._slots.release()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,29 +1,193 @@
 # src/api/main.py
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response
 from pydantic import BaseModel
-from fastapi.responses import FileResponse
-from src.safety.guardrails_filter import run_with_guardrails
+from fastapi.responses import JSONResponse, StreamingResponse
+from src.safety.guardrails_filter import (
+    arun_with_guardrails,
+    output_passes,
+    withdraw,
+)
 from src.rag.rag_pipeline import ChromaRAGPipeline
-from src.models.chroma_model import analyze_image
-import tempfile
+from src.models.chroma_model import analyze_images, warm_up
+from src.api.metrics import (
+    RECOMMEND_STREAM_CUTOFFS,
+    RECOMMEND_STREAM_SECONDS,
+    RECOMMEND_STREAM_TTFT,
+    RECOMMENDATION_TABLE_REQUESTS,
+    WARMUP_SECONDS,
+)
+from src.api.inference import (
+    INFERENCE_WORKERS,
+    RETRY_AFTER_S,
+    InferenceExecutor,
+    QueueFullError,
+)
+from src.api.batching import MicroBatcher
+from src.api.result_cache import RESULT_CACHE_ENABLED, ResultCache
+from src.api.telemetry import TelemetryWriter
+from src.api.sampling import TelemetrySampler
+from src.api.dashboard import DriftDashboard
+from src.api.feature_log import FEATURE_LOG_ENABLED, FeatureLogWriter, feature_record
+from src.rag.llm_client import LLMError
+from src.rag.recommendation_table import (
+    RECOMMENDATION_TABLE_PATH,
+    load_table,
+    pipeline_version,
+)
+from email.utils import formatdate, parsedate_to_datetime
+import asyncio
+import contextlib
+import functools
+import json
 import os
+import threading
+import time
 import mlflow
 from prometheus_fastapi_instrumentator import Instrumentator
-from monitoring.run_evidently import generate_drift_report
+from monitoring.run_evidently import drift_inputs_fingerprint, generate_drift_report
+from monitoring.streaming_drift import (
+    WindowedSketches,
+    drift_scores,
+    reference_sketch,
+)
 
 mlflow.set_tracking_uri("http://13.60.180.47:5000")
-mlflow.set_experiment("ChromaMatchExperiment")
-app = FastAPI(title="ChromaMatch")
+EXPERIMENT_NAME = "ChromaMatchExperiment"
+mlflow.set_experiment(EXPERIMENT_NAME)
+
+# Load the models and run a dummy request at startup (in the background, so
+# /health answers immediately); /ready reports 503 until it finishes.
+WARMUP_ENABLED = os.getenv("CHROMA_WARMUP", "1") == "1"
+_ready = threading.Event()
+_warmup_error = None
+
+
+def _warm_up():
+    global _warmup_error
+    try:
+        for phase, seconds in warm_up().items():
+            WARMUP_SECONDS.labels(phase=phase).set(seconds)
+
+        start = time.perf_counter()
+        rag_pipeline.retriever.embedder.encode(["warm-up"], convert_to_numpy=True)
+        WARMUP_SECONDS.labels(phase="embedder").set(time.perf_counter() - start)
+        _ready.set()
+    except Exception as e:
+        _warmup_error = str(e)
+        print("Warm-up failed:", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ENABLED:
+        threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+    else:
+        _ready.set()
+    threading.Thread(
+        target=_load_reference_sketch, name="drift-reference", daemon=True
+    ).start()
+    telemetry.start()
+    sampler.start()
+    dashboard.start()
+    if FEATURE_LOG_ENABLED:
+        feature_log.start()
+    yield
+    analyze_batcher.close()
+    inference_executor.shutdown()
+    dashboard.close()
+    feature_log.close()  # flush and fsync the feature log
+    sampler.close()  # last summary runs
+    telemetry.close()  # flush queued MLflow runs
+    await rag_pipeline.llm.aclose()
+
+
+app = FastAPI(title="ChromaMatch", lifespan=lifespan)
 
 Instrumentator().instrument(app).expose(app)
 rag_pipeline = ChromaRAGPipeline()
+# /recommend answers precomputed by python -m src.rag.recommendation_table
+recommendation_table = load_table(
+    RECOMMENDATION_TABLE_PATH, pipeline_version(rag_pipeline)
+)
+inference_executor = InferenceExecutor()
+# repeat uploads of the same image are answered from the result cache
+result_cache = ResultCache() if RESULT_CACHE_ENABLED else None
+analyze_batcher = MicroBatcher(
+    functools.partial(analyze_images, cache=result_cache),
+    inference_executor,
+    concurrency=INFERENCE_WORKERS,
+)
+# MLflow runs are written by a background thread, off the request path
+telemetry = TelemetryWriter(EXPERIMENT_NAME)
+# only a sample of requests get their own run; the rest go into summaries
+sampler = TelemetrySampler(telemetry)
+# drift report regenerated in the background, served from memory
+dashboard = DriftDashboard(generate_drift_report, drift_inputs_fingerprint)
+# /analyze features appended to data/current.jsonl for drift monitoring
+feature_log = FeatureLogWriter()
 
 
 @app.get("/")
-def root_dashboard():
-    report_path = generate_drift_report()
-    return FileResponse(report_path, media_type="text/html")
+def root_dashboard(request: Request):
+    html, etag, last_modified = dashboard.get()
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return Response(content=html, media_type="text/html", headers=headers)
+
+
+def _not_modified(request, etag, last_modified):
+    if "if-none-match" in request.headers:
+        return request.headers["if-none-match"] == etag
+    since = request.headers.get("if-modified-since")
+    if since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+# ---------- DRIFT ----------
+# live drift scores from per-record sketches of the traffic this process
+# has seen; the Evidently report at / is the deep, slower view
+DRIFT_RETENTION_HOURS = float(os.getenv("CHROMA_DRIFT_RETENTION_HOURS", "168"))
+# guards current_sketches only; /analyze takes it on the event loop, so it
+# is never held across I/O
+_drift_lock = threading.Lock()
+_reference_sketch = None
+current_sketches = WindowedSketches()
+
+
+def _load_reference_sketch():
+    # read once at startup; /drift builds it itself if that hasn't finished
+    global _reference_sketch
+    if _reference_sketch is None:
+        try:
+            _reference_sketch = reference_sketch()
+        except Exception as e:
+            print("Loading the drift reference failed:", e)
+    return _reference_sketch
+
+
+@app.get("/drift")
+def drift(window_hours: float = 24):
+    reference = _reference_sketch or _load_reference_sketch()
+    if reference is None:
+        raise HTTPException(status_code=503, detail="Drift reference unavailable")
+    with _drift_lock:
+        now = time.time()
+        current_sketches.prune(now - DRIFT_RETENTION_HOURS * 3600)
+        # whole windows that overlap the requested range
+        since = now - window_hours * 3600 - current_sketches.window_s
+        current = current_sketches.merged(since=since)
+    return drift_scores(reference, current)
 
 
 # ---------- HEALTH ----------
@@ -32,7 +196,36 @@ def health_check():
     return {"status": "ok"}
 
 
+# ---------- READINESS ----------
+@app.get("/ready")
+def readiness_check():
+    if _ready.is_set():
+        return {"status": "ready"}
+    if _warmup_error:
+        return JSONResponse(
+            status_code=503, content={"status": "failed", "detail": _warmup_error}
+        )
+    return JSONResponse(status_code=503, content={"status": "warming_up"})
+
+
 # ---------- ML ANALYSIS ----------
+MAX_UPLOAD_BYTES = int(os.getenv("CHROMA_MAX_UPLOAD_BYTES", str(10 * 2**20)))
+UPLOAD_CHUNK_BYTES = 2**20
+
+
+async def _read_upload(file: UploadFile) -> bytes:
+    """Read an upload in chunks, failing fast once it exceeds the limit."""
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Uploaded file is too large")
+
+    data = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        data += chunk
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Uploaded file is too large")
+    return bytes(data)
+
+
 @app.post("/analyze")
 async def analyze(file: UploadFile = File(...)):
     """
@@ -40,21 +233,45 @@ async def analyze(file: UploadFile = File(...)):
     Step 2: ML model analyzes skin tone, undertone, eyes, hair.
     """
 
-    tmp = tempfile.NamedTemporaryFile(delete=False)
-    tmp.write(await file.read())
-    tmp.close()
-    with mlflow.start_run(run_name="analyze_image"):
-        mlflow.log_param("uploaded_filename", file.filename)
+    start = time.perf_counter()
+    image_bytes = await _read_upload(file)
+    params = {"uploaded_filename": file.filename}
+    suffix = os.path.splitext(file.filename or "")[1]
+    upload = [(f"upload{suffix}", image_bytes)]
 
-        result = analyze_image(tmp.name)
+    # inference is micro-batched with concurrent uploads and runs on the
+    # bounded executor, so the event loop stays free; the image is decoded
+    # straight from memory
+    try:
+        result = await analyze_batcher.submit(image_bytes)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(RETRY_AFTER_S)},
+        )
+    # /drift scores live traffic whether or not it is also logged to disk
+    record = feature_record(file.filename, result)
+    if FEATURE_LOG_ENABLED:
+        feature_log.log(record)
+    with _drift_lock:
+        current_sketches.update(record)
+    if "error" in result:
+        # failed images are always logged, with the upload
+        sampler.record(
+            "analyze_image", params=params, artifacts=upload, error=result["error"]
+        )
+        raise HTTPException(status_code=400, detail=result["error"])
 
-        # Log model output fields (if they exist)
-        for key, value in result.items():
-            if isinstance(value, (int, float, str)):
-                mlflow.log_param(f"result_{key}", value)
-
-        mlflow.log_artifact(tmp.name)  # store uploaded image
-    os.unlink(tmp.name)
+    # Log model output fields (if they exist); numbers as metrics
+    metrics = {"latency_s": time.perf_counter() - start}
+    for key, value in result.items():
+        if isinstance(value, str):
+            params[f"result_{key}"] = value
+        elif isinstance(value, (int, float)):
+            metrics[f"result_{key}"] = value
+    # the uploaded image is stored only for sampled requests
+    sampler.record("analyze_image", params=params, metrics=metrics, artifacts=upload)
     return result
 
 
@@ -81,25 +298,145 @@ async def recommend(preds: PredictionInput):
     # (Guardrails validates INPUT as well)
     user_query = rag_pipeline.ml_to_query(preds_dict)
 
-    # Apply Guardrails wrapper
-    with mlflow.start_run(run_name="recommendation"):
-        # log input params
-        mlflow.log_params({k: str(v) for k, v in preds_dict.items()})
+    # log input params
+    params = {k: str(v) for k, v in preds_dict.items()}
+    start = time.perf_counter()
 
-        try:
-            safe_response = run_with_guardrails(
-                rag_pipeline.recommend_from_predictions,
-                user_query,
-            )
+    # every profile /analyze can produce has a stored answer; generate only
+    # for the rest
+    stored = recommendation_table.get(user_query)
+    RECOMMENDATION_TABLE_REQUESTS.labels(
+        outcome="miss" if stored is None else "hit"
+    ).inc()
+    if stored is not None:
+        sampler.record(
+            "recommendation",
+            params=params,
+            metrics={
+                "response_length": len(stored),
+                "latency_s": time.perf_counter() - start,
+                "table_hit": 1,
+            },
+        )
+        return Response(content=stored, media_type="application/json")
+
+    # Apply Guardrails wrapper; the LLM call is awaited on the event loop
+    try:
+        safe_response = await arun_with_guardrails(
+            rag_pipeline.arecommend_from_predictions,
+            user_query,
+        )
+    except LLMError as e:
+        # provider down or rate limited even after retries
+        sampler.record("recommendation", params=params, error=str(e))
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(RETRY_AFTER_S)},
+        )
+    except Exception as e:
+        sampler.record("recommendation", params=params, error=str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # log simple metric: length of response
+    sampler.record(
+        "recommendation",
+        params=params,
+        metrics={
+            "response_length": len(str(safe_response)),
+            "latency_s": time.perf_counter() - start,
+        },
+    )
+    return safe_response
 
-            # log simple metric: length of response
-            mlflow.log_metric("response_length", len(str(safe_response)))
 
-            return safe_response
+# ---------- STREAMING RAG RECOMMENDATION ----------
+@app.post("/recommend/stream")
+async def recommend_stream(preds: PredictionInput):
+    """
+    /recommend over Server-Sent Events: "token" events carry the answer as
+    it is generated, then a "done" event carries the /recommend response
+    (retrieved docs and guardrail violations included).
 
+    Tokens are screened by the same moderation as /recommend before they
+    are sent, and a violation ends the stream early. The full Guardrails
+    validators need the whole answer, so they run after the last token:
+    if they reject it, the done event carries the refusal, as /recommend
+    returns it, and withdraws text the client has already received.
+    """
+    preds_dict = preds.dict()
+    user_query = rag_pipeline.ml_to_query(preds_dict)
+    params = {k: str(v) for k, v in preds_dict.items()}
+    return StreamingResponse(
+        _recommend_events(user_query, params),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _stored_events(stored):
+    result = json.loads(stored)
+    yield "token", result["rag_answer"]
+    yield "done", result
+
+
+async def _recommend_events(user_query, params):
+    start = time.perf_counter()
+    ttft = None
+    stored = recommendation_table.get(user_query)
+    RECOMMENDATION_TABLE_REQUESTS.labels(
+        outcome="miss" if stored is None else "hit"
+    ).inc()
+    if stored is not None:
+        events = _stored_events(stored)
+    else:
+        events = rag_pipeline.astream_recommendation(user_query)
+
+    # closing events also ends the LLM stream if the client disconnects
+    async with contextlib.aclosing(events):
+        try:
+            async for kind, data in events:
+                if kind == "token":
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                        RECOMMEND_STREAM_TTFT.observe(ttft)
+                    yield _sse("token", {"text": data})
+                    continue
+
+                result = data
+                # the full Guardrails validators need the whole answer, so for
+                # generated answers they run once the stream is complete
+                if stored is None and not result["guardrail_violations"]:
+                    passed = await asyncio.to_thread(
+                        output_passes, user_query, result["rag_answer"]
+                    )
+                    if not passed:
+                        withdraw(result)
+                if result["guardrail_violations"]:
+                    RECOMMEND_STREAM_CUTOFFS.inc()
+                yield _sse("done", result)
         except Exception as e:
-            mlflow.log_param("error", str(e))
-            raise HTTPException(status_code=400, detail=str(e))
+            # the 200 status has been sent; report the failure in the stream
+            sampler.record("recommendation_stream", params=params, error=str(e))
+            yield _sse("error", {"detail": str(e)})
+            return
+
+    total = time.perf_counter() - start
+    RECOMMEND_STREAM_SECONDS.observe(total)
+    sampler.record(
+        "recommendation_stream",
+        params=params,
+        metrics={
+            "response_length": len(result["rag_answer"]),
+            "latency_s": total,
+            "ttft_s": ttft if ttft is not None else total,
+            "table_hit": int(stored is not None),
+        },
+    )
 
 
 # ---------- HOME ----------
@@ -110,6 +447,7 @@ def home():
         "endpoints": {
             "/analyze": "Upload an image → ML analysis",
             "/recommend": "Send ML predictions → Get RAG recommendations",
+            "/recommend/stream": "Same, streamed over Server-Sent Events",
             "/docs": "API docs",
         },
     }
@@ -0,0 +1,156 @@
+# src/api/metrics.py
+# Custom Prometheus metrics. They live in the default registry, so /metrics
+# (exposed by prometheus_fastapi_instrumentator) serves them as well.
+
+from prometheus_client import Counter, Gauge, Histogram
+
+WARMUP_SECONDS = Gauge(
+    "chromamatch_warmup_seconds",
+    "Seconds spent in each startup warm-up phase",
+    ["phase"],
+)
+
+INFERENCE_IN_FLIGHT = Gauge(
+    "chromamatch_inference_in_flight",
+    "Inference jobs running or waiting on the inference executor",
+)
+INFERENCE_REJECTED = Counter(
+    "chromamatch_inference_rejected_total",
+    "Inference requests rejected because the executor queue was full",
+)
+
+BATCH_SIZE = Histogram(
+    "chromamatch_batch_size",
+    "Images per micro-batch sent to the model",
+    buckets=(1, 2, 4, 8, 16, 32),
+)
+BATCH_QUEUE_DELAY = Histogram(
+    "chromamatch_batch_queue_delay_seconds",
+    "Time a request waited for its micro-batch to be dispatched",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+TELEMETRY_QUEUE_DEPTH = Gauge(
+    "chromamatch_telemetry_queue_depth",
+    "MLflow records waiting for the background telemetry writer",
+)
+TELEMETRY_WRITTEN = Counter(
+    "chromamatch_telemetry_written_total",
+    "MLflow runs written by the telemetry writer",
+)
+TELEMETRY_DROPPED = Counter(
+    "chromamatch_telemetry_dropped_total",
+    "MLflow records dropped because the telemetry queue or the spool was full",
+    ["reason"],
+)
+TELEMETRY_QUEUE_BYTES = Gauge(
+    "chromamatch_telemetry_queue_bytes",
+    "Artifact bytes held by records waiting for the telemetry writer",
+)
+TELEMETRY_SPOOLED = Counter(
+    "chromamatch_telemetry_spooled_total",
+    "MLflow records spooled to local disk because the tracking server failed",
+)
+TELEMETRY_SAMPLING = Counter(
+    "chromamatch_telemetry_sampling_total",
+    "Requests given their own MLflow run (sampled) or folded into a summary run",
+    ["route", "decision"],
+)
+
+DASHBOARD_GENERATION_SECONDS = Histogram(
+    "chromamatch_dashboard_generation_seconds",
+    "Time to regenerate the Evidently drift report",
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+DASHBOARD_REFRESH_FAILURES = Counter(
+    "chromamatch_dashboard_refresh_failures_total",
+    "Drift report regenerations that failed (the last good report is kept)",
+)
+
+FEATURE_LOG_WRITTEN = Counter(
+    "chromamatch_feature_log_written_total",
+    "Feature records appended to the drift monitoring log",
+)
+FEATURE_LOG_DROPPED = Counter(
+    "chromamatch_feature_log_dropped_total",
+    "Feature records dropped because the feature log queue was full",
+)
+
+RESULT_CACHE_REQUESTS = Counter(
+    "chromamatch_result_cache_requests_total",
+    "analyze_image result cache lookups by tier and outcome (hit/miss)",
+    ["tier", "outcome"],
+)
+RESULT_CACHE_EVICTIONS = Counter(
+    "chromamatch_result_cache_evictions_total",
+    "Results evicted from the analyze_image result cache",
+    ["tier"],
+)
+
+RECOMMENDATION_TABLE_REQUESTS = Counter(
+    "chromamatch_recommendation_table_requests_total",
+    "/recommend lookups in the precomputed answer table by outcome (hit/miss)",
+    ["outcome"],
+)
+
+RESPONSE_CACHE_REQUESTS = Counter(
+    "chromamatch_response_cache_requests_total",
+    "generate_answer cache lookups by kind (exact/semantic), tier and outcome",
+    ["kind", "tier", "outcome"],
+)
+RESPONSE_CACHE_EVICTIONS = Counter(
+    "chromamatch_response_cache_evictions_total",
+    "Cached answers removed by tier and reason (expired/size)",
+    ["tier", "reason"],
+)
+
+LLM_REQUESTS = Counter(
+    "chromamatch_llm_requests_total",
+    "LLM chat completion calls by final outcome (ok/error), after retries",
+    ["outcome"],
+)
+LLM_RETRIES = Counter(
+    "chromamatch_llm_retries_total",
+    "LLM request attempts retried, by reason (status code, timeout, transport)",
+    ["reason"],
+)
+LLM_IN_FLIGHT = Gauge(
+    "chromamatch_llm_in_flight",
+    "LLM HTTP requests currently in flight",
+)
+LLM_LATENCY = Histogram(
+    "chromamatch_llm_latency_seconds",
+    "Time for a successful LLM call, including retries and backoff",
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+
+RECOMMEND_STREAM_TTFT = Histogram(
+    "chromamatch_recommend_stream_ttft_seconds",
+    "/recommend/stream time from request to the first answer token sent",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15),
+)
+RECOMMEND_STREAM_SECONDS = Histogram(
+    "chromamatch_recommend_stream_seconds",
+    "/recommend/stream time from request to the final frame",
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+RECOMMEND_STREAM_CUTOFFS = Counter(
+    "chromamatch_recommend_stream_cutoffs_total",
+    "/recommend/stream answers stopped or withdrawn by moderation",
+)
+
+EMBEDDING_CACHE_REQUESTS = Counter(
+    "chromamatch_embedding_cache_requests_total",
+    "RAGRetriever query embedding cache lookups by outcome (hit/miss)",
+    ["outcome"],
+)
+EMBEDDING_ENCODE_SECONDS = Histogram(
+    "chromamatch_embedding_encode_seconds",
+    "Time to encode one batch of uncached queries with the MiniLM embedder",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+INDEX_SEARCH_SECONDS = Histogram(
+    "chromamatch_index_search_seconds",
+    "Time for one FAISS index search (one or more stacked queries)",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5),
+)
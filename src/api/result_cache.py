@@ -0,0 +1,156 @@
+# src/api/result_cache.py
+# Cache of analyze_image results keyed by chroma_model.image_cache_key
+# (decoded pixels + model/config version), so re-uploads of the same
+# selfie skip segmentation. Two tiers: a bounded in-process LRU, and an
+# optional SQLite file shared by all workers on the host, evicted by size.
+
+import collections
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from src.api.metrics import RESULT_CACHE_EVICTIONS, RESULT_CACHE_REQUESTS
+
+RESULT_CACHE_ENABLED = os.getenv("CHROMA_RESULT_CACHE", "1") == "1"
+RESULT_CACHE_SIZE = int(os.getenv("CHROMA_RESULT_CACHE_SIZE", "1024"))
+# SQLite file for the shared tier ("" = memory tier only)
+RESULT_CACHE_DB = os.getenv("CHROMA_RESULT_CACHE_DB", "")
+RESULT_CACHE_DB_BYTES = int(os.getenv("CHROMA_RESULT_CACHE_DB_BYTES", "268435456"))
+
+
+class MemoryLRU:
+    def __init__(self, max_entries=RESULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                RESULT_CACHE_EVICTIONS.labels(tier="memory").inc()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteStore:
+    """
+    key -> JSON result in one SQLite file. WAL mode lets several API
+    workers read and write it at once; when the stored results pass
+    max_bytes the least recently used ones are deleted down to 90%.
+    """
+
+    def __init__(self, path=RESULT_CACHE_DB, max_bytes=RESULT_CACHE_DB_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)"
+            )
+
+    def _connect(self):
+        # sqlite3 connections can't be shared across threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def get(self, key):
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT value FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        data = json.dumps(value)
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time()),
+            )
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+            if total[0] > self.max_bytes:
+                self._evict(db, total[0] - int(self.max_bytes * 0.9))
+
+    def _evict(self, db, excess):
+        freed, keys = 0, []
+        for key, size in db.execute("SELECT key, size FROM results ORDER BY accessed"):
+            if freed >= excess:
+                break
+            keys.append((key,))
+            freed += size
+        db.executemany("DELETE FROM results WHERE key = ?", keys)
+        RESULT_CACHE_EVICTIONS.labels(tier="disk").inc(len(keys))
+
+
+class ResultCache:
+    """
+    get/put interface expected by chroma_model.analyze_images. Values are
+    copied in and out, so callers can't mutate what is cached.
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE, db_path=RESULT_CACHE_DB):
+        self.memory = MemoryLRU(max_entries)
+        self.disk = SQLiteStore(db_path) if db_path else None
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            RESULT_CACHE_REQUESTS.labels(tier="memory", outcome="hit").inc()
+            return copy.deepcopy(value)
+        RESULT_CACHE_REQUESTS.labels(tier="memory", outcome="miss").inc()
+        if self.disk is None:
+            return None
+
+        try:
+            value = self.disk.get(key)
+        except sqlite3.Error as e:
+            print("Result cache read failed:", e)
+            value = None
+        outcome = "miss" if value is None else "hit"
+        RESULT_CACHE_REQUESTS.labels(tier="disk", outcome=outcome).inc()
+        if value is not None:
+            self.memory.put(key, value)
+            return copy.deepcopy(value)
+        return None
+
+    def put(self, key, value):
+        if "error" in value:
+            return
+        # round-trip through JSON so both tiers hold the same plain types
+        value = json.loads(json.dumps(value))
+        self.memory.put(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, value)
+            except sqlite3.Error as e:
+                print("Result cache write failed:", e)
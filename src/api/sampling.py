@@ -0,0 +1,142 @@
+# src/api/sampling.py
+# Decides which requests get their own MLflow run (and uploaded image).
+# Errors are always kept; everything else is sampled at a per-route rate.
+# Unsampled requests are not lost: they are folded into per-route
+# aggregates that are written as one summary run every interval.
+
+import collections
+import json
+import os
+import random
+import threading
+import time
+
+from src.api.metrics import TELEMETRY_SAMPLING
+
+# share of successful requests that get a full run, overridable per route
+# with e.g. CHROMA_TELEMETRY_ROUTE_RATES="analyze_image=0.01,recommendation=0.1"
+TELEMETRY_SAMPLE_RATE = float(os.getenv("CHROMA_TELEMETRY_SAMPLE_RATE", "0.01"))
+TELEMETRY_ROUTE_RATES = os.getenv("CHROMA_TELEMETRY_ROUTE_RATES", "")
+TELEMETRY_SUMMARY_INTERVAL_S = float(os.getenv("CHROMA_TELEMETRY_SUMMARY_S", "300"))
+# distinct values counted per param in a summary before the rest become "other"
+SUMMARY_MAX_VALUES = 50
+
+
+def parse_route_rates(spec):
+    rates = {}
+    for part in spec.split(","):
+        if part.strip():
+            route, rate = part.split("=")
+            rates[route.strip()] = float(rate)
+    return rates
+
+
+class _RouteSummary:
+    def __init__(self):
+        self.started = time.time()
+        self.requests = 0
+        self.metrics = collections.defaultdict(list)  # name -> [sum, min, max, n]
+        self.values = collections.defaultdict(collections.Counter)
+
+    def add(self, params, metrics):
+        self.requests += 1
+        for key, value in metrics.items():
+            stats = self.metrics.setdefault(key, [0.0, value, value, 0])
+            stats[0] += value
+            stats[1] = min(stats[1], value)
+            stats[2] = max(stats[2], value)
+            stats[3] += 1
+        for key, value in params.items():
+            counts = self.values[key]
+            value = str(value)
+            if value not in counts and len(counts) >= SUMMARY_MAX_VALUES:
+                value = "other"
+            counts[value] += 1
+
+    def to_run(self):
+        params = {
+            "window_start": time.strftime(
+                "%Y-%m-%dT%H:%M:%S", time.localtime(self.started)
+            ),
+            "window_s": round(time.time() - self.started, 1),
+        }
+        for key, counts in self.values.items():
+            params[f"{key}_counts"] = json.dumps(dict(counts.most_common()))
+        metrics = {"requests": self.requests}
+        for key, (total, low, high, n) in self.metrics.items():
+            metrics[f"{key}_mean"] = total / n
+            metrics[f"{key}_min"] = low
+            metrics[f"{key}_max"] = high
+        return params, metrics
+
+
+class TelemetrySampler:
+    """
+    Front of the TelemetryWriter: record() either forwards a request's
+    run to the writer or adds it to the route's summary.
+    """
+
+    def __init__(
+        self,
+        writer,
+        rate=TELEMETRY_SAMPLE_RATE,
+        route_rates=None,
+        summary_interval_s=TELEMETRY_SUMMARY_INTERVAL_S,
+    ):
+        self.writer = writer
+        self.rate = rate
+        self.route_rates = (
+            parse_route_rates(TELEMETRY_ROUTE_RATES)
+            if route_rates is None
+            else route_rates
+        )
+        self.summary_interval_s = summary_interval_s
+        self._summaries = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="telemetry-summary", daemon=True
+            )
+            self._thread.start()
+
+    def should_sample(self, route, error=False):
+        if error:
+            return True
+        return random.random() < self.route_rates.get(route, self.rate)
+
+    def record(self, route, params=None, metrics=None, artifacts=None, error=None):
+        params = dict(params or {})
+        metrics = dict(metrics or {})
+        if error is not None:
+            params["error"] = error
+        if self.should_sample(route, error is not None):
+            TELEMETRY_SAMPLING.labels(route=route, decision="sampled").inc()
+            self.writer.log(route, params=params, metrics=metrics, artifacts=artifacts)
+            return True
+
+        TELEMETRY_SAMPLING.labels(route=route, decision="summarized").inc()
+        with self._lock:
+            self._summaries.setdefault(route, _RouteSummary()).add(params, metrics)
+        return False
+
+    def flush(self):
+        """Write one summary run per route that saw unsampled requests."""
+        with self._lock:
+            summaries, self._summaries = self._summaries, {}
+        for route, summary in summaries.items():
+            params, metrics = summary.to_run()
+            self.writer.log(f"{route}_summary", params=params, metrics=metrics)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.summary_interval_s):
+            self.flush()
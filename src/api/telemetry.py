@@ -0,0 +1,267 @@
+# src/api/telemetry.py
+# Background MLflow writer for the API hot path. Handlers hand records to
+# TelemetryWriter.log(), which never blocks: records go on a queue bounded
+# by record count and by artifact bytes (and are dropped, counted, when it
+# is full). A worker thread drains the queue and writes each record as one
+# MLflow run with a single log_batch call plus its artifacts. If the
+# tracking server fails, records are spooled to local disk, up to a size
+# cap, and replayed once it answers again.
+
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+
+# fail fast instead of stalling the writer on a slow tracking server
+os.environ.setdefault("MLFLOW_HTTP_REQUEST_TIMEOUT", "10")
+os.environ.setdefault("MLFLOW_HTTP_REQUEST_MAX_RETRIES", "1")
+
+from mlflow.entities import Metric, Param  # noqa: E402
+from mlflow.tracking import MlflowClient  # noqa: E402
+
+from src.api.metrics import (  # noqa: E402
+    TELEMETRY_DROPPED,
+    TELEMETRY_QUEUE_BYTES,
+    TELEMETRY_QUEUE_DEPTH,
+    TELEMETRY_SPOOLED,
+    TELEMETRY_WRITTEN,
+)
+
+TELEMETRY_QUEUE_SIZE = int(os.getenv("CHROMA_TELEMETRY_QUEUE_SIZE", "1000"))
+# artifacts (uploaded images) are most of a record's size
+TELEMETRY_QUEUE_BYTES_MAX = int(os.getenv("CHROMA_TELEMETRY_QUEUE_BYTES", "67108864"))
+TELEMETRY_BATCH_SIZE = int(os.getenv("CHROMA_TELEMETRY_BATCH_SIZE", "50"))
+TELEMETRY_FLUSH_INTERVAL_S = float(os.getenv("CHROMA_TELEMETRY_FLUSH_S", "2"))
+TELEMETRY_SPOOL_DIR = os.getenv("CHROMA_TELEMETRY_SPOOL_DIR", "mlruns_spool")
+TELEMETRY_SPOOL_BYTES_MAX = int(os.getenv("CHROMA_TELEMETRY_SPOOL_BYTES", "1073741824"))
+# after a failed write, spool without trying the server for this long
+TELEMETRY_BACKOFF_S = float(os.getenv("CHROMA_TELEMETRY_BACKOFF_S", "30"))
+
+
+class TelemetryWriter:
+    def __init__(
+        self,
+        experiment_name,
+        max_queue=TELEMETRY_QUEUE_SIZE,
+        max_queue_bytes=TELEMETRY_QUEUE_BYTES_MAX,
+        batch_size=TELEMETRY_BATCH_SIZE,
+        flush_interval_s=TELEMETRY_FLUSH_INTERVAL_S,
+        spool_dir=TELEMETRY_SPOOL_DIR,
+        backoff_s=TELEMETRY_BACKOFF_S,
+        max_spool_bytes=TELEMETRY_SPOOL_BYTES_MAX,
+    ):
+        self.experiment_name = experiment_name
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.spool_dir = spool_dir
+        self.backoff_s = backoff_s
+        self.max_queue_bytes = max_queue_bytes
+        self.max_spool_bytes = max_spool_bytes
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._queued_bytes = 0
+        self._bytes_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._client = None
+        self._experiment_id = None
+        self._down_until = 0.0
+        TELEMETRY_QUEUE_DEPTH.set_function(self._queue.qsize)
+        TELEMETRY_QUEUE_BYTES.set_function(lambda: self._queued_bytes)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="telemetry-writer", daemon=True
+            )
+            self._thread.start()
+
+    def log(self, run_name, params=None, metrics=None, artifacts=None):
+        """
+        Queue one MLflow run. artifacts is a list of (filename, bytes).
+        Returns False if the record was dropped because the queue is full.
+        """
+        artifacts = list(artifacts or [])
+        size = sum(len(data) for _, data in artifacts)
+        with self._bytes_lock:
+            if self._queued_bytes + size > self.max_queue_bytes:
+                TELEMETRY_DROPPED.labels(reason="queue_bytes").inc()
+                return False
+            self._queued_bytes += size
+        record = {
+            "run_name": run_name,
+            "timestamp_ms": int(time.time() * 1000),
+            "params": {k: str(v) for k, v in (params or {}).items()},
+            "metrics": {k: float(v) for k, v in (metrics or {}).items()},
+            "artifacts": artifacts,
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._release(size)
+            TELEMETRY_DROPPED.labels(reason="queue_full").inc()
+            return False
+        return True
+
+    def _release(self, size):
+        with self._bytes_lock:
+            self._queued_bytes -= size
+
+    def close(self, timeout=10):
+        """Stop the worker after it has flushed everything queued so far."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ---------- worker ----------
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write_batch(batch)
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval_s)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        # dequeued records no longer count against max_queue_bytes
+        self._release(sum(len(data) for r in batch for _, data in r["artifacts"]))
+        return batch
+
+    def _write_batch(self, batch):
+        if time.monotonic() < self._down_until:
+            self._spool(batch)
+            return
+        for i, record in enumerate(batch):
+            try:
+                self._write_record(record)
+            except Exception as e:
+                print("Telemetry write failed, spooling:", e)
+                self._down_until = time.monotonic() + self.backoff_s
+                self._spool(batch[i:])
+                return
+        self._replay_spool()
+
+    def _write_record(self, record):
+        client = self._get_client()
+        run = client.create_run(
+            self._experiment_id,
+            start_time=record["timestamp_ms"],
+            run_name=record["run_name"],
+        )
+        run_id = run.info.run_id
+        client.log_batch(
+            run_id,
+            metrics=[
+                Metric(k, v, record["timestamp_ms"], 0)
+                for k, v in record["metrics"].items()
+            ],
+            params=[Param(k, v) for k, v in record["params"].items()],
+        )
+        if record["artifacts"]:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                for filename, data in record["artifacts"]:
+                    path = os.path.join(tmp_dir, os.path.basename(filename))
+                    with open(path, "wb") as f:
+                        f.write(data)
+                    client.log_artifact(run_id, path)
+        client.set_terminated(run_id)
+        TELEMETRY_WRITTEN.inc()
+
+    def _get_client(self):
+        if self._client is None:
+            client = MlflowClient()
+            experiment = client.get_experiment_by_name(self.experiment_name)
+            if experiment is None:
+                self._experiment_id = client.create_experiment(self.experiment_name)
+            else:
+                self._experiment_id = experiment.experiment_id
+            self._client = client
+        return self._client
+
+    # ---------- local spool ----------
+    def _spool_path(self):
+        return os.path.join(self.spool_dir, "records.jsonl")
+
+    def _spool_bytes(self):
+        total = 0
+        for root, _, files in os.walk(self.spool_dir):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass  # a replayed artifact removed meanwhile
+        return total
+
+    def _spool(self, records):
+        """Append records to the spool; those past max_spool_bytes are dropped."""
+        os.makedirs(os.path.join(self.spool_dir, "artifacts"), exist_ok=True)
+        used = self._spool_bytes()
+        spooled = 0
+        with open(self._spool_path(), "a") as f:
+            for record in records:
+                artifacts = [
+                    [
+                        filename,
+                        os.path.join(
+                            self.spool_dir,
+                            "artifacts",
+                            f"{uuid.uuid4().hex}_{os.path.basename(filename)}",
+                        ),
+                    ]
+                    for filename, _ in record["artifacts"]
+                ]
+                line = json.dumps({**record, "artifacts": artifacts}) + "\n"
+                size = len(line) + sum(len(data) for _, data in record["artifacts"])
+                if used + size > self.max_spool_bytes:
+                    TELEMETRY_DROPPED.labels(reason="spool_full").inc()
+                    continue
+                for (_, path), (_, data) in zip(artifacts, record["artifacts"]):
+                    with open(path, "wb") as af:
+                        af.write(data)
+                f.write(line)
+                used += size
+                spooled += 1
+        TELEMETRY_SPOOLED.inc(spooled)
+
+    def _replay_spool(self):
+        spool_path = self._spool_path()
+        if not os.path.exists(spool_path):
+            return
+        # claim the file first so new failures start a fresh spool
+        replay_path = f"{spool_path}.{uuid.uuid4().hex}.replay"
+        os.replace(spool_path, replay_path)
+        with open(replay_path) as f:
+            lines = [line for line in f if line.strip()]
+
+        for i, line in enumerate(lines):
+            record = json.loads(line)
+            artifact_paths = [path for _, path in record["artifacts"]]
+            record["artifacts"] = [
+                (filename, _read_bytes(path)) for filename, path in record["artifacts"]
+            ]
+            try:
+                self._write_record(record)
+            except Exception as e:
+                print("Telemetry replay failed, keeping spool:", e)
+                self._down_until = time.monotonic() + self.backoff_s
+                # put the rest back untouched; their artifacts stay on disk
+                with open(spool_path, "a") as f:
+                    f.writelines(lines[i:])
+                break
+            for path in artifact_paths:
+                os.remove(path)
+        os.remove(replay_path)
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
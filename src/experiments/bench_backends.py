@@ -0,0 +1,95 @@
+# experiments/bench_backends.py
+# Parity, latency and memory of the Segformer inference backends on
+# data/images. Run `python -m src.models.export --format all --quantize`
+# first. Parity is label-map agreement with eager torch fp32: the share of
+# pixels with the same label, and mean IoU over the classes analyze_image
+# reads (skin, eyes, hair).
+#
+# Usage: python -m src.experiments.bench_backends --images 20
+import argparse
+import glob
+import multiprocessing as mp
+import os
+import resource
+import time
+
+import numpy as np
+
+IMAGE_DIR = "data/images"
+BACKENDS = [
+    ("torch", "fp32"),
+    ("torchscript", "fp32"),
+    ("torchscript", "int8"),
+    ("onnxruntime", "fp32"),
+    ("onnxruntime", "int8"),
+]
+CLASSES = [1, 4, 5, 13]
+
+
+def _run_backend(backend, variant, paths, queue):
+    os.environ["CHROMA_INFERENCE_BACKEND"] = backend
+    os.environ["CHROMA_MODEL_VARIANT"] = variant
+    from src.models.chroma_model import load_image, segment_image
+
+    try:
+        start = time.perf_counter()
+        segment_image(load_image(np.zeros((64, 64, 3), dtype=np.uint8)))
+        load_s = time.perf_counter() - start
+
+        labels, seconds = [], []
+        for path in paths:
+            image = load_image(path)
+            start = time.perf_counter()
+            labels.append(segment_image(image))
+            seconds.append(time.perf_counter() - start)
+    except Exception as e:
+        queue.put(e)
+        return
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put((labels, seconds, load_s, peak_mb))
+
+
+def _mean_iou(a, b):
+    ious = []
+    for cls in CLASSES:
+        union = np.sum((a == cls) | (b == cls))
+        if union:
+            ious.append(np.sum((a == cls) & (b == cls)) / union)
+    return np.mean(ious)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(f"{IMAGE_DIR}/*.jpg"))[: args.images]
+    ctx = mp.get_context("spawn")
+    results = {}
+    for backend, variant in BACKENDS:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_backend, args=(backend, variant, paths, queue))
+        proc.start()
+        results[(backend, variant)] = queue.get()
+        proc.join()
+
+    reference = results[("torch", "fp32")][0]
+    print(f"{len(paths)} images, parity against torch fp32")
+    print(
+        f"{'backend':<22}{'load s':>8}{'mean s':>9}{'p95 s':>8}"
+        f"{'peak MB':>9}{'pixels':>9}{'mIoU':>8}"
+    )
+    for (backend, variant), result in results.items():
+        name = f"{backend}/{variant}"
+        if isinstance(result, Exception):
+            print(f"{name:<22}skipped: {result}")
+            continue
+        labels, seconds, load_s, peak_mb = result
+        pixels = np.mean([np.mean(a == b) for a, b in zip(labels, reference)])
+        miou = np.mean([_mean_iou(a, b) for a, b in zip(labels, reference)])
+        print(
+            f"{name:<22}{load_s:>8.1f}{np.mean(seconds):>9.3f}"
+            f"{np.percentile(seconds, 95):>8.3f}{peak_mb:>9.0f}"
+            f"{pixels:>9.2%}{miou:>8.3f}"
+        )
@@ -0,0 +1,69 @@
+# experiments/bench_dominant_color.py
+# Compares the dominant-colour strategies on data/images: how often the
+# MST / eye / hair labels agree with the exact KMeans strategy, and how long
+# the four region extractions take per image.
+#
+# Usage: python -m src.experiments.bench_dominant_color --images 20
+import argparse
+import glob
+import time
+
+import numpy as np
+from PIL import Image
+
+from src.models.chroma_model import (
+    DOMINANT_COLOR_STRATEGIES,
+    HAIR_PALETTE,
+    IRIS_PALETTE,
+    MONK_PALETTE,
+    extract_region_lab,
+    segment_image,
+)
+
+IMAGE_DIR = "data/images"
+REGIONS = {"skin": 1, "left_eye": 4, "right_eye": 5, "hair": 13}
+
+
+def label_regions(pred_seg, img_np, strategy):
+    labs = {
+        name: extract_region_lab(pred_seg == cls, img_np, strategy=strategy)
+        for name, cls in REGIONS.items()
+    }
+    return {
+        "mst": MONK_PALETTE.closest(labs["skin"]),
+        "eyes": tuple(IRIS_PALETTE.classify([labs["left_eye"], labs["right_eye"]])),
+        "hair": HAIR_PALETTE.closest(labs["hair"]),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(f"{IMAGE_DIR}/*.jpg"))[: args.images]
+    timings = {name: [] for name in DOMINANT_COLOR_STRATEGIES}
+    labels = {name: [] for name in DOMINANT_COLOR_STRATEGIES}
+
+    for path in paths:
+        image = Image.open(path).convert("RGB")
+        pred_seg = segment_image(image)
+        img_np = np.array(image)
+        for name in DOMINANT_COLOR_STRATEGIES:
+            start = time.perf_counter()
+            labels[name].append(label_regions(pred_seg, img_np, name))
+            timings[name].append(time.perf_counter() - start)
+
+    exact = labels["kmeans"]
+    print(f"{len(paths)} images, agreement with strategy 'kmeans'")
+    print(f"{'strategy':<12}{'mean s':>9}{'p95 s':>9}{'MST':>8}{'eyes':>8}{'hair':>8}")
+    for name in DOMINANT_COLOR_STRATEGIES:
+        agree = {
+            field: np.mean([a[field] == b[field] for a, b in zip(labels[name], exact)])
+            for field in ("mst", "eyes", "hair")
+        }
+        print(
+            f"{name:<12}{np.mean(timings[name]):>9.3f}"
+            f"{np.percentile(timings[name], 95):>9.3f}"
+            f"{agree['mst']:>8.0%}{agree['eyes']:>8.0%}{agree['hair']:>8.0%}"
+        )
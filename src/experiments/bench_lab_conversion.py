@@ -0,0 +1,52 @@
+# experiments/bench_lab_conversion.py
+# Per-image timing of the scalar rgb2lab loop vs the batched rgb2lab_array
+# in its "exact" and "lut" modes.
+#
+# Usage: python -m src.experiments.bench_lab_conversion --images 3
+import argparse
+import glob
+import time
+
+import numpy as np
+from PIL import Image
+
+from src.models.chroma_model import _ensure_lab_lut_loaded, rgb2lab, rgb2lab_array
+
+IMAGE_DIR = "data/images"
+
+
+def bench(paths):
+    rows = []
+    for path in paths:
+        pixels = np.array(Image.open(path).convert("RGB")).reshape(-1, 3)
+
+        start = time.perf_counter()
+        scalar = np.array([rgb2lab(p) for p in pixels])
+        scalar_s = time.perf_counter() - start
+
+        row = [path, len(pixels), scalar_s]
+        for mode in ("exact", "lut"):
+            start = time.perf_counter()
+            batched = rgb2lab_array(pixels, mode=mode)
+            row += [time.perf_counter() - start, float(np.abs(batched - scalar).max())]
+        rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(f"{IMAGE_DIR}/*.jpg"))[: args.images]
+    # build/map the table up front so its one-off cost isn't charged to an image
+    _ensure_lab_lut_loaded()
+    print(
+        f"{'image':<28}{'pixels':>10}{'scalar s':>10}"
+        f"{'exact s':>10}{'exact err':>11}{'lut s':>9}{'lut err':>10}"
+    )
+    for path, n, scalar_s, exact_s, exact_err, lut_s, lut_err in bench(paths):
+        print(
+            f"{path:<28}{n:>10}{scalar_s:>10.3f}"
+            f"{exact_s:>10.4f}{exact_err:>11.1e}{lut_s:>9.4f}{lut_err:>10.1e}"
+        )
@@ -0,0 +1,80 @@
+# experiments/bench_llm_client.py
+# Load test of the async LLM client against the local stub
+# (src/rag/llm_stub.py): N requests fired at once, queued by the client's
+# concurrency cap, with optional injected 429/503s. Runs the stub
+# in-process by default; pass --base-url to hit one served by uvicorn.
+#
+# Usage: python -m src.experiments.bench_llm_client --requests 200 --concurrency 16
+#        uvicorn src.rag.llm_stub:app --port 8088 &
+#        python -m src.experiments.bench_llm_client --base-url http://127.0.0.1:8088/v1
+import argparse
+import asyncio
+import time
+
+import httpx
+import numpy as np
+
+from src.rag.llm_client import AsyncLLMClient, LLMError
+from src.rag.llm_stub import create_app
+
+
+async def run(args):
+    app = None
+    transport = None
+    if not args.base_url:
+        app = create_app(latency_s=args.latency, error_rate=args.error_rate)
+        transport = httpx.ASGITransport(app=app)
+    client = AsyncLLMClient(
+        api_key="stub",
+        base_url=args.base_url or "http://llm-stub/v1",
+        concurrency=args.concurrency,
+        backoff_s=0.05,
+        transport=transport,
+    )
+
+    async def one(i):
+        start = time.perf_counter()
+        try:
+            await client.complete(
+                [{"role": "user", "content": f"profile {i}"}],
+                model="stub",
+                max_tokens=350,
+                temperature=0.3,
+            )
+            return time.perf_counter() - start, True
+        except LLMError:
+            return time.perf_counter() - start, False
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(args.requests)))
+    wall = time.perf_counter() - start
+    await client.aclose()
+
+    latencies = np.array([seconds for seconds, _ in results])
+    failed = sum(not ok for _, ok in results)
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}: "
+        f"{wall:.2f}s wall, {args.requests / wall:.1f} req/s, {failed} failed"
+    )
+    print(
+        f"latency p50 {np.percentile(latencies, 50):.3f}s, "
+        f"p95 {np.percentile(latencies, 95):.3f}s, max {latencies.max():.3f}s"
+    )
+    if app is not None:
+        stats = app.state.stats
+        print(
+            f"stub saw {stats['requests']} attempts, "
+            f"max {stats['max_in_flight']} in flight"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--base-url", help="a running stub, e.g. http://127.0.0.1:8088/v1"
+    )
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,113 @@
+# experiments/bench_monitoring_storage.py
+# Load time of the monitoring feature log as JSONL (monitor.py's old
+# line-by-line load_jsonl and pd.read_json(lines=True)) versus the
+# day-partitioned Parquet dataset from monitoring.dataset: full read, a
+# 3-column projection, and a projection restricted to one day.
+#
+# Usage: python -m src.experiments.bench_monitoring_storage --rows 1000000
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from monitoring import dataset
+
+UNDERTONES = ["Warm", "Neutral", "Cool"]
+HAIR = ["Black", "Dark Brown", "Brown", "Gray", "Dark Blonde", "Red", "Blonde"]
+EYES = ["Dark Brown", "Brown", "Dark Hazel", "Hazel", "Green", "Blue", "Gray"]
+
+
+def write_synthetic_log(path, rows, days=30, seed=0):
+    rng = np.random.default_rng(seed)
+    start = 1764806400
+    timestamps = np.sort(rng.integers(start, start + days * 86400, rows))
+    mst = rng.integers(1, 11, rows)
+    skin = rng.normal([60, 12, 18], [12, 4, 6], (rows, 3))
+    seconds = rng.lognormal(0, 0.5, rows)
+    with open(path, "w") as f:
+        for i in range(rows):
+            record = {
+                "sample_id": f"{i:07d}.jpg",
+                "timestamp": int(timestamps[i]),
+                "segmentation_success": True,
+                "skin_L": skin[i, 0],
+                "skin_a": skin[i, 1],
+                "skin_b": skin[i, 2],
+                "mst_level": int(mst[i]),
+                "tone_group": "Medium",
+                "descriptor": "Honey / Medium",
+                "undertone": UNDERTONES[i % 3],
+                "eye_color_left": EYES[i % 7],
+                "eye_color_right": EYES[i % 7],
+                "hair_color": HAIR[i % 7],
+                "processing_time_s": seconds[i],
+            }
+            f.write(json.dumps(record) + "\n")
+    return start
+
+
+def load_jsonl(path):
+    # monitor.py before monitoring.dataset
+    rows = []
+    with open(path) as f:
+        for line in f:
+            rows.append(json.loads(line))
+    return pd.DataFrame(rows)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def dir_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(path)
+        for f in files
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl = os.path.join(tmp, "current.jsonl")
+        parquet = os.path.join(tmp, "parquet")
+        start = write_synthetic_log(jsonl, args.rows)
+        convert_s, _ = timed(
+            lambda: dataset.write_table(dataset.read_jsonl_table(jsonl), parquet)
+        )
+        print(
+            f"{args.rows} rows: JSONL {os.path.getsize(jsonl) / 2**20:.0f} MB, "
+            f"Parquet {dir_size(parquet) / 2**20:.0f} MB, convert {convert_s:.2f}s"
+        )
+
+        columns = ["timestamp", "skin_L", "undertone"]
+        cases = [
+            ("load_jsonl (json.loads)", lambda: load_jsonl(jsonl)),
+            ("pd.read_json(lines=True)", lambda: pd.read_json(jsonl, lines=True)),
+            ("parquet, all columns", lambda: dataset.read_dataframe(parquet)),
+            (
+                "parquet, 3 columns",
+                lambda: dataset.read_dataframe(parquet, columns=columns),
+            ),
+            (
+                "parquet, 3 columns, 1 day",
+                lambda: dataset.read_dataframe(
+                    parquet, columns=columns, start=start, end=start + 86400
+                ),
+            ),
+        ]
+        print(f"{'reader':<28}{'seconds':>9}{'rows':>10}{'frame MB':>10}")
+        for name, fn in cases:
+            seconds, frame = timed(fn)
+            mb = frame.memory_usage(deep=True).sum() / 2**20
+            print(f"{name:<28}{seconds:>9.2f}{len(frame):>10}{mb:>10.0f}")
@@ -0,0 +1,100 @@
+# experiments/bench_region_extraction.py
+# Region colour extraction on a synthetic portrait-like label map: one
+# boolean mask and extract_region_lab per region (the old analyze_image
+# path) versus the single-pass extract_regions_lab. "pixels+Lab" times only
+# the pixel gather and Lab conversion, "total" adds the dominant colour
+# step. --extra adds lips and brows to the four analysed regions. No model
+# needed.
+#
+# Usage: python -m src.experiments.bench_region_extraction --size 2048 --strategy histogram
+import argparse
+import time
+
+import numpy as np
+
+from src.models.chroma_model import (
+    ANALYSIS_REGIONS,
+    class_pixels,
+    extract_region_lab,
+    extract_regions_lab,
+    rgb2lab_array,
+)
+
+
+def synthetic_portrait(size, seed=0):
+    h, w = size, size * 3 // 4
+    yy, xx = np.mgrid[:h, :w]
+    pred_seg = np.zeros((h, w), dtype=np.uint8)
+    face = ((yy - h * 0.55) / (h * 0.3)) ** 2 + ((xx - w / 2) / (w * 0.3)) ** 2 < 1
+    pred_seg[yy < h * 0.35] = 13
+    pred_seg[face] = 1
+    for cx in (0.4, 0.6):
+        eye = ((yy - h * 0.5) / (h * 0.02)) ** 2 + ((xx - w * cx) / (w * 0.05)) ** 2
+        pred_seg[eye < 1] = 4 if cx < 0.5 else 5
+        brow = ((yy - h * 0.45) / (h * 0.01)) ** 2 + ((xx - w * cx) / (w * 0.07)) ** 2
+        pred_seg[brow < 1] = 6 if cx < 0.5 else 7
+    lips = ((yy - h * 0.72) / (h * 0.02)) ** 2 + ((xx - w / 2) / (w * 0.08)) ** 2 < 1
+    pred_seg[lips & (yy < h * 0.72)] = 11
+    pred_seg[lips & (yy >= h * 0.72)] = 12
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+    return pred_seg, image
+
+
+def per_mask(pred_seg, image, regions, strategy):
+    return {
+        name: extract_region_lab(np.isin(pred_seg, ids), image, strategy=strategy)
+        for name, ids in regions.items()
+    }
+
+
+def per_mask_pixels(pred_seg, image, regions):
+    return [rgb2lab_array(image[np.isin(pred_seg, ids)]) for ids in regions.values()]
+
+
+def single_pass_pixels(pred_seg, image, regions):
+    class_ids = sorted({c for ids in regions.values() for c in ids})
+    return rgb2lab_array(class_pixels(pred_seg, image, class_ids)[1])
+
+
+def best_of(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--strategy", default="histogram")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--extra", action="store_true", help="add lips and brows")
+    args = parser.parse_args()
+
+    regions = dict(ANALYSIS_REGIONS)
+    if args.extra:
+        regions.update(lips=[11, 12], brows=[6, 7])
+    pred_seg, image = synthetic_portrait(args.size)
+
+    old_px, _ = best_of(lambda: per_mask_pixels(pred_seg, image, regions), args.repeats)
+    new_px, _ = best_of(
+        lambda: single_pass_pixels(pred_seg, image, regions), args.repeats
+    )
+    old_s, old = best_of(
+        lambda: per_mask(pred_seg, image, regions, args.strategy), args.repeats
+    )
+    new_s, new = best_of(
+        lambda: extract_regions_lab(pred_seg, image, regions, strategy=args.strategy),
+        args.repeats,
+    )
+    diff = max(float(np.max(np.abs(old[n] - new[n]))) for n in regions)
+    print(
+        f"{image.shape[1]}x{image.shape[0]}, {len(regions)} regions, "
+        f"strategy={args.strategy}, max abs diff {diff:.2e}"
+    )
+    print(f"{'':<13}{'pixels+Lab ms':>14}{'total ms':>10}")
+    print(f"{'per-mask':<13}{old_px * 1000:>14.1f}{old_s * 1000:>10.1f}")
+    print(f"{'single-pass':<13}{new_px * 1000:>14.1f}{new_s * 1000:>10.1f}")
@@ -0,0 +1,46 @@
+# experiments/bench_resolution.py
+# Latency / accuracy of analyze_image across working resolutions on
+# data/images. Accuracy is agreement with the full-resolution result.
+#
+# Usage: python -m src.experiments.bench_resolution --images 20
+import argparse
+import glob
+import time
+
+import numpy as np
+
+from src.models.chroma_model import analyze_image
+
+IMAGE_DIR = "data/images"
+MAX_SIDES = [0, 768, 512, 384, 256]
+FIELDS = ["skin_tone", "undertone", "eye_color", "hair_color"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(f"{IMAGE_DIR}/*.jpg"))[: args.images]
+    results = {max_side: [] for max_side in MAX_SIDES}
+    timings = {max_side: [] for max_side in MAX_SIDES}
+    for path in paths:
+        for max_side in MAX_SIDES:
+            start = time.perf_counter()
+            results[max_side].append(analyze_image(path, max_side=max_side))
+            timings[max_side].append(time.perf_counter() - start)
+
+    full = results[0]
+    print(f"{len(paths)} images, agreement with full resolution")
+    header = "".join(f"{field:>12}" for field in FIELDS)
+    print(f"{'max_side':<10}{'working':>11}{'mean s':>9}{header}")
+    for max_side in MAX_SIDES:
+        working = results[max_side][0]["metadata"]["working_size"]
+        agree = "".join(
+            f"{np.mean([a[f] == b[f] for a, b in zip(results[max_side], full)]):>12.0%}"
+            for f in FIELDS
+        )
+        print(
+            f"{max_side or 'full':<10}{'x'.join(map(str, working)):>11}"
+            f"{np.mean(timings[max_side]):>9.2f}{agree}"
+        )
@@ -0,0 +1,71 @@
+# experiments/bench_segmentation_memory.py
+# Peak RSS and latency of segment_image under each CHROMA_SEGMENTATION_MODE,
+# plus label agreement with the "full" mode. Every mode runs in a fresh
+# process so ru_maxrss reflects that mode alone.
+#
+# Usage: python -m src.experiments.bench_segmentation_memory --images 5 --upscale 3
+import argparse
+import glob
+import multiprocessing as mp
+import os
+import resource
+import time
+
+import numpy as np
+
+IMAGE_DIR = "data/images"
+MODES = ["full", "tiled", "nearest"]
+
+
+def _run_mode(mode, paths, upscale, max_side, queue):
+    os.environ["CHROMA_SEGMENTATION_MODE"] = mode
+    os.environ["CHROMA_SEGMENTATION_MAX_SIDE"] = str(max_side)
+    from src.models.chroma_model import load_image, segment_image
+
+    # load the model first so its weights aren't charged to the mode
+    segment_image(load_image(np.zeros((64, 64, 3), dtype=np.uint8)))
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    labels, seconds = [], []
+    for path in paths:
+        image = load_image(path)
+        # upscale the 1024px samples towards phone-photo sizes
+        image = image.resize((image.width * upscale, image.height * upscale))
+        start = time.perf_counter()
+        labels.append(segment_image(image))
+        seconds.append(time.perf_counter() - start)
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((labels, seconds, baseline_kb, peak_kb))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=5)
+    parser.add_argument("--upscale", type=int, default=3)
+    parser.add_argument("--max-side", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(f"{IMAGE_DIR}/*.jpg"))[: args.images]
+    ctx = mp.get_context("spawn")
+    results = {}
+    for mode in MODES:
+        queue = ctx.Queue()
+        proc = ctx.Process(
+            target=_run_mode, args=(mode, paths, args.upscale, args.max_side, queue)
+        )
+        proc.start()
+        results[mode] = queue.get()
+        proc.join()
+
+    full_labels = results["full"][0]
+    print(f"{len(paths)} images at {args.upscale}x, max_side={args.max_side}")
+    print(
+        f"{'mode':<10}{'peak RSS MB':>13}{'over model MB':>15}{'mean s':>9}{'agree':>9}"
+    )
+    for mode, (labels, seconds, baseline_kb, peak_kb) in results.items():
+        agree = np.mean([np.mean(a == b) for a, b in zip(labels, full_labels)])
+        print(
+            f"{mode:<10}{peak_kb / 1024:>13.0f}{(peak_kb - baseline_kb) / 1024:>15.0f}"
+            f"{np.mean(seconds):>9.3f}{agree:>9.2%}"
+        )
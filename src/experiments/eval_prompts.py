@@ -12,10 +12,13 @@ import mlflow
 # -------------------------
 load_dotenv()
 
+
 def get_client():
     from groq import Groq
+
     return Groq(api_key=os.getenv("GROQ_API_KEY"))
 
+
 client = get_client()
 
 # -------------------------
@@ -0,0 +1,72 @@
+# experiments/load_test_health.py
+# Measures /health latency on a running API, first idle and then while
+# /analyze is saturated with concurrent uploads. With inference off the
+# event loop the two rows should look alike; /analyze answers beyond the
+# executor's capacity come back as 503.
+#
+# Usage: python -m src.experiments.load_test_health --url http://localhost:8000
+import argparse
+import asyncio
+import collections
+import time
+
+import httpx
+import numpy as np
+
+
+async def poll_health(client, stop, latencies, interval=0.1):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+
+
+async def hammer_analyze(client, stop, image_bytes, statuses):
+    while not stop.is_set():
+        files = {"file": ("load.jpg", image_bytes, "image/jpeg")}
+        r = await client.post("/analyze", files=files)
+        statuses[r.status_code] += 1
+        if r.status_code == 503:
+            await asyncio.sleep(float(r.headers.get("Retry-After", 1)))
+
+
+async def phase(client, duration, concurrency, image_bytes):
+    stop = asyncio.Event()
+    latencies, statuses = [], collections.Counter()
+    tasks = [asyncio.create_task(poll_health(client, stop, latencies))]
+    tasks += [
+        asyncio.create_task(hammer_analyze(client, stop, image_bytes, statuses))
+        for _ in range(concurrency)
+    ]
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return latencies, statuses
+
+
+async def main(args):
+    with open(args.image, "rb") as f:
+        image_bytes = f.read()
+    async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+        print(
+            f"{'phase':<12}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}  /analyze statuses"
+        )
+        for name, concurrency in (("idle", 0), ("saturated", args.concurrency)):
+            latencies, statuses = await phase(
+                client, args.duration, concurrency, image_bytes
+            )
+            ms = np.array(latencies) * 1000
+            print(
+                f"{name:<12}{np.percentile(ms, 50):>9.1f}{np.percentile(ms, 95):>9.1f}"
+                f"{ms.max():>9.1f}  {dict(statuses)}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--image", default="data/images/000009.jpg")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    asyncio.run(main(parser.parse_args()))
@@ -1,29 +1,166 @@
 # src/model/chroma_model.py
 # Slightly refactored version of your analyze_image function for reuse.
-# Exposes analyze_image(image_path) -> dict result.
+# Exposes analyze_image(image_path) -> dict result and the batched
+# analyze_images(images, batch_size) -> list of dict results.
 
 import torch
 from transformers import SegformerImageProcessor, AutoModelForSemanticSegmentation
 from PIL import Image
 import numpy as np
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
+import hashlib
+import io
 import math
+import os
+import threading
+import time
+import uuid
 
 _processor = None
 _model = None
+_backend = None
+_load_lock = threading.Lock()
+_lab_lut = None
+_lab_lut_lock = threading.Lock()
+
+MODEL_NAME = "jonathandinu/face-parsing"
+
+# Runtime for the Segformer forward pass: "torch" (eager), "torchscript" or
+# "onnxruntime". The last two load the files written by
+# `python -m src.models.export`; CHROMA_MODEL_VARIANT=int8 selects the
+# dynamically quantized export.
+INFERENCE_BACKEND = os.getenv("CHROMA_INFERENCE_BACKEND", "torch")
+MODEL_VARIANT = os.getenv("CHROMA_MODEL_VARIANT", "fp32")
+EXPORT_DIR = os.getenv(
+    "CHROMA_EXPORT_DIR", os.path.join(os.path.dirname(__file__), "exported")
+)
+
+# "exact" converts every pixel with rgb2lab_array, "lut" gathers from a
+# precomputed 256^3 float16 table (see _ensure_lab_lut_loaded).
+LAB_CONVERSION_MODE = os.getenv("CHROMA_LAB_MODE", "exact")
+LAB_LUT_PATH = os.getenv(
+    "CHROMA_LAB_LUT_PATH", os.path.join(os.path.dirname(__file__), "rgb2lab_lut.f16")
+)
+# float16 spacing is 1/16 for |x| in [64, 128) and sRGB Lab stays within
+# that range, so rounding to the table costs at most half a step.
+LAB_LUT_MAX_ABS_ERROR = 1 / 32
+
+# How extract_region_lab picks a region's dominant colour, see
+# DOMINANT_COLOR_STRATEGIES.
+DOMINANT_COLOR_STRATEGY = os.getenv("CHROMA_DOMINANT_STRATEGY", "kmeans")
+DOMINANT_PIXEL_BUDGET = int(os.getenv("CHROMA_DOMINANT_PIXEL_BUDGET", "20000"))
+HISTOGRAM_BIN_SIZE = float(os.getenv("CHROMA_HISTOGRAM_BIN_SIZE", "4"))
+
+# Longest side / pixel count images are downscaled to before analysis
+# (0 = analyze at full resolution).
+MAX_SIDE = int(os.getenv("CHROMA_MAX_SIDE", "0"))
+MAX_PIXELS = int(os.getenv("CHROMA_MAX_PIXELS", "0"))
+
+# Images per Segformer forward pass in analyze_images.
+ANALYZE_BATCH_SIZE = int(os.getenv("CHROMA_BATCH_SIZE", "8"))
+
+# How logits become a full-size label map:
+#   "full"    bilinear-upsample all class logits at once (largest memory spike)
+#   "tiled"   same bilinear result, computed SEGMENTATION_TILE_ROWS rows at a time
+#   "nearest" argmax at logit resolution, nearest-neighbour to image size
+SEGMENTATION_MODE = os.getenv("CHROMA_SEGMENTATION_MODE", "tiled")
+SEGMENTATION_TILE_ROWS = int(os.getenv("CHROMA_SEGMENTATION_TILE_ROWS", "64"))
+# Longest side the label map is computed at (0 = image size); larger
+# images get it mapped back to image coordinates by nearest neighbour.
+SEGMENTATION_MAX_SIDE = int(os.getenv("CHROMA_SEGMENTATION_MAX_SIDE", "0"))
+
+# Bump when the fields analyze_image returns change, so cached results
+# from older code are not served.
+RESULT_SCHEMA_VERSION = 2
+
+
+def _ensure_processor_loaded():
+    global _processor
+    if _processor is None:
+        _processor = SegformerImageProcessor.from_pretrained(MODEL_NAME, use_fast=True)
+    return _processor
 
 
 def _ensure_model_loaded():
-    global _processor, _model
-    if _processor is None or _model is None:
+    global _model
+    processor = _ensure_processor_loaded()
+    if _model is None:
         # you can change the HF model name if needed
-        _processor = SegformerImageProcessor.from_pretrained(
-            "jonathandinu/face-parsing", use_fast=True
-        )
-        _model = AutoModelForSemanticSegmentation.from_pretrained(
-            "jonathandinu/face-parsing"
+        _model = AutoModelForSemanticSegmentation.from_pretrained(MODEL_NAME)
+    return processor, _model
+
+
+def exported_model_path(backend, variant=None):
+    """Where src.models.export writes (and the backends load) a model file."""
+    variant = variant or MODEL_VARIANT
+    extension = {"torchscript": "pt", "onnxruntime": "onnx"}[backend]
+    suffix = "" if variant == "fp32" else f".{variant}"
+    return os.path.join(EXPORT_DIR, f"face-parsing{suffix}.{extension}")
+
+
+def _ensure_backend_loaded():
+    """
+    Processor plus a pixel_values -> logits callable for INFERENCE_BACKEND.
+    """
+    global _backend
+    if _backend is None:
+        # API warm-up and the first requests can race to load the model
+        with _load_lock:
+            if _backend is None:
+                _backend = _load_backend()
+    return _backend
+
+
+def _load_backend():
+    if INFERENCE_BACKEND == "torch":
+        processor, model = _ensure_model_loaded()
+
+        def run_logits(pixel_values):
+            return model(pixel_values=pixel_values).logits
+
+    elif INFERENCE_BACKEND == "torchscript":
+        processor = _ensure_processor_loaded()
+        run_logits = torch.jit.load(exported_model_path("torchscript")).eval()
+
+    elif INFERENCE_BACKEND == "onnxruntime":
+        import onnxruntime as ort
+
+        processor = _ensure_processor_loaded()
+        session = ort.InferenceSession(
+            exported_model_path("onnxruntime"), providers=["CPUExecutionProvider"]
         )
-    return _processor, _model
+
+        def run_logits(pixel_values):
+            feeds = {"pixel_values": pixel_values.numpy()}
+            return torch.from_numpy(session.run(["logits"], feeds)[0])
+
+    else:
+        raise ValueError(f"Unknown inference backend: {INFERENCE_BACKEND}")
+
+    return processor, run_logits
+
+
+def warm_up():
+    """
+    Load the model and push one dummy image through the whole analysis, so
+    the first real request doesn't pay for downloads, allocator growth or
+    lazy kernel init. Returns seconds spent per phase.
+    """
+    timings = {}
+    start = time.perf_counter()
+    _ensure_backend_loaded()
+    timings["model_load"] = time.perf_counter() - start
+
+    if LAB_CONVERSION_MODE == "lut":
+        # building the table takes a while; don't leave it to a request
+        start = time.perf_counter()
+        _ensure_lab_lut_loaded()
+        timings["lab_lut"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analyze_image(np.zeros((512, 512, 3), dtype=np.uint8))
+    timings["forward"] = time.perf_counter() - start
+    return timings
 
 
 def rgb2lab(rgb):
@@ -52,6 +189,110 @@ def rgb2lab(rgb):
     return np.array([L, a, b])
 
 
+# sRGB (D65) -> XYZ, rows already divided by the reference white so the
+# result is the normalised X/Xn, Y/Yn, Z/Zn that the Lab transfer expects.
+_RGB_TO_XYZ_N = (
+    np.array(
+        [
+            [0.4124, 0.3576, 0.1805],
+            [0.2126, 0.7152, 0.0722],
+            [0.0193, 0.1192, 0.9505],
+        ]
+    )
+    * (100.0 / np.array([95.047, 100.0, 108.883]))[:, None]
+)
+
+# sRGB transfer function for every 8-bit value (same arithmetic as rgb2lab)
+_SRGB_TO_LINEAR = np.arange(256) / 255.0
+_SRGB_TO_LINEAR = np.where(
+    _SRGB_TO_LINEAR > 0.04045,
+    ((_SRGB_TO_LINEAR + 0.055) / 1.055) ** 2.4,
+    _SRGB_TO_LINEAR / 12.92,
+)
+
+# Pixels converted per step; keeps the float64 temporaries cache-sized
+RGB2LAB_CHUNK = 65536
+
+
+def rgb2lab_array(pixels, dtype=np.float32, mode=None):
+    """
+    Batched version of rgb2lab.
+
+    pixels: (N, 3) array of 8-bit sRGB values.
+    mode: "exact" or "lut", defaults to LAB_CONVERSION_MODE.
+    Returns an (N, 3) array of CIELAB values, matching rgb2lab per row
+    (within LAB_LUT_MAX_ABS_ERROR in "lut" mode).
+    """
+    mode = mode or LAB_CONVERSION_MODE
+    if mode == "lut":
+        return _rgb2lab_lut(pixels).astype(dtype)
+    if mode != "exact":
+        raise ValueError(f"Unknown Lab conversion mode: {mode}")
+
+    pixels = np.asarray(pixels).reshape(-1, 3)
+    if len(pixels) <= RGB2LAB_CHUNK:
+        return _rgb2lab_exact(pixels).astype(dtype, copy=False)
+    lab = np.empty(pixels.shape, dtype=dtype)
+    for start in range(0, len(pixels), RGB2LAB_CHUNK):
+        chunk = pixels[start : start + RGB2LAB_CHUNK]
+        lab[start : start + RGB2LAB_CHUNK] = _rgb2lab_exact(chunk)
+    return lab
+
+
+def _rgb2lab_exact(pixels):
+    if pixels.dtype == np.uint8:
+        rgb = _SRGB_TO_LINEAR[pixels]
+    else:
+        rgb = pixels.astype(np.float64) / 255.0
+        rgb = np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+
+    xyz = rgb @ _RGB_TO_XYZ_N.T
+    xyz = np.where(xyz > 0.008856, np.cbrt(xyz), (7.787 * xyz) + (16 / 116))
+
+    lab = np.empty_like(xyz)
+    lab[:, 0] = (116 * xyz[:, 1]) - 16
+    lab[:, 1] = 500 * (xyz[:, 0] - xyz[:, 1])
+    lab[:, 2] = 200 * (xyz[:, 1] - xyz[:, 2])
+    return lab
+
+
+def _build_lab_lut(path):
+    """Write the full 256^3 sRGB -> Lab table as raw float16 (96 MB)."""
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    lut = np.memmap(tmp_path, dtype=np.float16, mode="w+", shape=(256**3, 3))
+    gb = np.stack(np.meshgrid(np.arange(256), np.arange(256), indexing="ij"), -1)
+    gb = gb.reshape(-1, 2)
+    for r in range(256):
+        # one red plane (65536 colours) at a time keeps the build small
+        plane = np.column_stack([np.full(len(gb), r), gb])
+        lut[r << 16 : (r + 1) << 16] = rgb2lab_array(plane, np.float64, "exact")
+    lut.flush()
+    del lut
+    # atomic so concurrent workers never map a half-written table
+    os.replace(tmp_path, path)
+
+
+def _ensure_lab_lut_loaded():
+    global _lab_lut
+    if _lab_lut is None:
+        # warm-up and the inference workers can race to build the table
+        with _lab_lut_lock:
+            if _lab_lut is None:
+                if not os.path.exists(LAB_LUT_PATH):
+                    _build_lab_lut(LAB_LUT_PATH)
+                # read-only mapping: every worker shares the same page-cache copy
+                _lab_lut = np.memmap(
+                    LAB_LUT_PATH, dtype=np.float16, mode="r", shape=(256**3, 3)
+                )
+    return _lab_lut
+
+
+def _rgb2lab_lut(pixels):
+    lut = _ensure_lab_lut_loaded()
+    rgb = np.asarray(pixels, dtype=np.uint32).reshape(-1, 3)
+    return lut[(rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]]
+
+
 def ciede2000(lab1, lab2):
     L1, a1, b1 = lab1
     L2, a2, b2 = lab2
@@ -108,29 +349,248 @@ def ciede2000(lab1, lab2):
     return delta_E
 
 
+def ciede2000_matrix(lab_a, lab_b):
+    """
+    Vectorized ciede2000: distances between every row of lab_a (N, 3) and
+    every row of lab_b (M, 3), returned as an (N, M) array.
+    """
+    lab_a = np.asarray(lab_a, dtype=np.float64).reshape(-1, 3)
+    lab_b = np.asarray(lab_b, dtype=np.float64).reshape(-1, 3)
+    L1, a1, b1 = (c[:, None] for c in lab_a.T)
+    L2, a2, b2 = (c[None, :] for c in lab_b.T)
+
+    C1 = np.hypot(a1, b1)
+    C2 = np.hypot(a2, b2)
+    C_bar7 = ((C1 + C2) / 2) ** 7
+    G = 0.5 * (1 - np.sqrt(C_bar7 / (C_bar7 + 25**7)))
+
+    a1p = a1 * (1 + G)
+    a2p = a2 * (1 + G)
+    C1p = np.hypot(a1p, b1)
+    C2p = np.hypot(a2p, b2)
+
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+
+    delta_Lp = L2 - L1
+    delta_Cp = C2p - C1p
+    dhp = h2p - h1p
+    dhp = np.where(dhp > 180, dhp - 360, np.where(dhp < -180, dhp + 360, dhp))
+    delta_Hp = 2 * np.sqrt(C1p * C2p) * np.sin(np.radians(dhp / 2))
+
+    L_bar = (L1 + L2) / 2
+    C_bar_p = (C1p + C2p) / 2
+    h_bar_p = (h1p + h2p) / 2
+    h_bar_p = np.where(np.abs(h1p - h2p) > 180, h_bar_p + 180, h_bar_p)
+
+    T = (
+        1
+        - 0.17 * np.cos(np.radians(h_bar_p - 30))
+        + 0.24 * np.cos(np.radians(2 * h_bar_p))
+        + 0.32 * np.cos(np.radians(3 * h_bar_p + 6))
+        - 0.20 * np.cos(np.radians(4 * h_bar_p - 63))
+    )
+
+    SL = 1 + (0.015 * ((L_bar - 50) ** 2)) / np.sqrt(20 + ((L_bar - 50) ** 2))
+    SC = 1 + 0.045 * C_bar_p
+    SH = 1 + 0.015 * C_bar_p * T
+
+    delta_theta = 30 * np.exp(-(((h_bar_p - 275) / 25) ** 2))
+    C_bar_p7 = C_bar_p**7
+    RC = 2 * np.sqrt(C_bar_p7 / (C_bar_p7 + 25**7))
+    RT = -np.sin(np.radians(2 * delta_theta)) * RC
+
+    return np.sqrt(
+        (delta_Lp / SL) ** 2
+        + (delta_Cp / SC) ** 2
+        + (delta_Hp / SH) ** 2
+        + RT * (delta_Cp / SC) * (delta_Hp / SH)
+    )
+
+
+class ColorPalette:
+    """
+    Reference colours held as one contiguous (M, 3) Lab array plus a
+    matching names array, so matching is a single ciede2000_matrix call.
+    """
+
+    def __init__(self, color_dict):
+        self.names = np.empty(len(color_dict), dtype=object)
+        self.names[:] = list(color_dict.keys())
+        self.lab = np.ascontiguousarray(
+            np.stack([np.asarray(v, dtype=np.float64) for v in color_dict.values()])
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def distances(self, lab_colors):
+        return ciede2000_matrix(lab_colors, self.lab)
+
+    def classify(self, lab_colors):
+        """Closest reference name for each row of an (N, 3) Lab array."""
+        return self.names[np.argmin(self.distances(lab_colors), axis=1)]
+
+    def closest(self, lab_color):
+        return self.classify(lab_color)[0]
+
+
 def find_closest_color(lab_color, color_dict):
-    min_dist = float("inf")
-    closest_name = None
-    for name, ref_lab in color_dict.items():
-        dist = ciede2000(lab_color, ref_lab)
-        if dist < min_dist:
-            min_dist = dist
-            closest_name = name
-    return closest_name
+    palette = (
+        color_dict if isinstance(color_dict, ColorPalette) else ColorPalette(color_dict)
+    )
+    return palette.closest(lab_color)
 
 
-def extract_region_lab(region_mask, image_np, k=2):
-    region_pixels = image_np[region_mask]
-    if len(region_pixels) == 0:
-        return np.array([0, 0, 0])
-    region_pixels_lab = np.array([rgb2lab(pixel) for pixel in region_pixels])
+def _dominant_kmeans(pixels_lab, k):
     kmeans = KMeans(n_clusters=k, n_init=10, random_state=42)
-    kmeans.fit(region_pixels_lab)
+    kmeans.fit(pixels_lab)
     unique, counts = np.unique(kmeans.labels_, return_counts=True)
     dominant_idx = unique[np.argmax(counts)]
     return kmeans.cluster_centers_[dominant_idx]
 
 
+def _dominant_minibatch(pixels_lab, k):
+    # cluster a fixed-size random sample, so cost no longer grows with the region
+    if len(pixels_lab) > DOMINANT_PIXEL_BUDGET:
+        rng = np.random.default_rng(42)
+        idx = rng.choice(len(pixels_lab), DOMINANT_PIXEL_BUDGET, replace=False)
+        pixels_lab = pixels_lab[idx]
+    if len(pixels_lab) < k:
+        return pixels_lab.mean(axis=0)
+    kmeans = MiniBatchKMeans(
+        n_clusters=k, n_init=3, batch_size=4096, random_state=42
+    ).fit(pixels_lab)
+    counts = np.bincount(kmeans.labels_, minlength=k)
+    return kmeans.cluster_centers_[np.argmax(counts)]
+
+
+def _dominant_histogram(pixels_lab, k):
+    # mode of a HISTOGRAM_BIN_SIZE-wide Lab grid, refined to the mean of the
+    # pixels in the winning bin and its 26 neighbours (k is unused)
+    bins = np.floor(pixels_lab / HISTOGRAM_BIN_SIZE).astype(np.int64)
+    bins -= bins.min(axis=0)
+    dims = bins.max(axis=0) + 1
+    keys = (bins[:, 0] * dims[1] + bins[:, 1]) * dims[2] + bins[:, 2]
+    mode = np.array(np.unravel_index(np.argmax(np.bincount(keys)), dims))
+    near = np.all(np.abs(bins - mode) <= 1, axis=1)
+    return pixels_lab[near].mean(axis=0)
+
+
+DOMINANT_COLOR_STRATEGIES = {
+    "kmeans": _dominant_kmeans,
+    "minibatch": _dominant_minibatch,
+    "histogram": _dominant_histogram,
+}
+
+
+def dominant_color(pixels_lab, k=2, strategy=None):
+    """
+    Dominant Lab colour of an (N, 3) pixel array.
+
+    strategy: one of DOMINANT_COLOR_STRATEGIES, defaults to
+    DOMINANT_COLOR_STRATEGY.
+    """
+    strategy = strategy or DOMINANT_COLOR_STRATEGY
+    if strategy not in DOMINANT_COLOR_STRATEGIES:
+        raise ValueError(f"Unknown dominant colour strategy: {strategy}")
+    return DOMINANT_COLOR_STRATEGIES[strategy](pixels_lab, k)
+
+
+def extract_region_lab(region_mask, image_np, k=2, strategy=None):
+    region_pixels = image_np[region_mask]
+    if len(region_pixels) == 0:
+        return np.array([0, 0, 0])
+    region_pixels_lab = rgb2lab_array(region_pixels)
+    return dominant_color(region_pixels_lab, k, strategy)
+
+
+# Label ids of the face-parsing model (CelebAMask-HQ order)
+FACE_PARSING_CLASSES = {
+    "background": 0,
+    "skin": 1,
+    "nose": 2,
+    "eye_glasses": 3,
+    "left_eye": 4,
+    "right_eye": 5,
+    "left_brow": 6,
+    "right_brow": 7,
+    "left_ear": 8,
+    "right_ear": 9,
+    "mouth": 10,
+    "upper_lip": 11,
+    "lower_lip": 12,
+    "hair": 13,
+    "hat": 14,
+    "earring": 15,
+    "necklace": 16,
+    "neck": 17,
+    "cloth": 18,
+}
+
+# Regions analyze_image reads a dominant colour from, as label id lists;
+# e.g. "lips": [11, 12] or "brows": [6, 7] would add one more region
+# without another pass over the image.
+ANALYSIS_REGIONS = {
+    "skin": [FACE_PARSING_CLASSES["skin"]],
+    "left_eye": [FACE_PARSING_CLASSES["left_eye"]],
+    "right_eye": [FACE_PARSING_CLASSES["right_eye"]],
+    "hair": [FACE_PARSING_CLASSES["hair"]],
+}
+
+
+def class_pixels(pred_seg, image_np, class_ids):
+    """
+    RGB pixels of each label in class_ids, gathered in one pass over the
+    label map: {class_id: (N, 3) array}. The arrays are contiguous slices
+    of one buffer sorted by label (raster order within a label), and the
+    buffer itself is returned as the second value.
+    """
+    labels = pred_seg.ravel()
+    size = 256 if labels.dtype == np.uint8 else int(labels.max()) + 1
+    wanted = np.zeros(max(size, max(class_ids) + 1), dtype=bool)
+    wanted[list(class_ids)] = True
+
+    idx = np.flatnonzero(wanted[labels])
+    region_labels = labels[idx]
+    idx = idx[np.argsort(region_labels, kind="stable")]
+    counts = np.bincount(region_labels, minlength=len(wanted))
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    pixels = image_np.reshape(-1, image_np.shape[-1])[idx]
+    return {c: pixels[offsets[c] : offsets[c + 1]] for c in class_ids}, pixels
+
+
+def extract_regions_lab(
+    pred_seg, image_np, regions=ANALYSIS_REGIONS, k=2, strategy=None
+):
+    """
+    Dominant Lab colour of every region ({name: [label ids]}) with one
+    label-map pass, one pixel gather and one Lab conversion for all of
+    them. Same values as extract_region_lab per region mask.
+    """
+    class_ids = sorted({c for ids in regions.values() for c in ids})
+    by_class, pixels = class_pixels(pred_seg, image_np, class_ids)
+    pixels_lab = rgb2lab_array(pixels)
+
+    # by_class holds views into `pixels`; map them onto the Lab buffer
+    start = 0
+    lab_by_class = {}
+    for c in class_ids:
+        n = len(by_class[c])
+        lab_by_class[c] = pixels_lab[start : start + n]
+        start += n
+
+    colors = {}
+    for name, ids in regions.items():
+        parts = [lab_by_class[c] for c in ids if len(lab_by_class[c])]
+        if not parts:
+            colors[name] = np.array([0, 0, 0])
+            continue
+        region_lab = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        colors[name] = dominant_color(region_lab, k, strategy)
+    return colors
+
+
 # MST reference data (unchanged)
 monk_lab = {
     1: np.array([94.2884, 1.8519, 5.5425]),
@@ -169,7 +629,12 @@ iris_colors_rgb = {
     "Brown": (70, 40, 20),
     "Gray": (150, 150, 150),
 }
-iris_lab = {name: rgb2lab(rgb) for name, rgb in iris_colors_rgb.items()}
+iris_lab = dict(
+    zip(
+        iris_colors_rgb,
+        rgb2lab_array(list(iris_colors_rgb.values()), np.float64, "exact"),
+    )
+)
 
 hair_colors_rgb = {
     "Black": (20, 20, 20),
@@ -180,48 +645,283 @@ hair_colors_rgb = {
     "Red": (150, 60, 40),
     "Gray": (160, 160, 160),
 }
-hair_lab = {name: rgb2lab(rgb) for name, rgb in hair_colors_rgb.items()}
+hair_lab = dict(
+    zip(
+        hair_colors_rgb,
+        rgb2lab_array(list(hair_colors_rgb.values()), np.float64, "exact"),
+    )
+)
+
+MONK_PALETTE = ColorPalette(monk_lab)
+IRIS_PALETTE = ColorPalette(iris_lab)
+HAIR_PALETTE = ColorPalette(hair_lab)
 
 
-def analyze_image(image_path: str):
+def _working_size(size, max_side=None, max_pixels=None):
+    scale = 1.0
+    if max_side:
+        scale = min(scale, max_side / max(size))
+    if max_pixels:
+        scale = min(scale, (max_pixels / (size[0] * size[1])) ** 0.5)
+    return tuple(max(1, int(side * scale)) for side in size)
+
+
+def load_image(source, max_side=None, max_pixels=None):
+    """
+    Decode a path, encoded bytes, binary file-like object, NumPy (H, W, 3)
+    array or PIL image to a PIL RGB image, downscaled (aspect preserved) to
+    fit max_side / max_pixels when given.
+
+    JPEGs are decoded with draft(), so most of the reduction happens in the
+    DCT domain instead of after a full-size decode. The source size is kept
+    in image.info["original_size"].
+    """
+    if isinstance(source, Image.Image):
+        image = source
+    elif isinstance(source, np.ndarray):
+        image = Image.fromarray(source)
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        image = Image.open(io.BytesIO(source))
+    else:
+        image = Image.open(source)
+
+    original_size = image.size
+    target = _working_size(original_size, max_side, max_pixels)
+    if target != original_size and image.format == "JPEG":
+        image.draft("RGB", target)
+    image = image.convert("RGB")
+    if image.size != target:
+        image.thumbnail(target)
+    image.info["original_size"] = original_size
+    return image
+
+
+def segment_images(images):
+    """
+    Face-parsing label maps for a list of PIL RGB images, run as a single
+    batched forward pass.
+
+    The processor resizes every image to the model's fixed input size, so
+    images of any size stack into one tensor; each image's logits are then
+    upsampled back to its own size. Returns one (H, W) array per image.
+    """
+    processor, run_logits = _ensure_backend_loaded()
+
+    inputs = processor(images=list(images), return_tensors="pt")
+    with torch.no_grad():
+        batch_logits = run_logits(inputs["pixel_values"])
+
+    return [
+        logits_to_label_map(logits, image.size[::-1])
+        for logits, image in zip(batch_logits, images)
+    ]
+
+
+def _bilinear_taps(out_size, in_size):
+    """
+    Source indices (i0, i1) and weight of i1 for each output position, so
+    that resampling one axis matches torch bilinear interpolate with
+    align_corners=False.
+    """
+    src = (np.arange(out_size) + 0.5) * (in_size / out_size) - 0.5
+    src = np.maximum(src, 0)
+    i0 = np.minimum(np.floor(src).astype(np.int64), in_size - 1)
+    i1 = np.minimum(i0 + 1, in_size - 1)
+    return i0, i1, (src - i0).astype(np.float32)
+
+
+def _tiled_bilinear_argmax(logits, size):
+    # bilinear upsampling is separable, so a block of output rows only needs
+    # two logit rows per output row: peak memory is C * tile_rows * W floats
+    height, width = size
+    y0, y1, fy = _bilinear_taps(height, logits.shape[1])
+    x0, x1, fx = _bilinear_taps(width, logits.shape[2])
+    labels = np.empty(size, dtype=np.uint8)
+    for r0 in range(0, height, SEGMENTATION_TILE_ROWS):
+        r1 = min(r0 + SEGMENTATION_TILE_ROWS, height)
+        wy = fy[None, r0:r1, None]
+        rows = logits[:, y0[r0:r1]] * (1 - wy) + logits[:, y1[r0:r1]] * wy
+        tile = rows[:, :, x0] * (1 - fx) + rows[:, :, x1] * fx
+        labels[r0:r1] = tile.argmax(axis=0)
+    return labels
+
+
+def _resize_nearest(labels, size):
+    rows = (np.arange(size[0]) * labels.shape[0]) // size[0]
+    cols = (np.arange(size[1]) * labels.shape[1]) // size[1]
+    return labels[np.ix_(rows, cols)]
+
+
+def logits_to_label_map(logits, size):
+    """
+    (C, h, w) class logits -> (H, W) uint8 label map at size=(H, W),
+    following SEGMENTATION_MODE and SEGMENTATION_MAX_SIDE.
+    """
+    if SEGMENTATION_MODE == "full":
+        upsampled_logits = torch.nn.functional.interpolate(
+            logits[None], size=size, mode="bilinear", align_corners=False
+        )
+        return upsampled_logits.argmax(dim=1)[0].numpy().astype(np.uint8)
+
+    logits = logits.float().numpy() if torch.is_tensor(logits) else logits
+    if SEGMENTATION_MODE == "nearest":
+        labels = logits.argmax(axis=0).astype(np.uint8)
+    elif SEGMENTATION_MODE == "tiled":
+        work_size = size
+        if SEGMENTATION_MAX_SIDE and max(size) > SEGMENTATION_MAX_SIDE:
+            scale = SEGMENTATION_MAX_SIDE / max(size)
+            work_size = tuple(max(1, round(side * scale)) for side in size)
+        labels = _tiled_bilinear_argmax(logits, work_size)
+    else:
+        raise ValueError(f"Unknown segmentation mode: {SEGMENTATION_MODE}")
+
+    if labels.shape != tuple(size):
+        labels = _resize_nearest(labels, size)
+    return labels
+
+
+def segment_image(image):
+    """Face-parsing label map (H, W) for a PIL RGB image."""
+    return segment_images([image])[0]
+
+
+def analyze_image(image_path: str, max_side=MAX_SIDE, max_pixels=MAX_PIXELS):
     """
     Analyze an image to detect:
     - Closest Monk Skin Tone (MST)
     - Tone group and descriptor
     - Skin undertone (cool, warm, neutral)
     - Eye and hair color
-    """
-    processor, model = _ensure_model_loaded()
-
-    image = Image.open(image_path).convert("RGB")
-    inputs = processor(images=image, return_tensors="pt")
-    with torch.no_grad():
-        outputs = model(**inputs)
 
-    logits = outputs.logits
-    upsampled_logits = torch.nn.functional.interpolate(
-        logits, size=image.size[::-1], mode="bilinear", align_corners=False
-    )
-    pred_seg = upsampled_logits.argmax(dim=1)[0].numpy()
+    The image is first downscaled to fit max_side / max_pixels (0 or None
+    to analyze at full resolution); result["metadata"] reports the original
+    and working sizes.
+    """
+    start = time.perf_counter()
+    image = load_image(image_path, max_side, max_pixels)
+    result = _analyze_segmentation(segment_image(image), image)
+    result["metadata"]["processing_time_s"] = time.perf_counter() - start
+    return result
+
+
+def analysis_config_version():
+    """Short id of every setting that changes analyze_image's output."""
+    settings = [
+        MODEL_NAME,
+        INFERENCE_BACKEND,
+        MODEL_VARIANT,
+        LAB_CONVERSION_MODE,
+        DOMINANT_COLOR_STRATEGY,
+        DOMINANT_PIXEL_BUDGET,
+        HISTOGRAM_BIN_SIZE,
+        SEGMENTATION_MODE,
+        SEGMENTATION_MAX_SIDE,
+        RESULT_SCHEMA_VERSION,
+    ]
+    return hashlib.sha1("|".join(map(str, settings)).encode()).hexdigest()[:12]
+
+
+def image_cache_key(image):
+    """
+    Result cache key for a loaded image: a hash of its decoded (working
+    size) pixels plus analysis_config_version(). Re-encoded or resized
+    copies of the same upload only match if they decode to the same pixels.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.mode}|{image.size}|".encode())
+    digest.update(image.tobytes())
+    return f"{analysis_config_version()}:{digest.hexdigest()}"
+
+
+def analyze_images(
+    images,
+    batch_size=ANALYZE_BATCH_SIZE,
+    max_side=MAX_SIDE,
+    max_pixels=MAX_PIXELS,
+    cache=None,
+):
+    """
+    Batched analyze_image for a list of paths, encoded bytes, file-like
+    objects, arrays or PIL images.
+
+    Runs one forward pass per batch_size images and returns one result per
+    input, in input order. An image that fails to load or analyze gets
+    {"error": "..."} in its slot instead of aborting the batch.
+    metadata["processing_time_s"] counts an image's own decode and analysis
+    plus an equal share of the batch's forward pass.
+
+    cache is an optional object with get(key) / put(key, result) (see
+    src/api/result_cache.py). Images whose image_cache_key is cached skip
+    segmentation; their result has metadata["cache_hit"] set, keeps the
+    processing_time_s of the analysis that produced it and reports the
+    decode and lookup time as metadata["cache_lookup_s"].
+    """
+    results = [None] * len(images)
+    for batch_start in range(0, len(images), batch_size):
+        batch, seconds, keys = {}, {}, {}
+        for i in range(batch_start, min(batch_start + batch_size, len(images))):
+            start = time.perf_counter()
+            try:
+                image = load_image(images[i], max_side, max_pixels)
+            except Exception as e:
+                results[i] = {"error": str(e)}
+                continue
+            if cache is not None:
+                keys[i] = image_cache_key(image)
+                cached = cache.get(keys[i])
+                if cached is not None:
+                    # processing_time_s stays the analysis time, which
+                    # drift monitoring tracks
+                    cached["metadata"]["cache_lookup_s"] = time.perf_counter() - start
+                    cached["metadata"]["cache_hit"] = True
+                    results[i] = cached
+                    continue
+            batch[i] = image
+            seconds[i] = time.perf_counter() - start
+        if not batch:
+            continue
+
+        start = time.perf_counter()
+        try:
+            pred_segs = segment_images(list(batch.values()))
+        except Exception as e:
+            for i in batch:
+                results[i] = {"error": str(e)}
+            continue
+        forward_share = (time.perf_counter() - start) / len(batch)
+
+        for (i, image), pred_seg in zip(batch.items(), pred_segs):
+            start = time.perf_counter()
+            try:
+                results[i] = _analyze_segmentation(pred_seg, image)
+            except Exception as e:
+                results[i] = {"error": str(e)}
+                continue
+            results[i]["metadata"]["processing_time_s"] = (
+                seconds[i] + forward_share + time.perf_counter() - start
+            )
+            if cache is not None:
+                results[i]["metadata"]["cache_hit"] = False
+                cache.put(keys[i], results[i])
+    return results
+
+
+def _analyze_segmentation(pred_seg, image):
     img_np = np.array(image)
 
-    # Masks
-    skin_mask = pred_seg == 1
-    left_eye_mask = pred_seg == 4
-    right_eye_mask = pred_seg == 5
-    hair_mask = pred_seg == 13
-
-    # Extract dominant LAB
-    skin_lab = extract_region_lab(skin_mask, img_np)
-    left_eye_lab = extract_region_lab(left_eye_mask, img_np)
-    right_eye_lab = extract_region_lab(right_eye_mask, img_np)
-    hair_lab_val = extract_region_lab(hair_mask, img_np)
+    # Extract dominant LAB of every region in one pass over the label map
+    region_lab = extract_regions_lab(pred_seg, img_np)
+    skin_lab = region_lab["skin"]
+    left_eye_lab = region_lab["left_eye"]
+    right_eye_lab = region_lab["right_eye"]
+    hair_lab_val = region_lab["hair"]
 
     # Closest matches
-    skin_level = find_closest_color(skin_lab, monk_lab)
-    left_eye_color = find_closest_color(left_eye_lab, iris_lab)
-    right_eye_color = find_closest_color(right_eye_lab, iris_lab)
-    hair_color = find_closest_color(hair_lab_val, hair_lab)
+    skin_level = MONK_PALETTE.closest(skin_lab)
+    left_eye_color, right_eye_color = IRIS_PALETTE.classify(
+        [left_eye_lab, right_eye_lab]
+    )
+    hair_color = HAIR_PALETTE.closest(hair_lab_val)
 
     # Undertone detection
     L, a, b = skin_lab
@@ -244,4 +944,13 @@ def analyze_image(image_path: str):
             else (left_eye_color, right_eye_color)
         ),
         "hair_color": hair_color,
+        # numeric features for drift monitoring (data/current.jsonl schema)
+        "mst_level": int(skin_level),
+        "skin_L": float(L),
+        "skin_a": float(a),
+        "skin_b": float(b),
+        "metadata": {
+            "original_size": list(image.info.get("original_size", image.size)),
+            "working_size": list(image.size),
+        },
     }
@@ -0,0 +1,102 @@
+# src/models/export.py
+# Writes the face-parsing Segformer as TorchScript and/or ONNX, optionally
+# with a dynamically quantized int8 copy, for the "torchscript" and
+# "onnxruntime" inference backends in chroma_model.
+#
+# Usage: python -m src.models.export --format all --quantize
+
+import argparse
+import os
+
+import torch
+
+from .chroma_model import EXPORT_DIR, _ensure_model_loaded, exported_model_path
+
+
+class _LogitsOnly(torch.nn.Module):
+    # HF models return a ModelOutput; exporters want a plain tensor
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model(pixel_values=pixel_values).logits
+
+
+def _dummy_input(processor):
+    size = processor.size
+    return torch.zeros(1, 3, size["height"], size["width"])
+
+
+def export_torchscript(model, dummy, path, quantize=False):
+    module = _LogitsOnly(model).eval()
+    if quantize:
+        module = torch.ao.quantization.quantize_dynamic(
+            module, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    with torch.no_grad():
+        traced = torch.jit.trace(module, dummy)
+    traced.save(path)
+    return path
+
+
+def export_onnx(model, dummy, path):
+    torch.onnx.export(
+        _LogitsOnly(model).eval(),
+        (dummy,),
+        path,
+        input_names=["pixel_values"],
+        output_names=["logits"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=17,
+        dynamo=False,
+    )
+    return path
+
+
+def quantize_onnx(src_path, dst_path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    # ConvInteger has poor CPU kernels, so only the attention/MLP matmuls
+    quantize_dynamic(
+        src_path,
+        dst_path,
+        weight_type=QuantType.QInt8,
+        op_types_to_quantize=["MatMul", "Gemm"],
+    )
+    return dst_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--format", choices=["onnx", "torchscript", "all"], default="onnx"
+    )
+    parser.add_argument(
+        "--quantize", action="store_true", help="also write an int8 variant"
+    )
+    args = parser.parse_args()
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    processor, model = _ensure_model_loaded()
+    model.eval()
+    dummy = _dummy_input(processor)
+
+    written = []
+    if args.format in ("torchscript", "all"):
+        ts_path = exported_model_path("torchscript", "fp32")
+        written.append(export_torchscript(model, dummy, ts_path))
+        if args.quantize:
+            int8_path = exported_model_path("torchscript", "int8")
+            written.append(export_torchscript(model, dummy, int8_path, quantize=True))
+    if args.format in ("onnx", "all"):
+        onnx_path = export_onnx(
+            model, dummy, exported_model_path("onnxruntime", "fp32")
+        )
+        written.append(onnx_path)
+        if args.quantize:
+            int8_path = exported_model_path("onnxruntime", "int8")
+            written.append(quantize_onnx(onnx_path, int8_path))
+
+    for path in written:
+        print(f"Exported {path} ({os.path.getsize(path) / 2**20:.1f} MB)")
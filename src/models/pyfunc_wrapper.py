@@ -1,7 +1,7 @@
 # src/model/pyfunc_wrapper.py
 import mlflow.pyfunc
 import pandas as pd
-from .chroma_model import analyze_image
+from .chroma_model import analyze_images
 
 
 class ChromaMatchPyFunc(mlflow.pyfunc.PythonModel):
@@ -12,7 +12,8 @@ class ChromaMatchPyFunc(mlflow.pyfunc.PythonModel):
     def predict(self, context, model_input: pd.DataFrame) -> pd.DataFrame:
         """
         model_input: pandas DataFrame with a column 'image_path' containing local paths to images.
-        Returns a DataFrame with a column 'result' which is the dictionary produced by analyze_image.
+        Returns a DataFrame with a column 'result' which is the dictionary produced by analyze_image
+        (or {"error": ...} for an image that could not be analyzed).
         """
         if isinstance(model_input, dict):
             # single-row dict
@@ -20,8 +21,5 @@ class ChromaMatchPyFunc(mlflow.pyfunc.PythonModel):
         else:
             image_paths = list(model_input["image_path"].values)
 
-        results = []
-        for p in image_paths:
-            res = analyze_image(p)
-            results.append(res)
+        results = analyze_images(image_paths)
         return pd.DataFrame({"result": results})
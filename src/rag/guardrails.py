@@ -10,6 +10,18 @@ class ChromaGuardrails:
             r"\b\d{16}\b",  # Credit card numbers
             r"password|secret|api[_-]?key|CNIC|credit card",  # Sensitive keywords
         ]
+        self.forbidden_words = [
+            "violence",
+            "hate",
+            "kill",
+            "stupid",
+            "idiot",
+            "dumb",
+            "crazy",
+            "ugly",
+            "fat",
+        ]
+        self.hallucination_phrases = ["alien planet"]
 
     # ---- INPUT VALIDATION ----
     def validate_input(self, ml_output: Dict[str, Any]):
@@ -25,22 +37,42 @@ class ChromaGuardrails:
     # ---- OUTPUT MODERATION ----
     def moderate_output(self, rag_response: str):
         # Basic example: detect toxicity or offensive words
-        forbidden_words = [
-            "violence",
-            "hate",
-            "kill",
-            "stupid",
-            "idiot",
-            "dumb",
-            "crazy",
-            "ugly",
-            "fat",
-        ]
         violations = []
-        for word in forbidden_words:
+        for word in self.forbidden_words:
             if word.lower() in rag_response.lower():
                 violations.append(f"Forbidden word detected: {word}")
         # Simple hallucination detection (placeholder)
-        if "alien planet" in rag_response.lower():
-            violations.append("Potential hallucination detected")
+        for phrase in self.hallucination_phrases:
+            if phrase in rag_response.lower():
+                violations.append("Potential hallucination detected")
         return violations
+
+
+class StreamModerator:
+    """
+    moderate_output over an answer that arrives in chunks. Each chunk is
+    checked together with the tail of the text before it, one character
+    shorter than the longest phrase, so no phrase can hide across a chunk
+    boundary. That tail is held back until the next chunk (or flush()), so
+    a violating phrase is never partly sent.
+    """
+
+    def __init__(self, guardrails: ChromaGuardrails):
+        self.guardrails = guardrails
+        phrases = guardrails.forbidden_words + guardrails.hallucination_phrases
+        self.hold = max(len(p) for p in phrases) - 1
+        self._tail = ""
+
+    def feed(self, chunk: str):
+        """(text that is safe to send now, violations)."""
+        window = self._tail + chunk
+        violations = self.guardrails.moderate_output(window)
+        if violations:
+            return "", violations
+        cut = max(0, len(window) - self.hold)
+        self._tail = window[cut:]
+        return window[:cut], []
+
+    def flush(self):
+        text, self._tail = self._tail, ""
+        return text
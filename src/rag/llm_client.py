@@ -0,0 +1,243 @@
+# src/rag/llm_client.py
+# Async client for Groq's OpenAI-compatible chat completions API, on one
+# pooled httpx.AsyncClient, so /recommend awaits the LLM on the event loop
+# instead of holding a thread for the whole completion. Every attempt has
+# a deadline; 429/5xx responses, timeouts and connection errors are retried
+# with jittered exponential backoff (or the server's Retry-After), and a
+# semaphore caps requests in flight across the process.
+# Set CHROMA_LLM_BASE_URL to src/rag/llm_stub.py to run without network.
+
+import asyncio
+import json
+import os
+import random
+import time
+
+import httpx
+
+from src.api.metrics import LLM_IN_FLIGHT, LLM_LATENCY, LLM_REQUESTS, LLM_RETRIES
+
+LLM_BASE_URL = os.getenv("CHROMA_LLM_BASE_URL", "https://api.groq.com/openai/v1")
+# per attempt, including reading the whole completion (for streams: until
+# the response starts)
+LLM_TIMEOUT_S = float(os.getenv("CHROMA_LLM_TIMEOUT_S", "30"))
+LLM_CONNECT_TIMEOUT_S = float(os.getenv("CHROMA_LLM_CONNECT_TIMEOUT_S", "5"))
+LLM_MAX_RETRIES = int(os.getenv("CHROMA_LLM_MAX_RETRIES", "3"))
+LLM_CONCURRENCY = int(os.getenv("CHROMA_LLM_CONCURRENCY", "16"))
+LLM_BACKOFF_S = float(os.getenv("CHROMA_LLM_BACKOFF_S", "0.5"))
+LLM_BACKOFF_MAX_S = float(os.getenv("CHROMA_LLM_BACKOFF_MAX_S", "8"))
+
+
+class LLMError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def _retryable(status):
+    return status == 429 or status >= 500
+
+
+async def _stream_deltas(response):
+    # OpenAI-style SSE: "data: {chunk}" lines, ended by "data: [DONE]"
+    try:
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:") :].strip()
+            if data == "[DONE]":
+                return
+            chunk = json.loads(data)
+            if "error" in chunk:
+                raise LLMError(f"LLM stream failed: {chunk['error']}")
+            for choice in chunk.get("choices", []):
+                text = (choice.get("delta") or {}).get("content")
+                if text:
+                    yield text
+    except httpx.HTTPError as e:
+        raise LLMError(f"LLM stream interrupted: {e!r}")
+
+
+def _retry_after(response):
+    try:
+        return max(0.0, float(response.headers.get("retry-after", "")))
+    except ValueError:
+        return None
+
+
+class AsyncLLMClient:
+    def __init__(
+        self,
+        api_key=None,
+        base_url=LLM_BASE_URL,
+        timeout_s=LLM_TIMEOUT_S,
+        max_retries=LLM_MAX_RETRIES,
+        concurrency=LLM_CONCURRENCY,
+        backoff_s=LLM_BACKOFF_S,
+        backoff_max_s=LLM_BACKOFF_MAX_S,
+        transport=None,
+    ):
+        self.api_key = os.getenv("GROQ_API_KEY", "") if api_key is None else api_key
+        self.base_url = base_url
+        self.timeout_s = timeout_s
+        self.max_retries = max_retries
+        self.concurrency = concurrency
+        self.backoff_s = backoff_s
+        self.backoff_max_s = backoff_max_s
+        self.transport = transport
+        # created on first use, inside the event loop that uses them
+        self._client = None
+        self._semaphore = None
+
+    def _http(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=httpx.Timeout(self.timeout_s, connect=LLM_CONNECT_TIMEOUT_S),
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+                transport=self.transport,
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._client
+
+    async def complete(self, messages, model, max_tokens, temperature, timeout_s=None):
+        """Text of the first choice of a chat completion."""
+        body = await self.chat(
+            {
+                "model": model,
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+            },
+            timeout_s,
+        )
+        return body["choices"][0]["message"]["content"]
+
+    async def chat(self, payload, timeout_s=None):
+        """POST /chat/completions with retries; returns the response JSON."""
+        client = self._http()
+        timeout_s = timeout_s or self.timeout_s
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                # the semaphore is held per attempt, not across backoff sleeps
+                async with self._semaphore:
+                    LLM_IN_FLIGHT.inc()
+                    try:
+                        response = await asyncio.wait_for(
+                            client.post("/chat/completions", json=payload), timeout_s
+                        )
+                    finally:
+                        LLM_IN_FLIGHT.dec()
+            except (asyncio.TimeoutError, httpx.TimeoutException):
+                reason = "timeout"
+                error = LLMError(f"LLM request timed out after {timeout_s}s")
+            except httpx.TransportError as e:
+                reason = "transport"
+                error = LLMError(f"LLM request failed: {e!r}")
+            else:
+                if response.is_success:
+                    LLM_REQUESTS.labels(outcome="ok").inc()
+                    LLM_LATENCY.observe(time.perf_counter() - start)
+                    return response.json()
+                status = response.status_code
+                error = LLMError(
+                    f"LLM request failed with {status}: {response.text[:200]}", status
+                )
+                if not _retryable(status):
+                    break
+                reason = str(status)
+                retry_after = _retry_after(response)
+
+            if attempt == self.max_retries:
+                break
+            LLM_RETRIES.labels(reason=reason).inc()
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+
+        LLM_REQUESTS.labels(outcome="error").inc()
+        raise error
+
+    async def stream(self, messages, model, max_tokens, temperature, timeout_s=None):
+        """
+        Content deltas of a streamed chat completion, as they arrive.
+        Failures before the response starts are retried like chat(); once
+        it has started they raise LLMError. The concurrency slot is held
+        until the stream ends.
+        """
+        client = self._http()
+        timeout_s = timeout_s or self.timeout_s
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True,
+        }
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            async with self._semaphore:
+                LLM_IN_FLIGHT.inc()
+                try:
+                    request = client.build_request(
+                        "POST", "/chat/completions", json=payload
+                    )
+                    # the deadline covers the time to the response headers;
+                    # the pool's read timeout then applies between chunks
+                    response = await asyncio.wait_for(
+                        client.send(request, stream=True), timeout_s
+                    )
+                except (asyncio.TimeoutError, httpx.TimeoutException):
+                    reason = "timeout"
+                    error = LLMError(f"LLM request timed out after {timeout_s}s")
+                except httpx.TransportError as e:
+                    reason = "transport"
+                    error = LLMError(f"LLM request failed: {e!r}")
+                else:
+                    try:
+                        if response.is_success:
+                            async for delta in _stream_deltas(response):
+                                yield delta
+                            LLM_REQUESTS.labels(outcome="ok").inc()
+                            LLM_LATENCY.observe(time.perf_counter() - start)
+                            return
+                        await response.aread()
+                    finally:
+                        await response.aclose()
+                    status = response.status_code
+                    error = LLMError(
+                        f"LLM request failed with {status}: {response.text[:200]}",
+                        status,
+                    )
+                    if not _retryable(status):
+                        break
+                    reason = str(status)
+                    retry_after = _retry_after(response)
+                finally:
+                    LLM_IN_FLIGHT.dec()
+
+            if attempt == self.max_retries:
+                break
+            LLM_RETRIES.labels(reason=reason).inc()
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+
+        LLM_REQUESTS.labels(outcome="error").inc()
+        raise error
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max_s) + random.uniform(
+                0, self.backoff_s
+            )
+        # "full jitter": spreads the retries of requests that failed together
+        return random.uniform(0, min(self.backoff_max_s, self.backoff_s * 2**attempt))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
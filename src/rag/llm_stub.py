@@ -0,0 +1,123 @@
+# src/rag/llm_stub.py
+# Local stand-in for the Groq chat completions endpoint, for tests and load
+# tests without network access. Answers after a fixed latency (streamed
+# word by word over SSE when asked to), can inject 429/503 responses, and
+# counts the requests it has in flight.
+#
+# Usage: uvicorn src.rag.llm_stub:app --port 8088
+#        CHROMA_LLM_BASE_URL=http://127.0.0.1:8088/v1 make dev
+
+import asyncio
+import json
+import os
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STUB_LATENCY_S = float(os.getenv("CHROMA_LLM_STUB_LATENCY_S", "0.5"))
+# delay between streamed words, after the first one
+STUB_TOKEN_LATENCY_S = float(os.getenv("CHROMA_LLM_STUB_TOKEN_LATENCY_S", "0.02"))
+# share of requests answered with a 429 or 503
+STUB_ERROR_RATE = float(os.getenv("CHROMA_LLM_STUB_ERROR_RATE", "0"))
+STUB_ANSWER = (
+    "Soft warm neutrals, camel and olive suit this profile. "
+    "Gold jewelry, coral or peach makeup and an autumn palette work well."
+)
+
+
+def create_app(
+    latency_s=STUB_LATENCY_S,
+    error_rate=STUB_ERROR_RATE,
+    fail_first=(),
+    token_latency_s=STUB_TOKEN_LATENCY_S,
+    answer=STUB_ANSWER,
+):
+    """
+    fail_first: status codes to answer with, in order, before any success.
+    latency_s is the time to the whole answer, or to the first streamed word.
+    """
+    app = FastAPI(title="LLM stub")
+    app.state.stats = {"requests": 0, "in_flight": 0, "max_in_flight": 0}
+    failures = list(fail_first)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats = app.state.stats
+        stats["requests"] += 1
+        status = failures.pop(0) if failures else None
+        if status is None and error_rate and random.random() < error_rate:
+            status = random.choice([429, 503])
+        if status is not None:
+            return JSONResponse(
+                {"error": {"message": f"stub error {status}"}},
+                status_code=status,
+                headers={"retry-after": "0"} if status == 429 else None,
+            )
+
+        if body.get("stream"):
+            return StreamingResponse(
+                stream_answer(body.get("model")), media_type="text/event-stream"
+            )
+
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            await asyncio.sleep(latency_s)
+        finally:
+            stats["in_flight"] -= 1
+
+        prompt = body["messages"][-1]["content"]
+        return {
+            "id": f"stub-{stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": len(answer) // 4,
+                "total_tokens": (len(prompt) + len(answer)) // 4,
+            },
+        }
+
+    async def stream_answer(model):
+        stats = app.state.stats
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            await asyncio.sleep(latency_s)
+            words = answer.split(" ")
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(token_latency_s)
+                delta = {"content": word if i == 0 else " " + word}
+                yield _sse_chunk(stats["requests"], model, delta, None)
+            yield _sse_chunk(stats["requests"], model, {}, "stop")
+            yield "data: [DONE]\n\n"
+        finally:
+            stats["in_flight"] -= 1
+
+    return app
+
+
+def _sse_chunk(request_id, model, delta, finish_reason):
+    chunk = {
+        "id": f"stub-{request_id}",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+app = create_app()
@@ -3,22 +3,68 @@
 from src.models.chroma_model import analyze_image
 from src.rag.retriever import RAGRetriever
 from groq import Groq
+import asyncio
+import contextlib
+import functools
+import hashlib
+import json
 import os
 from dotenv import load_dotenv
-from src.rag.guardrails import ChromaGuardrails
+from src.rag.guardrails import ChromaGuardrails, StreamModerator
+from src.rag.response_cache import RESPONSE_CACHE_ENABLED, ResponseCache
+from src.rag.llm_client import AsyncLLMClient
 
 load_dotenv()
 
+
+# synchronous client for scripts (run(), the recommendation table job); the
+# API goes through the async client instead
+@functools.lru_cache(maxsize=None)
 def get_client():
-    from groq import Groq
     return Groq(api_key=os.getenv("GROQ_API_KEY"))
 
-client = get_client()
+
+PROMPT_TEMPLATE = """
+You are a professional color analyst and stylist.
+
+USER PROFILE:
+{user_query}
+
+RELEVANT DOCUMENTS:
+{context}
+
+Using only the information from these documents, give highly personalized and accurate style + color advice.
+Focus on:
+- clothing colors
+- makeup colors
+- jewelry (gold/silver)
+- hair styling suggestions
+- seasonal color palette match
+"""
+LLM_MODEL = "llama-3.3-70b-versatile"
+LLM_MAX_TOKENS = 350
+LLM_TEMPERATURE = 0.3
+RETRIEVAL_K = 5
+REFUSAL_ANSWER = "I'm sorry, but I cannot provide a recommendation based on the provided information."
+
+# Changes whenever anything that shapes an answer for a given query
+# changes; stored answers (src/rag/recommendation_table.py) carry it.
+PROMPT_VERSION = hashlib.sha256(
+    json.dumps(
+        [PROMPT_TEMPLATE, LLM_MODEL, LLM_MAX_TOKENS, LLM_TEMPERATURE, RETRIEVAL_K]
+    ).encode()
+).hexdigest()[:12]
+
 
 class ChromaRAGPipeline:
     def __init__(self):
         self.retriever = RAGRetriever()
         self.guardrails = ChromaGuardrails()
+        self.llm = AsyncLLMClient()
+        # answers for recently seen (query, documents) pairs skip the LLM call
+        self.response_cache = (
+            ResponseCache(PROMPT_VERSION) if RESPONSE_CACHE_ENABLED else None
+        )
 
     def ml_to_query(self, ml_output: dict):
         return (
@@ -31,45 +77,134 @@ class ChromaRAGPipeline:
             f"What colors in fashion, makeup, and clothing suit this profile?"
         )
 
-    def generate_answer(self, context_docs, user_query):
+    def build_prompt(self, context_docs, user_query):
         context_str = "\n\n---DOCUMENT---\n\n".join(doc["text"] for doc in context_docs)
+        return PROMPT_TEMPLATE.format(user_query=user_query, context=context_str)
 
-        prompt = f"""
-You are a professional color analyst and stylist.
-
-USER PROFILE:
-{user_query}
-
-RELEVANT DOCUMENTS:
-{context_str}
-
-Using only the information from these documents, give highly personalized and accurate style + color advice.
-Focus on:
-- clothing colors
-- makeup colors
-- jewelry (gold/silver)
-- hair styling suggestions
-- seasonal color palette match
-"""
+    def generate_answer(self, context_docs, user_query):
+        prompt = self.build_prompt(context_docs, user_query)
 
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        response = get_client().chat.completions.create(
+            model=LLM_MODEL,
             messages=[{"role": "user", "content": prompt}],
-            max_tokens=350,
-            temperature=0.3,
+            max_tokens=LLM_MAX_TOKENS,
+            temperature=LLM_TEMPERATURE,
         )
 
         return response.choices[0].message.content
 
+    async def agenerate_answer(self, context_docs, user_query):
+        """generate_answer on the async client: awaits instead of blocking a thread."""
+        prompt = self.build_prompt(context_docs, user_query)
+        return await self.llm.complete(
+            [{"role": "user", "content": prompt}],
+            model=LLM_MODEL,
+            max_tokens=LLM_MAX_TOKENS,
+            temperature=LLM_TEMPERATURE,
+        )
+
+    def cached_answer(self, context_docs, user_query, embedding=None):
+        """
+        generate_answer behind the response cache. Only answers that pass
+        moderate_output are cached, so a refused one is regenerated next time.
+        """
+        if self.response_cache is None:
+            return self.generate_answer(context_docs, user_query)
+        answer = self.response_cache.get(user_query, context_docs, embedding)
+        if answer is None:
+            answer = self.generate_answer(context_docs, user_query)
+            if not self.guardrails.moderate_output(answer):
+                self.response_cache.put(user_query, context_docs, answer, embedding)
+        return answer
+
+    async def acached_answer(self, context_docs, user_query, embedding=None):
+        # the cache's SQLite tier and semantic scan run on a thread
+        if self.response_cache is None:
+            return await self.agenerate_answer(context_docs, user_query)
+        answer = await asyncio.to_thread(
+            self.response_cache.get, user_query, context_docs, embedding
+        )
+        if answer is None:
+            answer = await self.agenerate_answer(context_docs, user_query)
+            if not self.guardrails.moderate_output(answer):
+                await asyncio.to_thread(
+                    self.response_cache.put, user_query, context_docs, answer, embedding
+                )
+        return answer
+
+    def retrieve(self, query, k=RETRIEVAL_K):
+        """(documents, query embedding)."""
+        q_emb = self.retriever.encode(query)
+        return self.retriever.search(query, k=k, embedding=q_emb), q_emb
+
     # ----------- NEW FUNCTION -----------
     def recommend_from_predictions(self, query: str):
-        docs = self.retriever.search(query, k=5)
-        answer = self.generate_answer(docs, query)
+        docs, q_emb = self.retrieve(query)
+        answer = self.cached_answer(docs, query, q_emb)
+        return self.moderated_result(query, docs, answer)
+
+    async def arecommend_from_predictions(self, query: str):
+        """recommend_from_predictions for the API: only the embedding runs on a thread."""
+        docs, q_emb = await asyncio.to_thread(self.retrieve, query)
+        answer = await self.acached_answer(docs, query, q_emb)
+        return self.moderated_result(query, docs, answer)
+
+    async def astream_recommendation(self, query: str):
+        """
+        recommend_from_predictions as a stream of ("token", text) events
+        while the answer is generated, then ("done", result). Moderation
+        runs over a sliding window as text arrives; a violation stops the
+        generation and the result carries the refusal and the violations.
+        """
+        docs, q_emb = await asyncio.to_thread(self.retrieve, query)
+        cached = None
+        if self.response_cache is not None:
+            cached = await asyncio.to_thread(
+                self.response_cache.get, query, docs, q_emb
+            )
+
+        moderator = StreamModerator(self.guardrails)
+        parts, violations = [], []
+        if cached is not None:
+            chunks = _one_chunk(cached)
+        else:
+            chunks = self.llm.stream(
+                [{"role": "user", "content": self.build_prompt(docs, query)}],
+                model=LLM_MODEL,
+                max_tokens=LLM_MAX_TOKENS,
+                temperature=LLM_TEMPERATURE,
+            )
+        # aclosing: a cut-off stream releases its connection right away
+        async with contextlib.aclosing(chunks):
+            async for chunk in chunks:
+                text, violations = moderator.feed(chunk)
+                if violations:
+                    print("Guardrail violation:", violations)
+                    break
+                if text:
+                    parts.append(text)
+                    yield "token", text
+        if not violations:
+            text = moderator.flush()
+            if text:
+                parts.append(text)
+                yield "token", text
+
+        answer = REFUSAL_ANSWER if violations else "".join(parts)
+        if not violations and cached is None and self.response_cache is not None:
+            await asyncio.to_thread(self.response_cache.put, query, docs, answer, q_emb)
+        yield "done", {
+            "query_used": query,
+            "rag_answer": answer,
+            "retrieved_docs": docs,
+            "guardrail_violations": violations,
+        }
 
+    def moderated_result(self, query, docs, answer):
         output_violations = self.guardrails.moderate_output(answer)
         if output_violations:
             print("Guardrail violation:", output_violations)
-            answer = "I'm sorry, but I cannot provide a recommendation based on the provided information."
+            answer = REFUSAL_ANSWER
 
         return {
             "query_used": query,
@@ -89,10 +224,14 @@ Focus on:
         docs = self.retriever.search(query, k=4)
 
         # Step 4: Generate final answer
-        answer = self.generate_answer(docs, query)
+        answer = self.cached_answer(docs, query)
 
         return {
             "ml_prediction": ml_pred,
             "rag_answer": answer,
             "retrieved_docs": docs,
         }
+
+
+async def _one_chunk(text):
+    yield text
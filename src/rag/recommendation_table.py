@@ -0,0 +1,226 @@
+# src/rag/recommendation_table.py
+# Precomputed /recommend answers. The API's input is categorical (MST
+# level, undertone, iris and hair colour from chroma_model's palettes), so
+# every profile /analyze can produce is enumerated offline, run through
+# retrieval + generation + guardrails once, and stored keyed by its query
+# text. /recommend answers from the table and only generates live on a
+# miss. The table records the answer version (prompt, model settings,
+# index and rail files) it was built with; a table whose version doesn't
+# match the running pipeline is not served.
+#
+# Usage: python -m src.rag.recommendation_table build --workers 4
+#        python -m src.rag.recommendation_table info
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.models.chroma_model import hair_colors_rgb, iris_colors_rgb, mst_details
+
+RECOMMENDATION_TABLE_PATH = os.getenv(
+    "CHROMA_RECOMMENDATION_TABLE", "data/recommendations.sqlite"
+)
+RAIL_PATH = "rails/content_safety.rail"
+
+# the labels chroma_model._analyze_segmentation assigns
+UNDERTONES = ["Warm", "Neutral", "Cool"]
+
+
+def enumerate_profiles():
+    """
+    Every /recommend input /analyze can produce with matching eyes:
+    10 MST levels x 3 undertones x 9 iris colours x 7 hair colours.
+    """
+    for level, undertone, eye, hair in itertools.product(
+        mst_details, UNDERTONES, iris_colors_rgb, hair_colors_rgb
+    ):
+        yield {
+            "skin_tone": f"MST {level}",
+            "tone_group": mst_details[level]["group"],
+            "descriptor": mst_details[level]["descriptor"],
+            "undertone": undertone,
+            "eye_color": eye,
+            "hair_color": hair,
+        }
+
+
+def answer_version(paths, prompt_version):
+    """Hash of prompt_version and the contents of the given files."""
+    digest = hashlib.sha256(prompt_version.encode())
+    for path in paths:
+        digest.update(path.encode())
+        if not os.path.exists(path):
+            digest.update(b"missing")
+            continue
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def pipeline_version(pipeline):
+    """answer_version of a ChromaRAGPipeline: prompt, index and rail."""
+    from src.rag.rag_pipeline import PROMPT_VERSION
+
+    retriever = pipeline.retriever
+    return answer_version(
+        [retriever.index_path, retriever.meta_path, RAIL_PATH], PROMPT_VERSION
+    )
+
+
+def dump_response(response):
+    # the same encoding FastAPI's JSONResponse uses, so stored answers can
+    # be sent as they are
+    return json.dumps(response, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class AnswerStore:
+    """query text -> /recommend response JSON, plus the answer version."""
+
+    def __init__(self, path=RECOMMENDATION_TABLE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "query TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)"
+            )
+
+    @property
+    def version(self):
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row and row[0]
+
+    def reset(self, version):
+        """Drop all answers and start a table for `version`."""
+        with self.db:
+            self.db.execute("DELETE FROM answers")
+            self.db.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,)
+            )
+
+    def get(self, query):
+        row = self.db.execute(
+            "SELECT response FROM answers WHERE query = ?", (query,)
+        ).fetchone()
+        return row and row[0]
+
+    def put(self, query, response):
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?)",
+                (query, dump_response(response), time.time()),
+            )
+
+    def queries(self):
+        return {row[0] for row in self.db.execute("SELECT query FROM answers")}
+
+    def items(self):
+        return self.db.execute("SELECT query, response FROM answers")
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+
+def load_table(path, version):
+    """
+    {query: response JSON} for serving, or {} when the table is missing
+    or was built for a different answer version.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    store = AnswerStore(path)
+    try:
+        if store.version != version:
+            print(
+                f"Recommendation table {path} is for version {store.version}, "
+                f"pipeline is {version}; not serving it"
+            )
+            return {}
+        return dict(store.items())
+    finally:
+        store.close()
+
+
+def build(store, queries, answer, version, workers=4, rebuild=False):
+    """
+    Store answer(query) for every query not in the table yet. Answers are
+    committed one by one, so an interrupted build resumes where it
+    stopped; a table for another version (or rebuild=True) starts over.
+    Failed queries, and answers refused by the guardrails, are left out
+    and retried on the next run.
+    """
+    if rebuild or store.version != version:
+        store.reset(version)
+    done = store.queries()
+    todo = [q for q in dict.fromkeys(queries) if q not in done]
+    stats = {"skipped": len(done), "written": 0, "failed": 0}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(answer, query): query for query in todo}
+        for future in as_completed(futures):
+            query = futures[future]
+            try:
+                response = future.result()
+                if response.get("guardrail_violations"):
+                    # a refusal would be served for this profile for good
+                    raise ValueError(f"refused: {response['guardrail_violations']}")
+                store.put(query, response)
+                stats["written"] += 1
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"Failed: {query[:60]}...: {e}")
+            finished = stats["written"] + stats["failed"]
+            if finished % 50 == 0:
+                print(f"{finished}/{len(todo)} answered")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="answer every enumerated profile")
+    build_cmd.add_argument("--workers", type=int, default=4)
+    build_cmd.add_argument("--limit", type=int, help="only the first N profiles")
+    build_cmd.add_argument(
+        "--rebuild", action="store_true", help="discard stored answers first"
+    )
+    sub.add_parser("info", help="stored answers and version")
+    parser.add_argument("--path", default=RECOMMENDATION_TABLE_PATH)
+    args = parser.parse_args()
+
+    store = AnswerStore(args.path)
+    if args.command == "info":
+        print(f"{args.path}: {len(store)} answers, version {store.version}")
+    else:
+        from src.rag.rag_pipeline import ChromaRAGPipeline
+        from src.safety.guardrails_filter import run_with_guardrails
+
+        pipeline = ChromaRAGPipeline()
+        profiles = itertools.islice(enumerate_profiles(), args.limit)
+        queries = [pipeline.ml_to_query(p) for p in profiles]
+        # one batch through the embedder; the workers then hit its cache
+        pipeline.retriever.encode_many(queries)
+        stats = build(
+            store,
+            queries,
+            lambda q: run_with_guardrails(pipeline.recommend_from_predictions, q),
+            pipeline_version(pipeline),
+            workers=args.workers,
+            rebuild=args.rebuild,
+        )
+        print(f"{args.path}: {len(store)} answers ({stats})")
+    store.close()
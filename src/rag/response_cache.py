@@ -0,0 +1,256 @@
+# src/rag/response_cache.py
+# Cache of generate_answer output, so a profile answered a moment ago
+# doesn't cost another Groq call. The exact tier is keyed on the
+# normalised query, the retrieved documents and PROMPT_VERSION. The
+# optional semantic tier serves a query whose MiniLM embedding is within
+# a cosine threshold of a cached one that retrieved the same documents.
+# Entries expire after a TTL and are evicted least recently used beyond
+# max_entries. The in-process tier can be backed by a SQLite file shared
+# by all workers on the host.
+
+import collections
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from src.api.metrics import RESPONSE_CACHE_EVICTIONS, RESPONSE_CACHE_REQUESTS
+
+RESPONSE_CACHE_ENABLED = os.getenv("CHROMA_RESPONSE_CACHE", "1") == "1"
+RESPONSE_CACHE_SIZE = int(os.getenv("CHROMA_RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL_S = float(os.getenv("CHROMA_RESPONSE_CACHE_TTL_S", "86400"))
+# SQLite file for the shared tier ("" = in-process only)
+RESPONSE_CACHE_DB = os.getenv("CHROMA_RESPONSE_CACHE_DB", "")
+# minimum cosine similarity for a semantic hit (0 = semantic tier off).
+# Profile queries differ in a word or two, so keep this high.
+RESPONSE_CACHE_SEMANTIC = float(os.getenv("CHROMA_RESPONSE_CACHE_SEMANTIC", "0"))
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+def docs_key(docs, prompt_version):
+    """Identifies the prompt context: the retrieved documents, in order."""
+    digest = hashlib.sha256(prompt_version.encode())
+    for doc in docs:
+        digest.update(doc.get("source", "").encode() + b"\0")
+        digest.update(doc["text"].encode() + b"\0")
+    return digest.hexdigest()[:32]
+
+
+def _unit(embedding):
+    embedding = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = np.linalg.norm(embedding)
+    return embedding / norm if norm else embedding
+
+
+class MemoryResponses:
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        # key -> (context, unit embedding or None, answer, expires)
+        self._entries = collections.OrderedDict()
+        self._by_context = collections.defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[3] <= now:
+                self._remove(key, "expired")
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def similar(self, context, embedding, threshold, now):
+        """Answer of the closest unexpired entry for context, if close enough."""
+        with self._lock:
+            best, best_key = threshold, None
+            for key in self._by_context.get(context, ()):
+                _, cached, _, expires = self._entries[key]
+                if cached is None or expires <= now:
+                    continue
+                similarity = float(cached @ embedding)
+                if similarity >= best:
+                    best, best_key = similarity, key
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key][2]
+
+    def put(self, key, context, embedding, answer, expires):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key, None)
+            self._entries[key] = (context, embedding, answer, expires)
+            self._by_context[context].add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)), "size")
+
+    def _remove(self, key, reason):
+        context = self._entries.pop(key)[0]
+        self._by_context[context].discard(key)
+        if not self._by_context[context]:
+            del self._by_context[context]
+        if reason:
+            RESPONSE_CACHE_EVICTIONS.labels(tier="memory", reason=reason).inc()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteResponses:
+    """The same entries in one SQLite file (WAL), shared across workers."""
+
+    def __init__(self, path=RESPONSE_CACHE_DB, max_entries=RESPONSE_CACHE_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, context TEXT NOT NULL, embedding BLOB, "
+                "answer TEXT NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_context ON responses (context)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+
+    def _connect(self):
+        # sqlite3 connections can't be shared across threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def get(self, key, now):
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT answer FROM responses WHERE key = ? AND expires > ?",
+                (key, now),
+            ).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+                )
+        return row and row[0]
+
+    def similar(self, context, embedding, threshold, now):
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT key, embedding, answer FROM responses "
+                "WHERE context = ? AND expires > ? AND embedding IS NOT NULL",
+                (context, now),
+            ).fetchall()
+            if not rows:
+                return None
+            cached = np.stack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+            similarities = cached @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] < threshold:
+                return None
+            db.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, rows[best][0])
+            )
+        return rows[best][2]
+
+    def put(self, key, context, embedding, answer, expires):
+        blob = None if embedding is None else embedding.tobytes()
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, context, blob, answer, expires, now),
+            )
+            expired = db.execute("DELETE FROM responses WHERE expires <= ?", (now,))
+            RESPONSE_CACHE_EVICTIONS.labels(tier="disk", reason="expired").inc(
+                expired.rowcount
+            )
+            excess = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            excess -= self.max_entries
+            if excess > 0:
+                db.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                    (excess,),
+                )
+                RESPONSE_CACHE_EVICTIONS.labels(tier="disk", reason="size").inc(excess)
+
+
+class ResponseCache:
+    """
+    get/put of generated answers for (query, retrieved docs). Pass the
+    query embedding to use the semantic tier.
+    """
+
+    def __init__(
+        self,
+        prompt_version,
+        max_entries=RESPONSE_CACHE_SIZE,
+        ttl_s=RESPONSE_CACHE_TTL_S,
+        db_path=RESPONSE_CACHE_DB,
+        semantic_threshold=RESPONSE_CACHE_SEMANTIC,
+    ):
+        self.prompt_version = prompt_version
+        self.ttl_s = ttl_s
+        self.semantic_threshold = semantic_threshold
+        self.memory = MemoryResponses(max_entries)
+        self.disk = SQLiteResponses(db_path, max_entries) if db_path else None
+
+    def _keys(self, query, docs):
+        context = docs_key(docs, self.prompt_version)
+        key = hashlib.sha256(
+            json.dumps([context, normalize_query(query)]).encode()
+        ).hexdigest()[:32]
+        return key, context
+
+    def get(self, query, docs, embedding=None):
+        key, context = self._keys(query, docs)
+        now = time.time()
+        answer = self._lookup("exact", lambda tier: tier.get(key, now))
+        if answer is None and self.semantic_threshold and embedding is not None:
+            unit = _unit(embedding)
+            answer = self._lookup(
+                "semantic",
+                lambda tier: tier.similar(context, unit, self.semantic_threshold, now),
+            )
+        return answer
+
+    def _lookup(self, kind, find):
+        for name, tier in (("memory", self.memory), ("disk", self.disk)):
+            if tier is None:
+                continue
+            try:
+                answer = find(tier)
+            except sqlite3.Error as e:
+                print("Response cache read failed:", e)
+                answer = None
+            outcome = "miss" if answer is None else "hit"
+            RESPONSE_CACHE_REQUESTS.labels(kind=kind, tier=name, outcome=outcome).inc()
+            if answer is not None:
+                return answer
+        return None
+
+    def put(self, query, docs, answer, embedding=None):
+        key, context = self._keys(query, docs)
+        unit = None if embedding is None else _unit(embedding)
+        expires = time.time() + self.ttl_s
+        self.memory.put(key, context, unit, answer, expires)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, context, unit, answer, expires)
+            except sqlite3.Error as e:
+                print("Response cache write failed:", e)
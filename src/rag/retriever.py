@@ -1,24 +1,93 @@
 # src/rag/retriever.py
 
+import collections
+import os
+import threading
+import time
+
 import faiss
+import numpy as np
 import pickle
 from sentence_transformers import SentenceTransformer
 
+from src.api.metrics import (
+    EMBEDDING_CACHE_REQUESTS,
+    EMBEDDING_ENCODE_SECONDS,
+    INDEX_SEARCH_SECONDS,
+)
+
+# ml_to_query produces a few thousand distinct queries at most, so the
+# default holds all of them
+EMBEDDING_CACHE_SIZE = int(os.getenv("CHROMA_EMBEDDING_CACHE_SIZE", "4096"))
+
 
 class RAGRetriever:
     def __init__(
-        self, index_path="src/rag/faiss_index.bin", meta_path="src/rag/meta.pkl"
+        self,
+        index_path="src/rag/faiss_index.bin",
+        meta_path="src/rag/meta.pkl",
+        cache_size=EMBEDDING_CACHE_SIZE,
     ):
+        self.index_path = index_path
+        self.meta_path = meta_path
         self.index = faiss.read_index(index_path)
         self.meta = pickle.load(open(meta_path, "rb"))
         self.embedder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        # query text -> read-only embedding, least recently used first
+        self.cache_size = cache_size
+        self._embeddings = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, query):
+        return self.encode_many([query])[0]
+
+    def encode_many(self, queries):
+        """
+        (len(queries), dim) query embeddings. Cached queries skip the
+        model; the rest are encoded in one batch.
+        """
+        found = {}
+        with self._lock:
+            for query in queries:
+                embedding = self._embeddings.get(query)
+                if embedding is not None:
+                    self._embeddings.move_to_end(query)
+                    found[query] = embedding
+        # counted per query, duplicates included; misses are encoded once
+        hits = sum(1 for q in queries if q in found)
+        EMBEDDING_CACHE_REQUESTS.labels(outcome="hit").inc(hits)
+        EMBEDDING_CACHE_REQUESTS.labels(outcome="miss").inc(len(queries) - hits)
+        misses = [q for q in dict.fromkeys(queries) if q not in found]
+
+        if misses:
+            start = time.perf_counter()
+            encoded = self.embedder.encode(misses, convert_to_numpy=True)
+            EMBEDDING_ENCODE_SECONDS.observe(time.perf_counter() - start)
+            encoded = np.asarray(encoded, dtype=np.float32)
+            # cached arrays are shared between callers
+            encoded.setflags(write=False)
+            with self._lock:
+                for query, embedding in zip(misses, encoded):
+                    found[query] = embedding
+                    self._embeddings[query] = embedding
+                while len(self._embeddings) > self.cache_size:
+                    self._embeddings.popitem(last=False)
+        return np.stack([found[q] for q in queries])
+
+    def search(self, query, k=5, embedding=None):
+        # embedding: the query's encode() output, when the caller already has it
+        q_emb = self.encode(query) if embedding is None else embedding
+        return self.search_embeddings(q_emb[None], k)[0]
 
-    def search(self, query, k=5):
-        q_emb = self.embedder.encode([query], convert_to_numpy=True)
-        distances, indices = self.index.search(q_emb, k)
+    def search_many(self, queries, k=5):
+        """search() for several queries: one encode batch, one index search."""
+        return self.search_embeddings(self.encode_many(queries), k)
 
-        results = []
-        for idx in indices[0]:
-            results.append(self.meta[idx])
+    def search_embeddings(self, embeddings, k=5):
+        start = time.perf_counter()
+        distances, indices = self.index.search(
+            np.ascontiguousarray(embeddings, dtype=np.float32), k
+        )
+        INDEX_SEARCH_SECONDS.observe(time.perf_counter() - start)
 
-        return results
+        return [[self.meta[idx] for idx in row if idx >= 0] for row in indices]
@@ -1,8 +1,13 @@
+import asyncio
+
 from guardrails import Guard
 
 rail_path = "rails/content_safety.rail"
 guard = Guard.for_rail(rail_path)
 
+# guardrail_violations entry for an answer the output validators rejected
+VALIDATION_FAILED = "Guardrails validation failed"
+
 
 def run_with_guardrails(rag_function, user_query: str):
     """
@@ -27,6 +32,23 @@ def run_with_guardrails(rag_function, user_query: str):
     rag_output = rag_function(user_query)
 
     # Step 3: validate output
+    return validate_output(user_query, rag_output)
+
+
+async def arun_with_guardrails(rag_function, user_query: str):
+    """
+    run_with_guardrails for an async rag_function; the output validators
+    run on a worker thread so they don't block the event loop.
+    """
+    rag_output = await rag_function(user_query)
+    return await asyncio.to_thread(validate_output, user_query, rag_output)
+
+
+def validate_output(user_query: str, rag_output: dict):
+    """
+    Run the output validators; an answer that fails them is withdrawn, the
+    same way /recommend/stream withdraws one after streaming it.
+    """
     validated_output = guard.parse(
         input_vars={"user_query": user_query},
         llm_output=rag_output["rag_answer"],
@@ -36,6 +58,27 @@ def run_with_guardrails(rag_function, user_query: str):
     if validated_output.validation_passed is True:
         rag_output["rag_answer"] = validated_output.validated_output
     else:
-        rag_output["rag_answer"] = validated_output.raw_llm_output
+        withdraw(rag_output)
 
     return rag_output
+
+
+def withdraw(rag_output: dict):
+    """Replace a rejected answer with the refusal and record the violation."""
+    from src.rag.rag_pipeline import REFUSAL_ANSWER
+
+    rag_output["rag_answer"] = REFUSAL_ANSWER
+    rag_output["guardrail_violations"] = list(
+        rag_output.get("guardrail_violations") or []
+    ) + [VALIDATION_FAILED]
+    return rag_output
+
+
+def output_passes(user_query: str, llm_output: str):
+    """Whether the output validators accept an answer that was already streamed."""
+    validated_output = guard.parse(
+        input_vars={"user_query": user_query},
+        llm_output=llm_output,
+        prompt="Validate output.",
+    )
+    return validated_output.validation_passed is True
@@ -15,3 +15,30 @@ def test_analyze_endpoint_dummy():
     # we send an empty multipart to check server returns 422 or valid response
     r = client.post("/analyze")
     assert r.status_code in (422, 200)
+
+
+def test_ready_endpoint_before_warm_up():
+    # the module-level client doesn't run the lifespan, so warm-up never starts
+    r = client.get("/ready")
+    assert r.status_code == 503
+    assert r.json() == {"status": "warming_up"}
+
+
+def test_analyze_rejects_oversized_upload(monkeypatch):
+    import src.api.main as main
+
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 10)
+    r = client.post("/analyze", files={"file": ("big.jpg", b"x" * 100, "image/jpeg")})
+    assert r.status_code == 413
+
+
+def test_dashboard_revalidates_with_etag(monkeypatch):
+    import src.api.main as main
+
+    monkeypatch.setattr(
+        main.dashboard, "get", lambda: (b"<html></html>", '"abc"', 1700000000.0)
+    )
+    r = client.get("/")
+    assert r.status_code == 200 and r.headers["etag"] == '"abc"'
+    r = client.get("/", headers={"If-None-Match": '"abc"'})
+    assert r.status_code == 304
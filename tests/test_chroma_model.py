@@ -0,0 +1,247 @@
+import copy
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.models.chroma_model import rgb2lab, rgb2lab_array
+
+
+def _sample_pixels(n=2000):
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, size=(n, 3), dtype=np.uint8)
+    edges = np.array([[0, 0, 0], [255, 255, 255], [10, 10, 10], [1, 2, 3]])
+    return np.vstack([pixels, edges.astype(np.uint8)])
+
+
+def test_rgb2lab_array_matches_scalar():
+    pixels = _sample_pixels()
+    expected = np.array([rgb2lab(p) for p in pixels])
+
+    np.testing.assert_allclose(rgb2lab_array(pixels, np.float64), expected, atol=1e-6)
+
+    # float32 output only loses float32 rounding
+    out = rgb2lab_array(pixels)
+    assert out.dtype == np.float32 and out.shape == (len(pixels), 3)
+    np.testing.assert_allclose(out, expected, rtol=1e-6, atol=1e-6)
+
+
+def test_rgb2lab_lut_mode_within_error_bound(tmp_path, monkeypatch):
+    from src.models import chroma_model
+
+    monkeypatch.setattr(chroma_model, "LAB_LUT_PATH", str(tmp_path / "lut.f16"))
+    monkeypatch.setattr(chroma_model, "_lab_lut", None)
+
+    pixels = _sample_pixels()
+    exact = rgb2lab_array(pixels, np.float64, "exact")
+    # two threads needing the table first build it once, without racing
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(
+            pool.map(lambda _: rgb2lab_array(pixels, np.float64, "lut"), range(2))
+        )
+
+    for approx in results:
+        assert np.abs(approx - exact).max() <= chroma_model.LAB_LUT_MAX_ABS_ERROR
+    assert [p.name for p in tmp_path.iterdir()] == ["lut.f16"]
+
+
+def test_ciede2000_matrix_matches_scalar():
+    from src.models.chroma_model import ciede2000, ciede2000_matrix, monk_lab
+
+    rng = np.random.default_rng(1)
+    lab_a = np.column_stack(
+        [rng.uniform(0, 100, 200), rng.uniform(-60, 60, 200), rng.uniform(-60, 60, 200)]
+    )
+    lab_a[:5, 1:] = 0  # achromatic rows hit the hue edge cases
+    lab_b = np.stack(list(monk_lab.values()))
+
+    expected = np.array([[ciede2000(a, b) for b in lab_b] for a in lab_a])
+    np.testing.assert_allclose(ciede2000_matrix(lab_a, lab_b), expected, atol=1e-9)
+
+
+def test_palette_matches_find_closest_loop():
+    from src.models.chroma_model import IRIS_PALETTE, ciede2000, iris_lab
+
+    rng = np.random.default_rng(2)
+    colors = rgb2lab_array(rng.integers(0, 256, size=(100, 3)), np.float64)
+
+    expected = [min(iris_lab, key=lambda n: ciede2000(c, iris_lab[n])) for c in colors]
+    assert list(IRIS_PALETTE.classify(colors)) == expected
+
+
+def test_dominant_color_strategies_agree_on_majority_cluster():
+    from src.models.chroma_model import DOMINANT_COLOR_STRATEGIES, dominant_color
+
+    rng = np.random.default_rng(3)
+    majority = rng.normal([65, 12, 18], 1.0, size=(7000, 3))
+    minority = rng.normal([30, 5, 5], 1.0, size=(3000, 3))
+    pixels_lab = np.vstack([majority, minority]).astype(np.float32)
+
+    for strategy in DOMINANT_COLOR_STRATEGIES:
+        center = dominant_color(pixels_lab, strategy=strategy)
+        np.testing.assert_allclose(center, [65, 12, 18], atol=1.5)
+
+
+def test_analyze_images_keeps_order_and_reports_failures(monkeypatch):
+    from src.models import chroma_model
+
+    calls = []
+
+    def fake_segment_images(images):
+        calls.append(len(images))
+        return [np.ones(image.size[::-1], dtype=np.int64) for image in images]
+
+    monkeypatch.setattr(chroma_model, "segment_images", fake_segment_images)
+    light = np.full((8, 6, 3), 230, dtype=np.uint8)
+    dark = np.full((5, 9, 3), 40, dtype=np.uint8)
+
+    results = chroma_model.analyze_images(
+        [light, "does/not/exist.jpg", dark], batch_size=2
+    )
+
+    assert calls == [1, 1]
+    assert "error" in results[1]
+    assert results[0]["skin_tone"] != results[2]["skin_tone"]
+    assert results[0]["skin_tone"] == f"MST {results[0]['mst_level']}"
+    assert results[0]["skin_L"] > results[2]["skin_L"]
+    single = chroma_model.analyze_images([dark])[0]
+    for result in (results[2], single):
+        assert result["metadata"].pop("processing_time_s") >= 0
+    assert results[2] == single
+
+
+def test_analyze_images_skips_segmentation_for_cached_images(monkeypatch):
+    from src.models import chroma_model
+
+    calls = []
+
+    def fake_segment_images(images):
+        calls.append(len(images))
+        return [np.ones(image.size[::-1], dtype=np.int64) for image in images]
+
+    class DictCache(dict):
+        # copies in and out, like src/api/result_cache.ResultCache
+        def get(self, key):
+            return copy.deepcopy(super().get(key))
+
+        def put(self, key, value):
+            self[key] = copy.deepcopy(value)
+
+    monkeypatch.setattr(chroma_model, "segment_images", fake_segment_images)
+    face = np.full((8, 6, 3), 180, dtype=np.uint8)
+    other = np.full((8, 6, 3), 60, dtype=np.uint8)
+    cache = DictCache()
+
+    first = chroma_model.analyze_images([face], cache=cache)[0]
+    second, third = chroma_model.analyze_images([face.copy(), other], cache=cache)
+
+    assert calls == [1, 1]  # only `other` was segmented the second time
+    assert first["metadata"]["cache_hit"] is False
+    assert second["metadata"]["cache_hit"] is True
+    assert second["skin_tone"] == first["skin_tone"]
+    meta = second["metadata"]
+    assert meta["processing_time_s"] == first["metadata"]["processing_time_s"]
+    assert meta["cache_lookup_s"] >= 0 and "cache_lookup_s" not in first["metadata"]
+    assert third["metadata"]["cache_hit"] is False
+
+
+def _torch_bilinear_reference(x, out_h, out_w):
+    # scalar transcription of torch's align_corners=False source-index rule
+    def src_index(dst, in_size, out_size):
+        src = max((dst + 0.5) * in_size / out_size - 0.5, 0.0)
+        i0 = min(int(src), in_size - 1)
+        i1 = min(i0 + 1, in_size - 1)
+        return i0, i1, src - i0
+
+    c, in_h, in_w = x.shape
+    out = np.zeros((c, out_h, out_w))
+    for y in range(out_h):
+        y0, y1, fy = src_index(y, in_h, out_h)
+        for xx in range(out_w):
+            x0, x1, fx = src_index(xx, in_w, out_w)
+            top = (1 - fx) * x[:, y0, x0] + fx * x[:, y0, x1]
+            bottom = (1 - fx) * x[:, y1, x0] + fx * x[:, y1, x1]
+            out[:, y, xx] = (1 - fy) * top + fy * bottom
+    return out
+
+
+def test_tiled_label_map_matches_full_bilinear(monkeypatch):
+    from src.models import chroma_model
+
+    rng = np.random.default_rng(4)
+    logits = rng.normal(size=(19, 12, 10)).astype(np.float32)
+    expected = _torch_bilinear_reference(logits, 37, 23).argmax(axis=0)
+
+    monkeypatch.setattr(chroma_model, "SEGMENTATION_MODE", "tiled")
+    monkeypatch.setattr(chroma_model, "SEGMENTATION_TILE_ROWS", 8)
+    labels = chroma_model.logits_to_label_map(logits, (37, 23))
+
+    assert labels.dtype == np.uint8
+    np.testing.assert_array_equal(labels, expected)
+
+
+def test_max_side_label_map_is_nearest_mapped_to_image_size(monkeypatch):
+    from src.models import chroma_model
+
+    rng = np.random.default_rng(5)
+    logits = rng.normal(size=(19, 12, 10)).astype(np.float32)
+    monkeypatch.setattr(chroma_model, "SEGMENTATION_MAX_SIDE", 20)
+
+    labels = chroma_model.logits_to_label_map(logits, (80, 60))
+    small = chroma_model._tiled_bilinear_argmax(logits, (20, 15))
+
+    assert labels.shape == (80, 60)
+    np.testing.assert_array_equal(labels[::4, ::4], small)
+
+
+def test_load_image_downscales_jpeg_and_records_original_size():
+    from src.models.chroma_model import load_image
+
+    image = load_image("data/images/000009.jpg", max_side=256)
+    assert image.size == (256, 256)
+    assert image.info["original_size"] == (1024, 1024)
+
+    image = load_image(np.zeros((40, 80, 3), dtype=np.uint8), max_pixels=800)
+    assert image.size == (40, 20)
+
+    assert load_image("data/images/000009.jpg").size == (1024, 1024)
+
+
+def test_load_image_decodes_bytes_and_file_objects():
+    import io
+
+    from src.models.chroma_model import load_image
+
+    with open("data/images/000009.jpg", "rb") as f:
+        data = f.read()
+
+    from_bytes = load_image(data, max_side=128)
+    from_file = load_image(io.BytesIO(data), max_side=128)
+    assert from_bytes.size == from_file.size == (128, 128)
+    assert from_bytes.info["original_size"] == (1024, 1024)
+
+
+def test_extract_regions_lab_matches_per_mask_extraction():
+    from src.models import chroma_model
+
+    rng = np.random.default_rng(5)
+    pred_seg = rng.integers(0, 19, size=(60, 40)).astype(np.uint8)
+    pred_seg[:, :5] = 13  # hair-heavy edge, like a real portrait
+    image_np = rng.integers(0, 256, size=(60, 40, 3), dtype=np.uint8)
+    regions = dict(chroma_model.ANALYSIS_REGIONS, lips=[11, 12], missing=[3])
+    pred_seg[pred_seg == 3] = 0
+
+    for strategy in ("kmeans", "histogram"):
+        colors = chroma_model.extract_regions_lab(
+            pred_seg, image_np, regions, strategy=strategy
+        )
+        for name, ids in chroma_model.ANALYSIS_REGIONS.items():
+            expected = chroma_model.extract_region_lab(
+                np.isin(pred_seg, ids), image_np, strategy=strategy
+            )
+            np.testing.assert_allclose(colors[name], expected)
+        np.testing.assert_array_equal(colors["missing"], [0, 0, 0])
+
+    lips = chroma_model.extract_region_lab(
+        np.isin(pred_seg, [11, 12]), image_np, strategy="histogram"
+    )
+    np.testing.assert_allclose(colors["lips"], lips, atol=1e-9)
@@ -0,0 +1,36 @@
+from src.api.dashboard import DriftDashboard
+
+
+def test_drift_dashboard_serves_cached_report_until_inputs_change(tmp_path):
+    report = tmp_path / "report.html"
+    state = {"fingerprint": 1, "generated": 0, "fail": False}
+
+    def generate():
+        if state["fail"]:
+            raise RuntimeError("evidently failed")
+        state["generated"] += 1
+        report.write_text(f"report {state['generated']}")
+        return str(report)
+
+    dashboard = DriftDashboard(
+        generate, lambda: state["fingerprint"], refresh_s=3600, min_refresh_s=0
+    )
+    html, etag, _ = dashboard.get()  # nothing cached yet: generated inline
+    assert html == b"report 1"
+    assert dashboard.get()[1] == etag and state["generated"] == 1
+
+    # requests don't look at the inputs; the background check does
+    state["fingerprint"] = 2
+    assert dashboard.get()[0] == b"report 1" and not dashboard._wake.is_set()
+    dashboard.check()
+    # inputs changed: the old report is served while a refresh is pending
+    assert dashboard.get()[0] == b"report 1" and dashboard._wake.is_set()
+    dashboard.refresh()
+    html, new_etag, _ = dashboard.get()
+    assert html == b"report 2" and new_etag != etag
+
+    # a failed regeneration keeps the last good report
+    state["fingerprint"], state["fail"] = 3, True
+    dashboard.check()
+    dashboard.refresh()
+    assert dashboard.get()[0] == b"report 2"
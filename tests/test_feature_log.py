@@ -0,0 +1,48 @@
+import json
+
+from monitoring import dataset
+from monitoring.dataset import read_table
+from src.api.feature_log import FeatureLogWriter, feature_record
+
+
+def test_feature_log_appends_rotates_and_writes_parquet(tmp_path, monkeypatch):
+    result = {
+        "skin_L": 70.0,
+        "skin_a": 10.0,
+        "skin_b": 15.0,
+        "mst_level": 4,
+        "tone_group": "Medium",
+        "undertone": "Warm",
+        "eye_color": ("Brown", "Hazel"),
+        "hair_color": "Black",
+        "metadata": {"processing_time_s": 0.5},
+    }
+    path = tmp_path / "current.jsonl"
+    path.write_text('{"sample_id": "old.jpg"}')  # no trailing newline
+    writer = FeatureLogWriter(
+        path=str(path),
+        segment_dir=str(tmp_path / "segments"),
+        rotate_bytes=0,
+        rotate_s=0,
+        dataset_dir=str(tmp_path / "parquet"),
+    )
+    writer.start()
+    writer.log(feature_record("a.jpg", result, timestamp=1))
+    writer.log(feature_record("b.jpg", {"error": "no face"}, timestamp=2))
+    writer.close()
+
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["sample_id"] for r in rows] == ["old.jpg", "a.jpg", "b.jpg"]
+    assert rows[1]["eye_color_left"] == "Brown" and rows[1]["mst_level"] == 4
+    assert rows[2]["segmentation_success"] is False and rows[2]["skin_L"] is None
+
+    # an empty active file is still readable, before and after rotation
+    monkeypatch.setitem(
+        dataset.DATASETS, "current", (str(path), str(tmp_path / "parquet"))
+    )
+    assert writer.rotate() == str(tmp_path / "parquet")
+    assert path.exists() and path.stat().st_size == 0
+    table = read_table("current", columns=["sample_id"])
+    assert sorted(table["sample_id"].to_pylist()) == ["a.jpg", "b.jpg", "old.jpg"]
+    assert writer.rotate() is None
+    assert read_table(str(path)).num_rows == 0
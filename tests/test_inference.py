@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.api.inference import InferenceExecutor, QueueFullError
+
+
+def test_executor_rejects_when_full_and_recovers():
+    executor = InferenceExecutor(workers=1, queue_depth=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        waiting = asyncio.ensure_future(executor.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(QueueFullError):
+            await executor.run(lambda: "rejected")
+
+        release.set()
+        assert await running is True
+        assert await waiting == "queued"
+        # slots are free again once the jobs finish
+        return await executor.run(lambda: "after")
+
+    try:
+        assert asyncio.run(scenario()) == "after"
+    finally:
+        executor.shutdown()
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    from src.api.batching import MicroBatcher
+
+    executor = InferenceExecutor(workers=1, queue_depth=1)
+    batches = []
+
+    def batch_fn(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher(batch_fn, executor, max_batch_size=4, max_wait_ms=50)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+
+    try:
+        assert asyncio.run(scenario()) == [0, 10, 20, 30, 40, 50]
+        assert [len(b) for b in batches] == [4, 2]
+    finally:
+        batcher.close()
+        executor.shutdown()
+
+
+def test_micro_batcher_close_cancels_running_batches():
+    from src.api.batching import MicroBatcher
+
+    executor = InferenceExecutor(workers=1, queue_depth=1)
+    release = threading.Event()
+    batcher = MicroBatcher(lambda items: release.wait(), executor, max_wait_ms=1)
+
+    async def scenario():
+        waiting = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0.05)
+        assert len(batcher._batches) == 1  # the running batch is referenced
+        batcher.close()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        await asyncio.sleep(0)
+        return len(batcher._batches)
+
+    try:
+        assert asyncio.run(scenario()) == 0
+    finally:
+        release.set()
+        executor.shutdown()
@@ -0,0 +1,193 @@
+import json
+import os
+
+import numpy as np
+
+from monitoring import streaming_drift
+from monitoring.streaming_drift import (
+    DriftSketch,
+    WindowedSketches,
+    drift_scores,
+    ingest_jsonl,
+)
+
+
+def _records(rng, n, skin_shift=0.0, undertones=("Warm", "Cool"), start=0):
+    return [
+        {
+            "timestamp": start + i,
+            "skin_L": float(rng.normal(60 + skin_shift, 8)),
+            "skin_a": float(rng.normal(12, 3)),
+            "skin_b": float(rng.normal(18, 4)),
+            "processing_time_s": float(rng.lognormal(0, 0.3)),
+            "mst_level": int(rng.integers(2, 8)),
+            "undertone": undertones[i % len(undertones)],
+            "hair_color": "Black",
+        }
+        for i in range(n)
+    ]
+
+
+def test_sketch_scores_flag_shifted_columns_only():
+    rng = np.random.default_rng(0)
+    reference, same, shifted = DriftSketch(), DriftSketch(), DriftSketch()
+    for record in _records(rng, 2000):
+        reference.update(record)
+    for record in _records(rng, 2000):
+        same.update(record)
+    for record in _records(rng, 2000, skin_shift=15, undertones=("Neutral",)):
+        shifted.update(record)
+
+    assert drift_scores(reference, same)["drifted_columns"] == []
+    scores = drift_scores(reference, shifted)
+    assert {"skin_L", "undertone"} <= set(scores["drifted_columns"])
+    assert not {"skin_a", "skin_b", "hair_color"} & set(scores["drifted_columns"])
+    assert scores["columns"]["skin_L"]["psi"] > 0.2
+
+
+def test_windowed_sketches_merge_and_round_trip():
+    rng = np.random.default_rng(1)
+    windowed = WindowedSketches(window_s=100)
+    records = _records(rng, 250)
+    for record in records:
+        windowed.update(record)
+
+    assert sorted(windowed.windows) == [0, 100, 200]
+    assert windowed.merged().records == 250
+    assert windowed.merged(since=100).records == 150
+
+    restored = WindowedSketches.from_dict(json.loads(json.dumps(windowed.to_dict())))
+    assert restored.merged().to_dict() == windowed.merged().to_dict()
+    restored.prune(before=200)
+    assert restored.merged().records == 50
+
+
+def test_ingest_jsonl_reads_only_new_complete_lines(tmp_path):
+    rng = np.random.default_rng(2)
+    path = tmp_path / "current.jsonl"
+    first, second = _records(rng, 3), _records(rng, 2)
+    path.write_text("".join(json.dumps(r) + "\n" for r in first) + '{"skin_L"')
+
+    sketch = DriftSketch()
+    position = ingest_jsonl(str(path), sketch)
+    assert sketch.records == 3
+
+    path.write_text(
+        "".join(json.dumps(r) + "\n" for r in first + second)
+    )  # partial line completed, more appended
+    position = ingest_jsonl(str(path), sketch, position)
+    assert sketch.records == 5
+    assert position["offset"] == path.stat().st_size
+    assert position["ino"] == path.stat().st_ino
+
+
+def test_update_state_reuses_reference_until_it_changes(tmp_path, monkeypatch):
+    rng = np.random.default_rng(3)
+    reference = tmp_path / "reference.jsonl"
+    current = tmp_path / "current.jsonl"
+    reference.write_text("".join(json.dumps(r) + "\n" for r in _records(rng, 4)))
+    current.write_text("".join(json.dumps(r) + "\n" for r in _records(rng, 2)))
+
+    state_path = str(tmp_path / "state.json")
+    state = streaming_drift.update_state(
+        streaming_drift.load_state(state_path), str(reference), str(current)
+    )
+    streaming_drift.save_state(state, state_path)
+
+    state = streaming_drift.update_state(
+        streaming_drift.load_state(state_path), str(reference), str(current)
+    )
+    assert state["reference"].records == 4
+    assert state["current"].merged().records == 2
+
+
+def test_update_state_follows_rotation_into_parquet(tmp_path):
+    from monitoring.dataset import append_jsonl
+
+    rng = np.random.default_rng(4)
+    reference = tmp_path / "reference.jsonl"
+    current = tmp_path / "current.jsonl"
+    dataset_dir = str(tmp_path / "parquet")
+    reference.write_text("".join(json.dumps(r) + "\n" for r in _records(rng, 4)))
+
+    def write(path, records, mode="a"):
+        with open(path, mode) as f:
+            f.writelines(json.dumps(r) + "\n" for r in records)
+
+    def rotate():
+        segment = str(tmp_path / "segment.jsonl")
+        os.replace(current, segment)
+        current.touch()
+        append_jsonl(segment, dataset_dir)
+        os.remove(segment)
+
+    # history already rotated before the first run is ingested from Parquet
+    write(current, _records(rng, 3, start=0))
+    rotate()
+    write(current, _records(rng, 2, start=10))
+    state = streaming_drift.update_state(
+        streaming_drift.load_state(str(tmp_path / "state.json")),
+        str(reference),
+        str(current),
+        dataset_dir,
+    )
+    assert state["current"].merged().records == 5
+
+    # rows appended after the last run, then rotated away with the file,
+    # are picked up from Parquet; the new active file is read from its start
+    write(current, _records(rng, 4, start=11))  # shares a second with the last run
+    rotate()
+    write(current, _records(rng, 1, start=20))
+    state = streaming_drift.update_state(
+        state, str(reference), str(current), dataset_dir
+    )
+    assert state["current"].merged().records == 10
+
+    # the same file truncated and rewritten is read from the start
+    write(current, _records(rng, 2, start=30))
+    state = streaming_drift.update_state(
+        state, str(reference), str(current), dataset_dir
+    )
+    write(current, _records(rng, 1, start=40), mode="w")
+    state = streaming_drift.update_state(
+        state, str(reference), str(current), dataset_dir
+    )
+    assert state["current"].merged().records == 13
+
+
+def test_parquet_dataset_projection_and_time_range(tmp_path):
+    from monitoring import dataset
+
+    rng = np.random.default_rng(4)
+    day = 86400
+    records = _records(rng, 6, start=1_700_000_000)
+    for i, record in enumerate(records):
+        record["timestamp"] += i * day  # one row per day partition
+    jsonl = tmp_path / "log.jsonl"
+    jsonl.write_text("".join(json.dumps(r) + "\n" for r in records))
+
+    parquet_dir = str(tmp_path / "parquet")
+    dataset.write_table(dataset.read_jsonl_table(str(jsonl)), parquet_dir)
+    assert len(list((tmp_path / "parquet").iterdir())) == 6
+
+    full = dataset.read_table(parquet_dir)
+    assert full.schema == dataset.SCHEMA and full.num_rows == 6
+
+    start = records[2]["timestamp"]
+    table = dataset.read_table(
+        parquet_dir, columns=["skin_L"], start=start, end=start + 2 * day
+    )
+    assert table.column_names == ["skin_L"]
+    assert table["skin_L"].to_pylist() == [r["skin_L"] for r in records[2:4]]
+    # the JSONL path gives the same answer
+    assert dataset.read_table(
+        str(jsonl), columns=["skin_L"], start=start, end=start + 2 * day
+    ).equals(table)
+
+    # a rewrite replaces every partition, not only the ones it touches
+    dataset.write_table(
+        dataset.read_jsonl_table(str(jsonl)).slice(0, 2), parquet_dir, overwrite=True
+    )
+    assert dataset.read_table(parquet_dir).num_rows == 2
+    assert len(list((tmp_path / "parquet").iterdir())) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["log.jsonl", "parquet"]
@@ -0,0 +1,277 @@
+import asyncio
+import json
+import pickle
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from src.rag.recommendation_table import (
+    AnswerStore,
+    build,
+    enumerate_profiles,
+    load_table,
+)
+from src.rag.guardrails import ChromaGuardrails, StreamModerator
+from src.rag.llm_client import AsyncLLMClient, LLMError
+from src.rag.llm_stub import STUB_ANSWER, create_app
+from src.rag.response_cache import ResponseCache
+
+
+def test_enumerate_profiles_covers_prediction_space():
+    profiles = list(enumerate_profiles())
+    assert len(profiles) == 10 * 3 * 9 * 7
+    assert len({json.dumps(p, sort_keys=True) for p in profiles}) == len(profiles)
+    assert profiles[0]["skin_tone"] == "MST 1"
+    assert profiles[0]["tone_group"] == "Light"
+
+
+def test_recommendation_table_resumes_and_checks_version(tmp_path):
+    path = str(tmp_path / "recommendations.sqlite")
+    queries = [f"query {i}" for i in range(10)]
+    calls = []
+
+    def answer(query):
+        calls.append(query)
+        if query == "query 3" and calls.count(query) == 1:
+            raise RuntimeError("rate limited")
+        refused = query == "query 5" and calls.count(query) == 1
+        return {
+            "query_used": query,
+            "rag_answer": f"answer to {query}",
+            "guardrail_violations": (
+                ["Forbidden word detected: ugly"] if refused else []
+            ),
+        }
+
+    store = AnswerStore(path)
+    stats = build(store, queries, answer, "v1", workers=3)
+    assert stats == {"skipped": 0, "written": 8, "failed": 2}
+
+    # second run only retries the failed and the refused query
+    stats = build(store, queries, answer, "v1", workers=3)
+    assert stats == {"skipped": 8, "written": 2, "failed": 0}
+    assert len(calls) == 12
+    store.close()
+
+    table = load_table(path, "v1")
+    assert json.loads(table["query 3"])["rag_answer"] == "answer to query 3"
+    # answers built for another prompt/index are not served
+    assert load_table(path, "v2") == {}
+    assert load_table(str(tmp_path / "missing.sqlite"), "v1") == {}
+
+    store = AnswerStore(path)
+    build(store, queries[:2], answer, "v2")
+    assert len(store) == 2 and store.version == "v2"
+    store.close()
+
+
+def test_response_cache_exact_ttl_and_size():
+    docs = [{"source": "a", "text": "warm colours"}]
+    cache = ResponseCache("p1", max_entries=2)
+    cache.put("MST 5, Warm", docs, "answer 1")
+    assert cache.get("  mst 5,   warm ", docs) == "answer 1"
+    # different documents or prompt version: a different prompt
+    assert cache.get("MST 5, Warm", [{"source": "b", "text": "cool"}]) is None
+    assert ResponseCache("p2").get("MST 5, Warm", docs) is None
+
+    cache.put("q2", docs, "answer 2")
+    cache.put("q3", docs, "answer 3")
+    assert cache.get("MST 5, Warm", docs) is None  # least recently used
+    assert len(cache.memory) == 2
+
+    expired = ResponseCache("p1", ttl_s=-1)
+    expired.put("q", docs, "stale")
+    assert expired.get("q", docs) is None
+
+
+def test_response_cache_semantic_and_shared_tier(tmp_path):
+    docs = [{"source": "a", "text": "warm colours"}]
+    db_path = str(tmp_path / "responses.sqlite")
+    worker_1 = ResponseCache("p1", db_path=db_path, semantic_threshold=0.95)
+    worker_2 = ResponseCache("p1", db_path=db_path, semantic_threshold=0.95)
+
+    worker_1.put("dark brown hair", docs, "answer", embedding=[1.0, 0.0, 0.0])
+    assert worker_2.get("dark brown hair", docs) == "answer"
+    # near-duplicate query with the same documents
+    assert worker_2.get("brown hair", docs, embedding=[0.99, 0.05, 0]) == "answer"
+    assert worker_1.get("brown hair", docs, embedding=[0.99, 0.05, 0]) == "answer"
+    assert worker_2.get("black hair", docs, embedding=[0.6, 0.8, 0]) is None
+    assert worker_2.get("brown hair", [], embedding=[0.99, 0.05, 0]) is None
+
+
+def stub_client(app, **kwargs):
+    kwargs.setdefault("backoff_s", 0.001)
+    return AsyncLLMClient(
+        api_key="test",
+        base_url="http://llm-stub/v1",
+        transport=httpx.ASGITransport(app=app),
+        **kwargs,
+    )
+
+
+def complete(client, prompt="hello"):
+    return client.complete(
+        [{"role": "user", "content": prompt}],
+        model="stub",
+        max_tokens=10,
+        temperature=0,
+    )
+
+
+def test_llm_client_retries_429_and_5xx():
+    app = create_app(latency_s=0, fail_first=[429, 503])
+
+    async def scenario():
+        client = stub_client(app, max_retries=3)
+        try:
+            return await complete(client)
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(scenario()) == STUB_ANSWER
+    assert app.state.stats["requests"] == 3
+
+
+def test_llm_client_gives_up_and_does_not_retry_client_errors():
+    async def scenario(app, **kwargs):
+        client = stub_client(app, **kwargs)
+        try:
+            await complete(client)
+        finally:
+            await client.aclose()
+
+    exhausted = create_app(latency_s=0, fail_first=[503] * 5)
+    with pytest.raises(LLMError) as e:
+        asyncio.run(scenario(exhausted, max_retries=2))
+    assert e.value.status == 503 and exhausted.state.stats["requests"] == 3
+
+    bad_request = create_app(latency_s=0, fail_first=[400])
+    with pytest.raises(LLMError):
+        asyncio.run(scenario(bad_request))
+    assert bad_request.state.stats["requests"] == 1
+
+    slow = create_app(latency_s=1)
+    with pytest.raises(LLMError, match="timed out"):
+        asyncio.run(scenario(slow, timeout_s=0.05, max_retries=1))
+    assert slow.state.stats["requests"] == 2
+
+
+def test_llm_client_caps_requests_in_flight():
+    app = create_app(latency_s=0.05)
+
+    async def scenario():
+        client = stub_client(app, concurrency=2)
+        try:
+            return await asyncio.gather(*(complete(client) for _ in range(6)))
+        finally:
+            await client.aclose()
+
+    assert len(asyncio.run(scenario())) == 6
+    assert app.state.stats["max_in_flight"] == 2
+
+
+def test_llm_client_streams_deltas_after_retry():
+    app = create_app(latency_s=0, token_latency_s=0, fail_first=[503])
+
+    async def scenario():
+        client = stub_client(app)
+        try:
+            return [
+                chunk
+                async for chunk in client.stream(
+                    [{"role": "user", "content": "hi"}],
+                    model="stub",
+                    max_tokens=10,
+                    temperature=0,
+                )
+            ]
+        finally:
+            await client.aclose()
+
+    chunks = asyncio.run(scenario())
+    assert len(chunks) == len(STUB_ANSWER.split(" "))
+    assert "".join(chunks) == STUB_ANSWER
+    assert app.state.stats == {"requests": 2, "in_flight": 0, "max_in_flight": 1}
+
+
+def test_stream_moderator_catches_phrases_across_chunks():
+    moderator = StreamModerator(ChromaGuardrails())
+    sent = []
+    for chunk in ["Bold colours look great, not u", "g", "ly at all"]:
+        text, violations = moderator.feed(chunk)
+        sent.append(text)
+        if violations:
+            break
+    assert violations == ["Forbidden word detected: ugly"]
+    # nothing of the violating word was released
+    assert "Bold colours look great, not u".startswith("".join(sent))
+    assert "not u" not in "".join(sent)
+
+    moderator = StreamModerator(ChromaGuardrails())
+    chunks = ["Warm ", "neutrals ", "and ", "gold ", "jewelry."]
+    sent = [moderator.feed(c)[0] for c in chunks] + [moderator.flush()]
+    assert "".join(sent) == "".join(chunks)
+
+
+def test_retriever_caches_embeddings_and_batches_searches(tmp_path, monkeypatch):
+    faiss = pytest.importorskip("faiss")
+    pytest.importorskip("sentence_transformers")
+    import numpy as np
+
+    from src.rag import retriever as retriever_module
+
+    class Embedder:
+        def __init__(self, name):
+            self.batches = []
+
+        def encode(self, queries, convert_to_numpy=True):
+            self.batches.append(list(queries))
+            return np.array([[len(q), q.count("a"), 1.0] for q in queries])
+
+    index = faiss.IndexFlatL2(3)
+    index.add(np.array([[4, 1, 1], [10, 0, 1]], dtype=np.float32))
+    faiss.write_index(index, str(tmp_path / "index.bin"))
+    with open(tmp_path / "meta.pkl", "wb") as f:
+        pickle.dump([{"text": "near"}, {"text": "far"}], f)
+    monkeypatch.setattr(retriever_module, "SentenceTransformer", Embedder)
+    retriever = retriever_module.RAGRetriever(
+        str(tmp_path / "index.bin"), str(tmp_path / "meta.pkl"), cache_size=2
+    )
+
+    assert retriever.search("warm", k=1) == [{"text": "near"}]
+    results = retriever.search_many(["warm", "cool tones", "ab"], k=1)
+    assert results == [[{"text": "near"}], [{"text": "far"}], [{"text": "near"}]]
+    # "warm" came from the cache; the two misses were encoded together
+    assert retriever.embedder.batches == [["warm"], ["cool tones", "ab"]]
+    retriever.encode("ab")
+    retriever.encode("warm")  # evicted by the batch above
+    assert retriever.embedder.batches[-1] == ["warm"]
+
+    # every query is counted once, duplicate misses included
+    def count(outcome):
+        return REGISTRY.get_sample_value(
+            "chromamatch_embedding_cache_requests_total", {"outcome": outcome}
+        )
+
+    hits, misses = count("hit"), count("miss")
+    retriever.encode_many(["new", "new", "warm"])
+    assert retriever.embedder.batches[-1] == ["new"]
+    assert (count("hit") - hits, count("miss") - misses) == (1, 2)
+
+
+def test_refused_answers_are_not_cached():
+    pytest.importorskip("groq")
+    from src.rag.rag_pipeline import ChromaRAGPipeline
+
+    pipeline = ChromaRAGPipeline.__new__(ChromaRAGPipeline)
+    pipeline.guardrails = ChromaGuardrails()
+    pipeline.response_cache = ResponseCache("p1")
+    answers = iter(["That colour looks ugly on you.", "Try warm neutrals."])
+    pipeline.generate_answer = lambda docs, query: next(answers)
+
+    docs = [{"source": "a", "text": "warm colours"}]
+    assert pipeline.cached_answer(docs, "MST 5") == "That colour looks ugly on you."
+    assert pipeline.response_cache.get("MST 5", docs) is None
+    assert pipeline.cached_answer(docs, "MST 5") == "Try warm neutrals."
+    assert pipeline.response_cache.get("MST 5", docs) == "Try warm neutrals."
@@ -0,0 +1,27 @@
+from src.api.result_cache import ResultCache, SQLiteStore
+
+
+def test_result_cache_tiers_share_and_evict(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite")
+    worker_a = ResultCache(max_entries=2, db_path=db_path)
+    worker_b = ResultCache(max_entries=2, db_path=db_path)
+
+    result = {"skin_tone": "MST 5", "eye_color": ("Brown", "Hazel")}
+    worker_a.put("k1", result)
+    worker_a.put("err", {"error": "no face"})  # failures are not cached
+    assert worker_a.get("err") is None
+
+    # worker B finds A's result on disk, then serves it from memory
+    hit = worker_b.get("k1")
+    assert hit == {"skin_tone": "MST 5", "eye_color": ["Brown", "Hazel"]}
+    hit["skin_tone"] = "changed"
+    assert worker_b.memory.get("k1")["skin_tone"] == "MST 5"
+
+    for key in ("k2", "k3"):
+        worker_b.put(key, result)
+    assert worker_b.memory.get("k1") is None and len(worker_b.memory) == 2
+
+    store = SQLiteStore(str(tmp_path / "small.sqlite"), max_bytes=200)
+    for i in range(10):
+        store.put(f"k{i}", {"value": "x" * 40})
+    assert store.get("k9") is not None and store.get("k0") is None
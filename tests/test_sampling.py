@@ -0,0 +1,34 @@
+from src.api.sampling import TelemetrySampler
+
+
+def test_sampler_keeps_errors_and_summarizes_the_rest():
+    class FakeWriter:
+        def __init__(self):
+            self.runs = []
+
+        def log(self, run_name, params=None, metrics=None, artifacts=None):
+            self.runs.append((run_name, params, metrics, artifacts))
+
+    writer = FakeWriter()
+    sampler = TelemetrySampler(writer, rate=0.0, route_rates={"recommendation": 1.0})
+
+    for latency in (1.0, 3.0):
+        sampler.record(
+            "analyze_image",
+            params={"result_undertone": "warm"},
+            metrics={"latency_s": latency},
+            artifacts=[("upload.jpg", b"img")],
+        )
+    sampler.record("analyze_image", artifacts=[("upload.jpg", b"x")], error="bad")
+    sampler.record("recommendation", metrics={"response_length": 10})
+
+    assert [run[0] for run in writer.runs] == ["analyze_image", "recommendation"]
+    assert writer.runs[0][1] == {"error": "bad"}
+
+    sampler.flush()
+    name, params, metrics, artifacts = writer.runs[-1]
+    assert name == "analyze_image_summary" and not artifacts
+    assert metrics["requests"] == 2 and metrics["latency_s_mean"] == 2.0
+    assert params["result_undertone_counts"] == '{"warm": 2}'
+    sampler.flush()  # nothing new, no empty summary runs
+    assert len(writer.runs) == 3
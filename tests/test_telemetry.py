@@ -0,0 +1,80 @@
+import pytest
+
+
+def test_telemetry_writer_spools_when_tracking_fails_and_replays(tmp_path):
+    pytest.importorskip("mlflow")
+    from src.api.telemetry import TelemetryWriter
+
+    class FakeRun:
+        def __init__(self, run_id):
+            self.info = type("Info", (), {"run_id": run_id})()
+
+    class FakeClient:
+        def __init__(self):
+            self.down = True
+            self.runs = {}
+
+        def create_run(self, experiment_id, start_time=None, run_name=None):
+            if self.down:
+                raise ConnectionError("tracking server down")
+            run_id = f"run{len(self.runs)}"
+            self.runs[run_id] = {"name": run_name, "artifacts": []}
+            return FakeRun(run_id)
+
+        def log_batch(self, run_id, metrics, params):
+            self.runs[run_id]["params"] = {p.key: p.value for p in params}
+
+        def log_artifact(self, run_id, path):
+            with open(path, "rb") as f:
+                self.runs[run_id]["artifacts"].append(f.read())
+
+        def set_terminated(self, run_id):
+            pass
+
+    client = FakeClient()
+    writer = TelemetryWriter("test", max_queue=2, spool_dir=str(tmp_path), backoff_s=0)
+    writer._client = client
+
+    assert writer.log("analyze_image", params={"a": 1}, artifacts=[("x.jpg", b"img")])
+    assert writer.log("recommendation", metrics={"response_length": 3})
+    assert not writer.log("dropped")  # queue full, nothing blocks
+
+    writer._write_batch(writer._next_batch())
+    assert client.runs == {}
+    assert (tmp_path / "records.jsonl").exists()
+
+    client.down = False
+    writer.log("recommendation")
+    writer._write_batch(writer._next_batch())
+    names = sorted(run["name"] for run in client.runs.values())
+    assert names == ["analyze_image", "recommendation", "recommendation"]
+    analyze = next(r for r in client.runs.values() if r["name"] == "analyze_image")
+    assert analyze["params"] == {"a": "1"} and analyze["artifacts"] == [b"img"]
+    assert not (tmp_path / "records.jsonl").exists()
+    assert list((tmp_path / "artifacts").iterdir()) == []
+
+
+def test_telemetry_writer_bounds_queue_bytes_and_spool_size(tmp_path):
+    pytest.importorskip("mlflow")
+    from src.api.telemetry import TelemetryWriter
+
+    writer = TelemetryWriter(
+        "test",
+        max_queue_bytes=100,
+        spool_dir=str(tmp_path),
+        max_spool_bytes=1000,
+    )
+    assert writer.log("a", artifacts=[("a.jpg", b"x" * 60)])
+    assert not writer.log("b", artifacts=[("b.jpg", b"x" * 60)])  # over 100 bytes
+    assert writer.log("c")  # records without artifacts still fit
+    batch = writer._next_batch()
+    assert [r["run_name"] for r in batch] == ["a", "c"]
+    assert writer._queued_bytes == 0
+
+    # the spool keeps what fits under its cap and drops the rest
+    big = {"run_name": "big", "timestamp_ms": 0, "params": {}, "metrics": {}}
+    writer._spool([{**big, "artifacts": [("big.jpg", b"x" * 700)]}] * 2)
+    lines = (tmp_path / "records.jsonl").read_text().splitlines()
+    assert len(lines) == 1
+    assert len(list((tmp_path / "artifacts").iterdir())) == 1
+    assert writer._spool_bytes() <= 1000